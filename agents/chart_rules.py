@@ -0,0 +1,198 @@
+# File: agents/chart_rules.py
+# Infers a chart definition from the shape of a query result; the LLM is consulted only when the
+# column types leave more than one reasonable choice.
+
+import json
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Dict, Any, Optional, Union
+
+from core.tracing import get_logger
+from llm.model import LanguageModel
+from database.columnar import ColumnarResult, column_values
+
+log = get_logger("charts")
+
+# Either row dicts or a columnar result; the rules work on columns.
+ResultData = Union[List[Dict[str, Any]], ColumnarResult]
+
+CHART_TYPES = ("pie", "bar", "line", "none")
+NO_CHART = {"chart_type": "none"}
+
+# A pie with more slices than this is unreadable; such breakdowns become bars instead.
+PIE_MAX_SLICES = 8
+# Beyond this many categories a bar chart stops being useful.
+BAR_MAX_CATEGORIES = 50
+
+_TEMPORAL_NAME = re.compile(r"(^|_)(YEAR|YR|MONTH|MON|DATE|DT|DAY|WEEK|QUARTER|PERIOD|TIME)($|_)|_ON$", re.IGNORECASE)
+# Codes and identifiers are numeric in Oracle but are labels, not measures.
+_IDENTIFIER_NAME = re.compile(r"(^|_)(CD|CODE|ID|NUM|NO|NUMBER)$", re.IGNORECASE)
+_MEASURE_NAME = re.compile(r"COUNT|CNT|TOTAL|SUM|AMOUNT|VALUE|NUMBER_OF|AVG|PCT|PERCENT", re.IGNORECASE)
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}(-\d{2})?([ T].*)?$")
+_PIE_WORDS = re.compile(r"\b(breakdown|distribution|share|proportion|percentage|split|composition)\b", re.IGNORECASE)
+_TREND_WORDS = re.compile(r"\b(trend|over time|monthly|yearly|annual|per year|per month|by year|by month|timeline)\b", re.IGNORECASE)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def profile_columns(data: ResultData) -> Dict[str, Dict[str, Any]]:
+    """
+    Classifies every column of a result as 'temporal', 'numeric' or 'categorical' and records its
+    number of distinct values.
+    """
+    profile = {}
+    for column, all_values in column_values(data).items():
+        values = [v for v in all_values if v is not None]
+        distinct = len({str(v) for v in values})
+        if not values:
+            kind = "categorical"
+        elif all(isinstance(v, (date, datetime)) for v in values):
+            kind = "temporal"
+        elif all(_is_number(v) for v in values):
+            is_year = all(float(v).is_integer() and 1900 <= v <= 2100 for v in values)
+            if _TEMPORAL_NAME.search(column) and (is_year or "MONTH" in column.upper() or "MON" in column.upper()):
+                kind = "temporal"
+            elif _IDENTIFIER_NAME.search(column):
+                kind = "categorical"
+            else:
+                kind = "numeric"
+        elif all(isinstance(v, str) and _ISO_DATE.match(v) for v in values):
+            kind = "temporal"
+        else:
+            kind = "categorical"
+        profile[column] = {"kind": kind, "distinct": distinct}
+    return profile
+
+
+def _pick_measure(numeric: List[str]) -> Optional[str]:
+    if len(numeric) == 1:
+        return numeric[0]
+    named = [c for c in numeric if _MEASURE_NAME.search(c)]
+    return named[0] if len(named) == 1 else None
+
+
+def infer_chart(user_question: str, data: ResultData) -> Optional[Dict[str, Any]]:
+    """
+    Applies the chart rules to a result. Returns a chart definition, NO_CHART when the result
+    cannot be charted, or None when the result is ambiguous and the LLM should decide.
+    """
+    if not data or len(data) < 2:
+        return dict(NO_CHART)
+    profile = profile_columns(data)
+    temporal = [c for c, p in profile.items() if p["kind"] == "temporal"]
+    numeric = [c for c, p in profile.items() if p["kind"] == "numeric"]
+    categorical = [c for c, p in profile.items() if p["kind"] == "categorical"]
+
+    if not numeric:
+        return dict(NO_CHART)
+    value_column = _pick_measure(numeric)
+    if value_column is None:
+        return None
+
+    if temporal and not categorical:
+        if len(temporal) != 1:
+            return None
+        return {"chart_type": "line", "label_column": temporal[0], "value_column": value_column}
+
+    if categorical and not temporal:
+        if len(categorical) != 1:
+            return None
+        label_column = categorical[0]
+        slices = profile[label_column]["distinct"]
+        if slices > BAR_MAX_CATEGORIES:
+            return dict(NO_CHART)
+        non_negative = all((v or 0) >= 0 for v in column_values(data)[value_column])
+        wants_pie = _PIE_WORDS.search(user_question) and slices <= PIE_MAX_SLICES and non_negative
+        return {"chart_type": "pie" if wants_pie else "bar", "label_column": label_column, "value_column": value_column}
+
+    if temporal and categorical and len(temporal) == 1 and _TREND_WORDS.search(user_question) \
+            and profile[temporal[0]]["distinct"] == len(data):
+        # One row per period with a constant descriptive column alongside, e.g. district name.
+        return {"chart_type": "line", "label_column": temporal[0], "value_column": value_column}
+
+    return None
+
+
+def validate_chart_definition(definition: Any, data: ResultData) -> Dict[str, Any]:
+    """
+    Checks a proposed definition against the actual result keys, fixing column-name case, and
+    returns NO_CHART if the chart type is unknown or the columns do not fit.
+    """
+    if not isinstance(definition, dict) or not data:
+        return dict(NO_CHART)
+    chart_type = str(definition.get("chart_type", "none")).lower()
+    if chart_type not in CHART_TYPES or chart_type == "none":
+        return dict(NO_CHART)
+
+    columns = column_values(data)
+    keys = {key.upper(): key for key in columns}
+    label_column = keys.get(str(definition.get("label_column", "")).upper())
+    value_column = keys.get(str(definition.get("value_column", "")).upper())
+    if label_column is None or value_column is None or label_column == value_column:
+        return dict(NO_CHART)
+    values = columns[value_column]
+    if not any(_is_number(v) for v in values) or not all(v is None or _is_number(v) for v in values):
+        return dict(NO_CHART)
+    return {"chart_type": chart_type, "label_column": label_column, "value_column": value_column}
+
+
+def create_charting_prompt(user_question: str, data: ResultData) -> str:
+    """ Creates a prompt to ask the LLM to choose a chart type and map the data. """
+    data_sample = data.to_rows(3) if isinstance(data, ColumnarResult) else data[:3]
+    columns = {column: p["kind"] for column, p in profile_columns(data).items()}
+
+    prompt = f"""
+    You are a data visualization expert. Your job is to select the best chart type to answer a user's question and to identify the correct columns for the chart's labels and values.
+    You can choose from these chart types: 'pie', 'bar', 'line'.
+
+    Here is a sample of the data retrieved from the database:
+    ---
+    {json.dumps(data_sample, indent=2, default=str)}
+    ---
+
+    The columns and their detected types are:
+    {json.dumps(columns)}
+
+    Here are the rules for choosing a chart type:
+    - Use 'pie' for breakdowns of a whole (e.g., "breakdown by type", "distribution of statuses"). This usually involves a 'count' and a category name.
+    - Use 'bar' for comparing quantities across different categories (e.g., "crimes per district", "arrests per officer").
+    - Use 'line' for showing a trend over time (e.g., "monthly counts", "trend over the last year"). This requires a date column.
+    - If no chart is suitable, respond with 'none'.
+
+    Now, analyze the user's question and the data sample.
+    User Question: "{user_question}"
+
+    Based on the question and data, provide a JSON object with three keys:
+    1. "chart_type": The best chart type ('pie', 'bar', 'line', or 'none').
+    2. "label_column": The name of the column that should be used for the chart labels, exactly as it appears in the data.
+    3. "value_column": The name of the numeric column that should be used for the chart values.
+
+    Your response MUST be ONLY the JSON object.
+    """
+    return prompt
+
+
+async def resolve_chart_definition(user_question: str, data: ResultData, llm: LanguageModel) -> Dict[str, Any]:
+    """
+    Returns a validated chart definition for a result, using the rules when they are decisive and
+    the LLM otherwise.
+    """
+    definition = infer_chart(user_question, data)
+    if definition is not None:
+        log.info("Chart inferred without the LLM", extra={"chart": definition})
+        return definition
+
+    log.info("Chart ambiguous; asking the LLM")
+    try:
+        response_str = await llm.generate_response(create_charting_prompt(user_question, data))
+        cleaned_response = re.sub(r'```(json)?', '', response_str, flags=re.IGNORECASE).strip()
+        definition = validate_chart_definition(json.loads(cleaned_response), data)
+        if definition["chart_type"] == "none":
+            log.info("LLM chart definition did not match the result columns")
+        return definition
+    except Exception as e:
+        log.warning("Failed to generate or parse a chart definition", extra={"error": str(e)})
+        return dict(NO_CHART)
@@ -1,49 +1,70 @@
 # File: agents/core_agent.py
 # --- ROBUST ARCHITECTURE: Caching schema on startup ---
-print("--- agents/core_agent.py: File imported ---") # ADD THIS LINE
 
 from database.connection import Database
+from database.schema_catalog import SchemaCatalog
+from database.columnar import ColumnarResult
+from database.sql_guard import SqlGuard
 from llm.model import LanguageModel
-from agents.tool_definitions import sql_search_tool, vector_search_tool, graphing_tool
-from typing import List, Dict, Any, Optional
-import json
+from agents.tool_definitions import generate_sql, run_sql, remember_sql, vector_search_tool, graphing_tool
+from agents.sql_cache import SemanticSqlCache
+from agents.router import LocalRouter, DATA_QUERY, GENERAL_CONVERSATION
+from agents.schema_linker import SchemaLinker
+from agents.evidence_packer import pack_evidence, evidence_json
+from llm.tokenizer import count_tokens, load_tokenizer
+from rag.pipeline import RagPipeline
+from core.tracing import span, record_span, get_logger
+from core.config import RAG_BUILD_ON_STARTUP, RAG_REFRESH_INTERVAL_SECONDS, SQL_CACHE_ENABLED, AGENT_EXECUTION_MODE, ROUTER_MODE, SCHEMA_LINKING_ENABLED, SQL_GUARD_ENABLED
+from typing import AsyncIterator, List, Dict, Any, Optional
+import asyncio
+from contextlib import aclosing
+import time
+
+log = get_logger("agent")
 
 class CoreInvestigationAgent:
     # In agents/core_agent.py
 
-    def __init__(self):
+    def __init__(self, db: Optional[Database] = None):
         """
         Initializes the agent, database connection, LLM, and crucially,
-        loads the GUARANTEED CORRECT database schema from local files.
+        loads the database schema from the schema catalog. A db can be passed in
+        (the benchmarks use an in-process stand-in); otherwise the Oracle pool is used.
         """
-        print("--- CoreInvestigationAgent: __init__ started. ---")
-        
-        self.db = Database()
+        log.info("Agent initializing")
+
+        self.db = db if db is not None else Database()
         self.llm = LanguageModel()
 
-        print("Agent is initializing: loading database schema from local cache files...")
-        
-        try:
-            # --- THIS IS THE NEW, ROBUST SCHEMA LOADING LOGIC ---
-            with open('t_fir_registration_schema.txt', 'r') as f:
-                fir_schema = f.read()
-            with open('m_district_schema.txt', 'r') as f:
-                district_schema = f.read()
-            
-            # We can add more files here as needed for other tables
-            self.db_schema = f"{fir_schema}\n\n{district_schema}"
-            
-            print("Database schema successfully loaded from files.")
-            # You can print self.db_schema here to see the combined string
-            
-        except FileNotFoundError as e:
-            self.db_schema = ""
-            print(f"CRITICAL ERROR: Schema file not found: {e}. Please generate it using schema_checker.py.")
-        
+        # Snapshot first (milliseconds), then the data dictionary, then the shipped *_SCHEMA.txt files.
+        self.catalog = SchemaCatalog(self.db).load()
+        self.db_schema = self.catalog.ddl()
+
         if not self.db_schema:
-            print("CRITICAL WARNING: Database schema could not be loaded. SQL generation will likely fail.")
-        
-        print("Planner-Synthesizer 'CoreInvestigationAgent' initialized.")
+            log.error("Database schema could not be loaded; SQL generation will likely fail")
+
+        # Paraphrase matching and local routing reuse the RAG embedder, which is loaded once per process.
+        embed = lambda texts: RagPipeline.get_embedder().encode(texts, convert_to_tensor=False)
+        self.sql_cache = SemanticSqlCache(embed=embed) if SQL_CACHE_ENABLED else None
+        self.router = LocalRouter(embed=embed) if ROUTER_MODE in ("local", "shadow") else None
+        self.schema_linker = SchemaLinker(self.db_schema, embed=embed, foreign_keys=self.catalog.foreign_keys() or None) \
+            if SCHEMA_LINKING_ENABLED and self.db_schema else None
+        # Checks generated SQL against the catalog and the optimizer's estimates before it runs.
+        self.sql_guard = SqlGuard(self.catalog, self.db) if SQL_GUARD_ENABLED else None
+
+        # Load the prompt tokenizer now rather than on the first request.
+        load_tokenizer()
+
+        if RAG_BUILD_ON_STARTUP:
+            # Load (or build once and save) the FIR vector index now, so the first fallback query doesn't pay for it.
+            try:
+                rag = RagPipeline.get_shared(self.db)
+                rag.load_or_build("T_FIR_REGISTRATION", "FIR_CONTENTS", "FIR_REG_NUM")
+                rag.start_periodic_refresh(RAG_REFRESH_INTERVAL_SECONDS)
+            except Exception as e:
+                log.warning("RAG index could not be prepared at startup", extra={"error": str(e)})
+
+        log.info("Agent initialized", extra={"schema_version": self.catalog.version})
 
     def _create_routing_prompt(self, user_question: str) -> str:
         # ... (This function remains unchanged) ...
@@ -59,9 +80,46 @@ class CoreInvestigationAgent:
         """
         return prompt
     
+    def refresh_schema(self) -> Dict[str, Any]:
+        """Re-reads the schema catalog from the database and swaps it in without a restart."""
+        if not self.catalog.refresh():
+            return {**self.catalog.get_info(), "refreshed": False}
+        self.db_schema = self.catalog.ddl()
+        if self.schema_linker is not None:
+            self.schema_linker.set_schema(self.db_schema, self.catalog.foreign_keys() or None)
+        return {**self.catalog.get_info(), "refreshed": True}
+
+    async def _route(self, user_question: str) -> str:
+        """
+        Decides between DATA_QUERY and GENERAL_CONVERSATION. The local router answers most questions
+        in milliseconds; the LLM is asked only when it is unsure, or always in 'llm'/'shadow' mode.
+        """
+        local = None
+        if self.router is not None:
+            local = await asyncio.to_thread(self.router.route, user_question)
+            label, confidence, method = local
+            if ROUTER_MODE == "local" and self.router.is_confident(confidence):
+                self.router.record(method)
+                log.info("Routed locally", extra={"route": label, "method": method, "confidence": round(confidence, 2)})
+                return label
+
+        routing_prompt = self._create_routing_prompt(user_question)
+        llm_answer = await self.llm.generate_response(routing_prompt)
+        route = GENERAL_CONVERSATION if GENERAL_CONVERSATION in llm_answer else DATA_QUERY
+
+        if self.router is not None:
+            if ROUTER_MODE == "shadow":
+                agreed = local[0] == route
+                self.router.record(local[2], shadow_agreed=agreed)
+                log.info("Router shadow comparison", extra={"local_route": local[0], "method": local[2], "confidence": round(local[1], 2),
+                                                            "llm_route": route, "agreed": agreed})
+            else:
+                self.router.record("llm_fallback")
+        return route
+
     def _create_synthesis_prompt(self, user_question: str, evidence: Dict[str, Any]) -> str:
-        # ... (This function remains unchanged) ...
-        evidence_str = json.dumps(evidence, indent=2, default=str)
+        # Large results are summarized so the prompt stays within SYNTHESIS_TOKEN_BUDGET.
+        evidence_str = evidence_json(pack_evidence(evidence))
         prompt = f"""
         You are an AI assistant for a police officer. Your task is to provide a comprehensive, single, cohesive answer to the user's question based on the evidence you have gathered.
         
@@ -73,7 +131,7 @@ class CoreInvestigationAgent:
         ---
 
         Synthesize this evidence into a final, user-friendly answer.
-        - If you have a `sql_data` payload, present the key findings from it.
+        - If you have a `sql_data` payload, present the key findings from it. If it holds statistics (row_count, column_stats, group_totals) rather than every row, base totals and comparisons on those statistics.
         - If you have a `chart_definition` payload, introduce the chart in your answer (e.g., "Here is a breakdown of...").
         - If you have a `vector_search_context`, use it to provide a summary.
         - If a tool returned an error, state that you were unable to retrieve that specific piece of information and mention the error.
@@ -83,54 +141,188 @@ class CoreInvestigationAgent:
         """
         return prompt
 
-    async def process_query(self, user_question: str, conversation_history: Optional[List[Dict[str, Any]]] = None) -> dict:
-        print(f"PLANNER: Received question: '{user_question}'")
+    async def _generate_text(self, prompt: str, stream: bool) -> AsyncIterator[str]:
+        """Yields the completion token by token when streaming, otherwise as a single chunk."""
+        if stream:
+            async for token in self.llm.stream_response(prompt):
+                yield token
+        else:
+            yield await self.llm.generate_response(prompt)
+
+    async def _run_pipeline(self, user_question: str, conversation_history: Optional[List[Dict[str, Any]]], stream: bool,
+                            columnar: bool = False, user_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs route -> SQL -> chart -> synthesis and yields an event after each stage.
+        The last event is always 'done' and carries the full response dictionary, including
+        per-stage timings in milliseconds. With columnar=True its data_payload is a
+        ColumnarResult that the caller serializes, and rows are never turned into dicts.
+
+        In speculative mode SQL generation starts together with routing (and is cancelled if the
+        question turns out to be conversational), and the chart is chosen while synthesis runs.
+        """
+        log.info("Received question", extra={"question": user_question})
         evidence = {} 
+        timings: Dict[str, float] = {}
+        pipeline_start = time.perf_counter()
+        speculative = AGENT_EXECUTION_MODE == "speculative"
 
-        routing_prompt = self._create_routing_prompt(user_question)
-        route = await self.llm.generate_response(routing_prompt)
+        async def _timed(stage: str, coro):
+            with span(stage) as stage_span:
+                try:
+                    return await coro
+                finally:
+                    timings[stage] = round((time.perf_counter() - stage_span.start) * 1000, 1)
 
-        if "GENERAL_CONVERSATION" in route:
-            print("PLANNER: Routing to general conversation.")
-            general_prompt = f"The user said: '{user_question}'. Provide a brief, friendly response."
-            response_text = await self.llm.generate_response(general_prompt)
-            return {"response_text": response_text, "data_sources": ["General Conversation"], "data_payload": None, "chart_payload": None}
+        # Stage tasks run concurrently with this generator; if it is closed early (a streaming client
+        # disconnects) or fails, they are cancelled rather than left running for nobody.
+        sql_task = None
+        chart_task = None
+        try:
+            if speculative:
+                sql_task = asyncio.create_task(_timed("sql_generation", generate_sql(user_question, self.db_schema, self.llm, self.sql_cache, self.schema_linker)))
 
-        print("PLANNER: Routing to data query. Starting evidence gathering.")
-        
-        # --- MODIFIED: The SQL tool call now passes the cached schema ---
-        sql_evidence = await sql_search_tool(user_question, self.db_schema, self.db, self.llm)
-        
-        if sql_evidence and not sql_evidence.get("error"):
-            evidence["sql_data"] = sql_evidence.get("results")
-            evidence["data_sources"] = [sql_evidence.get("sql_query")]
+            route = await _timed("routing", self._route(user_question))
+
+            if route == GENERAL_CONVERSATION:
+                log.info("Routed", extra={"route": GENERAL_CONVERSATION})
+                if sql_task is not None:
+                    sql_task.cancel()
+                    await asyncio.gather(sql_task, return_exceptions=True)
+                    timings.pop("sql_generation", None)
+                yield {"event": "routed", "data": {"route": "GENERAL_CONVERSATION"}}
+                general_prompt = f"The user said: '{user_question}'. Provide a brief, friendly response."
+                parts = []
+                synthesis_start = time.perf_counter()
+                async for token in self._generate_text(general_prompt, stream):
+                    parts.append(token)
+                    if stream:
+                        yield {"event": "token", "data": {"text": token}}
+                # Timed by hand: a span cannot stay open across the yields of this generator.
+                record_span("synthesis", time.perf_counter() - synthesis_start)
+                timings["synthesis"] = round((time.perf_counter() - synthesis_start) * 1000, 1)
+                timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+                response_text = "".join(parts).strip()
+                yield {"event": "done", "data": {"response_text": response_text, "data_sources": ["General Conversation"], "data_payload": None, "chart_payload": None, "stage_timings": timings}}
+                return
+
+            log.info("Routed", extra={"route": DATA_QUERY})
+            yield {"event": "routed", "data": {"route": "DATA_QUERY"}}
 
-            data_for_chart = evidence.get("sql_data")
-            if data_for_chart:
-                graph_evidence = await graphing_tool(user_question, data_for_chart, self.llm)
+            # --- MODIFIED: The SQL tool call now passes the cached schema ---
+            if sql_task is not None:
+                sql_evidence = await sql_task
+            else:
+                sql_evidence = await _timed("sql_generation", generate_sql(user_question, self.db_schema, self.llm, self.sql_cache, self.schema_linker))
+            cache_status = {"sql_cache": sql_evidence.get("sql_cache", "miss")}
+            if not sql_evidence.get("error"):
+                yield {"event": "sql_generated", "data": {"sql_query": sql_evidence["sql_query"], "sql_cache": cache_status["sql_cache"]}}
+                generated = sql_evidence
+                sql_evidence = await _timed("sql_execution", run_sql(generated["sql_query"], self.db, self.catalog, columnar=columnar, guard=self.sql_guard,
+                                                                         user_id=user_id))
+                if not sql_evidence.get("error"):
+                    await remember_sql(user_question, self.db_schema, generated, self.sql_cache)
+                    cache_status["result_cache"] = sql_evidence.get("result_cache")
+            if self.sql_cache is not None:
+                cache_status["sql_cache_stats"] = self.sql_cache.get_stats()
+            if self.db.result_cache is not None:
+                cache_status["result_cache_stats"] = self.db.result_cache.get_stats()
+
+            sql_result = None
+            if sql_evidence and not sql_evidence.get("error"):
+                sql_result = sql_evidence.get("results")
+                evidence["sql_data"] = sql_result.to_json_shape() if isinstance(sql_result, ColumnarResult) else sql_result
+                evidence["data_sources"] = [sql_evidence.get("sql_query")]
+                result_handle = sql_evidence.get("result_handle")
+                if result_handle and result_handle["truncated"]:
+                    evidence["sql_data_note"] = f"Only the first {result_handle['row_cap']} rows of a larger result are included."
+                yield {"event": "rows_fetched", "data": {"row_count": len(sql_result or []), "data_payload": evidence["sql_data"], "result_handle": result_handle}}
+
+                if sql_result:
+                    chart_task = asyncio.create_task(_timed("charting", graphing_tool(user_question, sql_result, self.llm)))
+                    if not speculative:
+                        # Sequential mode: the chart is known before synthesis, so the answer can introduce it.
+                        graph_evidence = await chart_task
+                        chart_task = None
+                        if graph_evidence and graph_evidence.get("chart_definition", {}).get("chart_type") != "none":
+                            evidence["chart_definition"] = graph_evidence.get("chart_definition")
+                            yield {"event": "chart_ready", "data": {"chart_payload": {"definition": evidence["chart_definition"], "data": evidence["sql_data"]}}}
+            else:
+                log.warning("SQL tool failed", extra={"error": sql_evidence.get("error")})
+                # Add the error message from the failed SQL tool to the evidence
+                evidence["sql_tool_error"] = sql_evidence.get("error", "Unknown SQL tool error")
+                yield {"event": "sql_failed", "data": {"error": evidence["sql_tool_error"]}}
+
+                # --- RE-ENABLE THE FALLBACK TOOL ---
+                vector_evidence = await _timed("vector_search", vector_search_tool(user_question, self.db, self.llm))
+                evidence["vector_search_context"] = vector_evidence.get("context")
+                evidence["data_sources"] = vector_evidence.get("sources", [])
+                yield {"event": "context_retrieved", "data": {"data_sources": evidence["data_sources"]}}
+
+            def _chart_event():
+                """Collects a finished concurrent chart task into the evidence; returns its event, if any."""
+                graph_evidence = chart_task.result()
                 if graph_evidence and graph_evidence.get("chart_definition", {}).get("chart_type") != "none":
                     evidence["chart_definition"] = graph_evidence.get("chart_definition")
-        else:
-            print("PLANNER: SQL tool failed or returned error.")
-            # Add the error message from the failed SQL tool to the evidence
-            evidence["sql_tool_error"] = sql_evidence.get("error", "Unknown SQL tool error")
-            
-            # --- RE-ENABLE THE FALLBACK TOOL ---
-            vector_evidence = await vector_search_tool(user_question, self.db, self.llm)
-            evidence["vector_search_context"] = vector_evidence.get("context")
-            evidence["data_sources"] = vector_evidence.get("sources", [])
-
-
-        print(f"PLANNER: Synthesizing final answer from evidence: {list(evidence.keys())}")
-        synthesis_prompt = self._create_synthesis_prompt(user_question, evidence)
-        final_answer = await self.llm.generate_response(synthesis_prompt)
-
-        return {
-            "response_text": final_answer,
-            "data_sources": evidence.get("data_sources", []),
-            "data_payload": evidence.get("sql_data"),
-            "chart_payload": {
-                "definition": evidence.get("chart_definition"),
-                "data": evidence.get("sql_data")
-            } if evidence.get("chart_definition") else None
-        }
\ No newline at end of file
+                    return {"event": "chart_ready", "data": {"chart_payload": {"definition": evidence["chart_definition"], "data": evidence["sql_data"]}}}
+                return None
+
+            # Packing and token counting are CPU work on up to SQL_ROW_CAP rows, so they run off the event loop.
+            synthesis_prompt = await asyncio.to_thread(self._create_synthesis_prompt, user_question, evidence)
+            log.info("Synthesizing answer", extra={"evidence": list(evidence.keys()),
+                                                   "prompt_tokens": await asyncio.to_thread(count_tokens, synthesis_prompt)})
+            parts = []
+            synthesis_start = time.perf_counter()
+            async for token in self._generate_text(synthesis_prompt, stream):
+                parts.append(token)
+                if stream:
+                    yield {"event": "token", "data": {"text": token}}
+                    # Send the chart the moment it is ready rather than after the last token.
+                    if chart_task is not None and chart_task.done():
+                        chart_event = _chart_event()
+                        chart_task = None
+                        if chart_event:
+                            yield chart_event
+            record_span("synthesis", time.perf_counter() - synthesis_start)
+            timings["synthesis"] = round((time.perf_counter() - synthesis_start) * 1000, 1)
+            final_answer = "".join(parts).strip()
+
+            if chart_task is not None:
+                await asyncio.gather(chart_task, return_exceptions=True)
+                chart_event = _chart_event()
+                if chart_event:
+                    yield chart_event
+            timings["total"] = round((time.perf_counter() - pipeline_start) * 1000, 1)
+            log.info("Query answered", extra={"stage_timings": timings})
+
+            yield {"event": "done", "data": {
+                "response_text": final_answer,
+                "data_sources": evidence.get("data_sources", []),
+                "data_payload": sql_result,
+                "chart_payload": {
+                    "definition": evidence.get("chart_definition"),
+                    "data": sql_result
+                } if evidence.get("chart_definition") else None,
+                "result_handle": sql_evidence.get("result_handle") if sql_evidence else None,
+                "cache_status": cache_status,
+                "stage_timings": timings
+            }}
+        finally:
+            for task in (sql_task, chart_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def process_query(self, user_question: str, conversation_history: Optional[List[Dict[str, Any]]] = None, columnar: bool = False,
+                            user_id: Optional[str] = None) -> dict:
+        result = {}
+        async for event in self._run_pipeline(user_question, conversation_history, stream=False, columnar=columnar, user_id=user_id):
+            if event["event"] == "done":
+                result = event["data"]
+        return result
+
+    async def process_query_stream(self, user_question: str, conversation_history: Optional[List[Dict[str, Any]]] = None,
+                                   user_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Same pipeline as process_query, but yields progress events and synthesis tokens as they happen."""
+        # Closing this generator closes the pipeline at once, which cancels its running stages.
+        async with aclosing(self._run_pipeline(user_question, conversation_history, stream=True, user_id=user_id)) as events:
+            async for event in events:
+                yield event
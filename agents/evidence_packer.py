@@ -0,0 +1,153 @@
+# File: agents/evidence_packer.py
+# Fits the synthesis evidence into a token budget: small results go in verbatim, large ones are
+# replaced by vectorized summary statistics plus the first few rows.
+
+import json
+import re
+from numbers import Number
+from typing import List, Dict, Any, Union
+
+import numpy as np
+
+from core.config import SYNTHESIS_TOKEN_BUDGET, SYNTHESIS_TOP_K_ROWS
+from database.columnar import ColumnarResult, column_values
+from llm.tokenizer import count_tokens
+
+# Codes and identifiers are numeric but summing them means nothing.
+_IDENTIFIER_NAME = re.compile(r"(^|_)(CD|CODE|ID|NUM|NO|NUMBER)$", re.IGNORECASE)
+# Categories listed per column, and groups listed in group totals.
+_TOP_VALUES = 5
+_TOP_GROUPS = 15
+# Longer text values (FIR_CONTENTS and other CLOBs) are cut to this many characters in summaries.
+_MAX_VALUE_CHARS = 200
+
+
+def _compact(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _numeric_array(values: list):
+    """float64 array if every non-null value is a number (bools excluded), else None."""
+    present = [v for v in values if v is not None]
+    if not present or not all(isinstance(v, Number) and not isinstance(v, bool) for v in present):
+        return None
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _truncate(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _MAX_VALUE_CHARS:
+        return value[:_MAX_VALUE_CHARS] + "..."
+    return value
+
+
+def _round(value: float) -> Union[int, float]:
+    return int(value) if float(value).is_integer() else round(float(value), 4)
+
+
+def summarize_result(data: Union[List[Dict[str, Any]], ColumnarResult], top_k: int = SYNTHESIS_TOP_K_ROWS) -> Dict[str, Any]:
+    """
+    Summarizes a query result: row count, the first top_k rows, per-column statistics
+    (min/max/sum/mean for numbers, distinct count and most common values otherwise) and, when the
+    result has one label column and numeric columns, totals per label.
+    """
+    columns = column_values(data)
+    row_count = len(data)
+    stats: Dict[str, Dict[str, Any]] = {}
+    numeric: Dict[str, np.ndarray] = {}
+    labels: Dict[str, np.ndarray] = {}
+
+    for name, values in columns.items():
+        array = _numeric_array(values)
+        nulls = sum(v is None for v in values)
+        if array is not None:
+            numeric[name] = array
+            stats[name] = {
+                "min": _round(np.nanmin(array)), "max": _round(np.nanmax(array)),
+                "sum": _round(np.nansum(array)), "mean": _round(np.nanmean(array)),
+                "nulls": nulls,
+            }
+        elif nulls < len(values):
+            text = np.array(["" if v is None else str(v) for v in values], dtype=object)
+            uniques, counts = np.unique(text, return_counts=True)
+            order = np.argsort(-counts)[:_TOP_VALUES]
+            stats[name] = {
+                "distinct": int(len(uniques)),
+                "most_common": {_truncate(str(uniques[i])): int(counts[i]) for i in order},
+                "nulls": nulls,
+            }
+            labels[name] = text
+
+    first_rows = data.to_rows(top_k) if isinstance(data, ColumnarResult) else list(data[:top_k])
+    summary: Dict[str, Any] = {
+        "row_count": row_count,
+        "column_stats": stats,
+        "first_rows": [{name: _truncate(value) for name, value in row.items()} for row in first_rows],
+    }
+
+    if len(labels) == 1 and numeric:
+        label_name, label_values = next(iter(labels.items()))
+        groups, inverse = np.unique(label_values, return_inverse=True)
+        measures = {name: array for name, array in numeric.items() if not _IDENTIFIER_NAME.search(name)}
+        if len(groups) < row_count and measures:
+            totals = {name: np.bincount(inverse, weights=np.nan_to_num(array), minlength=len(groups)) for name, array in measures.items()}
+            first = next(iter(totals))
+            order = np.argsort(-totals[first])[:_TOP_GROUPS]
+            summary["group_totals"] = {
+                "by": label_name,
+                "groups": [{label_name: str(groups[i]), **{name: _round(total[i]) for name, total in totals.items()}} for i in order],
+                "group_count": int(len(groups)),
+            }
+    return summary
+
+
+def pack_evidence(evidence: Dict[str, Any], token_budget: int = SYNTHESIS_TOKEN_BUDGET) -> Dict[str, Any]:
+    """
+    Returns a copy of the evidence that fits the token budget (compact JSON). sql_data is kept
+    verbatim if it fits, otherwise summarized with fewer and fewer sample rows, then without
+    group totals and column statistics, down to the row count; retrieved RAG context is
+    truncated last.
+    """
+    packed = dict(evidence)
+    if count_tokens(_compact(packed)) <= token_budget:
+        return packed
+
+    data = packed.get("sql_data")
+    if isinstance(data, dict) and "columns" in data and "rows" in data:
+        # Columnar JSON shape from a columnar request.
+        data = ColumnarResult(data["columns"], data.get("types", []), [list(v) for v in zip(*data["rows"])] if data["rows"] else [[] for _ in data["columns"]])
+    if data:
+        top_k = SYNTHESIS_TOP_K_ROWS
+        summary = summarize_result(data, top_k)
+        packed["sql_data"] = summary
+        packed["sql_data_note"] = " ".join(filter(None, [
+            packed.get("sql_data_note"),
+            f"The result has {summary['row_count']} rows; sql_data holds statistics and the first rows, not every row.",
+        ]))
+        while count_tokens(_compact(packed)) > token_budget and summary["first_rows"]:
+            top_k //= 2
+            summary["first_rows"] = summary["first_rows"][:top_k]
+        if count_tokens(_compact(packed)) > token_budget and "group_totals" in summary:
+            summary["group_totals"]["groups"] = summary["group_totals"]["groups"][:5]
+        # Still too large: give up detail, least useful first, until it fits.
+        for reduce in (
+            lambda: [column.pop("most_common", None) for column in summary["column_stats"].values()],
+            lambda: summary.pop("group_totals", None),
+            lambda: summary.pop("column_stats", None),
+        ):
+            if count_tokens(_compact(packed)) <= token_budget:
+                break
+            reduce()
+
+    context = packed.get("vector_search_context")
+    if isinstance(context, str):
+        overflow = count_tokens(_compact(packed)) - token_budget
+        if overflow > 0:
+            # Characters per token in this text, to cut roughly the right amount in one step.
+            ratio = max(1.0, len(context) / max(1, count_tokens(context)))
+            packed["vector_search_context"] = context[:max(0, len(context) - int(overflow * ratio) - 16)] + " [truncated]"
+    return packed
+
+
+def evidence_json(evidence: Dict[str, Any]) -> str:
+    """Compact JSON for the prompt (indentation costs tokens without helping the model)."""
+    return _compact(evidence)
@@ -0,0 +1,119 @@
+# File: agents/router.py
+# Local DATA_QUERY / GENERAL_CONVERSATION router, so most questions skip the LLM routing call.
+
+import re
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import ROUTER_CONFIDENCE_THRESHOLD
+
+DATA_QUERY = "DATA_QUERY"
+GENERAL_CONVERSATION = "GENERAL_CONVERSATION"
+
+# Labelled example utterances; each label's centroid is the mean of their embeddings.
+EXAMPLE_UTTERANCES: Dict[str, List[str]] = {
+    DATA_QUERY: [
+        "how many cases were registered in 2023",
+        "cases by district for 2023",
+        "district wise cases 2023",
+        "list all convicted cases out of registered cases by district",
+        "show me thefts in Guntur last year",
+        "how many FIRs were filed at each police station",
+        "number of arrests this month",
+        "which district has the most murders",
+        "trend of crimes against women over the last five years",
+        "give me details of FIR number 1234",
+        "similar cases to chain snatching near the bus stand",
+        "top 10 police stations by pending investigations",
+        "how many accused were convicted in 2022",
+        "show cases assigned to investigating officer",
+        "breakdown of crimes by type",
+        "compare property theft values across districts",
+        "what happened in the case registered yesterday",
+    ],
+    GENERAL_CONVERSATION: [
+        "hello",
+        "hi there",
+        "good morning",
+        "thank you",
+        "thanks a lot, that helps",
+        "what can you do",
+        "who are you",
+        "how do I use this",
+        "help",
+        "what is your purpose",
+        "bye",
+        "ok great",
+        "how are you today",
+        "can you explain what this assistant is for",
+    ],
+}
+
+# Words that only make sense when asking for police data.
+_DATA_KEYWORDS = re.compile(
+    r"\b(case|cases|crime|crimes|fir|firs|arrest\w*|accused|convict\w*|district\w*|police station\w*|"
+    r"ps|officer\w*|theft\w*|murder\w*|robber\w*|assault\w*|complain\w*|victim\w*|investigat\w*|"
+    r"registered|charge ?sheet\w*|count|how many|number of|list|show|top \d+)\b",
+    re.IGNORECASE,
+)
+# Short messages that are purely social.
+_GENERAL_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|good (morning|afternoon|evening)|thanks?( you)?( so much| a lot)?|ok(ay)?|"
+    r"bye|goodbye|who are you|what can you do|help)\W*$",
+    re.IGNORECASE,
+)
+
+
+class LocalRouter:
+    """
+    Routes a question with keyword rules first, then nearest-centroid over the example utterances.
+    Confidence is the cosine-similarity margin between the two centroids; below the threshold the
+    caller should fall back to the LLM router.
+    """
+
+    def __init__(self, embed: Callable[[List[str]], np.ndarray], confidence_threshold: float = ROUTER_CONFIDENCE_THRESHOLD):
+        self.embed = embed
+        self.confidence_threshold = confidence_threshold
+        self._centroids: Optional[Dict[str, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self.stats = {"rule": 0, "embedding": 0, "llm_fallback": 0, "shadow_agree": 0, "shadow_disagree": 0}
+
+    def _get_centroids(self) -> Dict[str, np.ndarray]:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    centroids = {}
+                    for label, examples in EXAMPLE_UTTERANCES.items():
+                        vectors = self._normalize(np.asarray(self.embed(examples), dtype=np.float32))
+                        centroids[label] = self._normalize(vectors.mean(axis=0, keepdims=True))[0]
+                    self._centroids = centroids
+        return self._centroids
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def route(self, question: str) -> Tuple[str, float, str]:
+        """Returns (label, confidence, method) where method is 'rule' or 'embedding'."""
+        if _GENERAL_PATTERN.match(question):
+            return GENERAL_CONVERSATION, 1.0, "rule"
+        if _DATA_KEYWORDS.search(question) or re.search(r"\b(19|20)\d{2}\b", question):
+            return DATA_QUERY, 1.0, "rule"
+
+        centroids = self._get_centroids()
+        query = self._normalize(np.asarray(self.embed([question]), dtype=np.float32))[0]
+        data_sim = float(query @ centroids[DATA_QUERY])
+        general_sim = float(query @ centroids[GENERAL_CONVERSATION])
+        label = DATA_QUERY if data_sim >= general_sim else GENERAL_CONVERSATION
+        return label, abs(data_sim - general_sim), "embedding"
+
+    def is_confident(self, confidence: float) -> bool:
+        return confidence >= self.confidence_threshold
+
+    def record(self, method: str, shadow_agreed: Optional[bool] = None):
+        with self._lock:
+            self.stats[method] += 1
+            if shadow_agreed is not None:
+                self.stats["shadow_agree" if shadow_agreed else "shadow_disagree"] += 1
@@ -0,0 +1,204 @@
+# File: agents/schema_linker.py
+# Trims the CREATE TABLE schema sent to the SQL prompt down to the tables and columns a question needs.
+
+import re
+import threading
+from typing import Callable, List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from core.config import SCHEMA_LINK_TOKEN_BUDGET, SCHEMA_LINK_TABLE_MARGIN
+from core.tracing import get_logger
+from llm.tokenizer import estimate_tokens
+
+log = get_logger("schema_linker")
+
+# Abbreviations used in the police schema, expanded so column names embed closer to plain questions.
+_ABBREVIATIONS = {
+    "CD": "code", "DT": "date", "NUM": "number", "NO": "number", "REG": "registration", "PS": "police station",
+    "IO": "investigating officer", "FIR": "first information report case", "DIST": "district", "COMPL": "complaint",
+    "PROP": "property", "CHK": "flag", "GD": "general diary", "SRNO": "serial number", "OTH": "other",
+    "DESC": "description", "SRC": "source", "INFORM": "information", "RECV": "received", "DTH": "death",
+    "SCST": "scheduled caste tribe", "YR": "year", "CNT": "count", "AMT": "amount", "ADDR": "address",
+}
+_CREATE_TABLE = re.compile(r"CREATE\s+TABLE\s+(\w+)\s*\((.*?)\n\);", re.IGNORECASE | re.DOTALL)
+
+
+def parse_schema(db_schema: str) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Splits the CREATE TABLE text produced by get_schema_string_for_tables / schema_checker.py into
+    {table: [{"name", "definition", "comment"}, ...]} in column order.
+    """
+    tables = {}
+    for table_name, body in _CREATE_TABLE.findall(db_schema):
+        columns = []
+        for line in body.strip().splitlines():
+            definition, _, comment = line.strip().partition("--")
+            definition = definition.strip().rstrip(",").strip()
+            if not definition:
+                continue
+            columns.append({"name": definition.split()[0].upper(), "definition": definition, "comment": comment.strip()})
+        tables[table_name.upper()] = columns
+    return tables
+
+
+def _describe(table_name: str, column: Dict[str, str]) -> str:
+    words = [_ABBREVIATIONS.get(part, part.lower()) for part in column["name"].split("_") if part]
+    table_words = [_ABBREVIATIONS.get(part, part.lower()) for part in table_name.split("_")[1:] if part]
+    text = f"{' '.join(words)} of {' '.join(table_words)}"
+    return f"{text}: {column['comment']}" if column["comment"] else text
+
+
+class SchemaLinker:
+    """
+    Ranks tables and columns against a question by embedding similarity, expands the selection
+    along the join graph (columns shared between tables, such as DISTRICT_CD), and renders the
+    best columns as trimmed DDL within a token budget.
+    """
+
+    def __init__(self, db_schema: str, embed: Callable[[List[str]], np.ndarray],
+                 foreign_keys: Optional[List[Tuple[str, str, str, str]]] = None,
+                 token_budget: int = SCHEMA_LINK_TOKEN_BUDGET, table_margin: float = SCHEMA_LINK_TABLE_MARGIN):
+        self.embed = embed
+        self.token_budget = token_budget
+        self.table_margin = table_margin
+        self._lock = threading.Lock()
+        self.set_schema(db_schema, foreign_keys)
+
+    def set_schema(self, db_schema: str, foreign_keys: Optional[List[Tuple[str, str, str, str]]] = None):
+        """
+        Replaces the schema being linked. foreign_keys, when known, is a list of
+        (table, column, referenced_table, referenced_column); otherwise joins are inferred from
+        key-like column names that appear in more than one table.
+        """
+        tables = parse_schema(db_schema)
+        joins: Dict[str, Dict[str, List[Tuple[str, str]]]] = {table: {} for table in tables}
+        if foreign_keys:
+            for table, column, ref_table, ref_column in foreign_keys:
+                if table in tables and ref_table in tables:
+                    joins[table].setdefault(ref_table, []).append((column, ref_column))
+                    joins[ref_table].setdefault(table, []).append((ref_column, column))
+        else:
+            names = {table: {c["name"] for c in columns} for table, columns in tables.items()}
+            for table in tables:
+                for other in tables:
+                    if other == table:
+                        continue
+                    shared = sorted(c for c in names[table] & names[other] if re.search(r"_(CD|NUM|ID)$", c))
+                    if shared:
+                        joins[table][other] = [(c, c) for c in shared]
+        with self._lock:
+            self.db_schema = db_schema
+            self.tables = tables
+            self.joins = joins
+            self._column_keys: List[Tuple[str, Dict[str, str]]] = [(t, c) for t, cols in tables.items() for c in cols]
+            self._column_vectors: Optional[np.ndarray] = None
+            self._table_vectors: Optional[np.ndarray] = None
+
+    def _ensure_vectors(self):
+        if self._column_vectors is not None:
+            return
+        with self._lock:
+            if self._column_vectors is not None:
+                return
+            texts = [_describe(table, column) for table, column in self._column_keys]
+            table_texts = [" ".join(_ABBREVIATIONS.get(p, p.lower()) for p in t.split("_")[1:]) for t in self.tables]
+            self._table_vectors = self._normalize(np.asarray(self.embed(table_texts), dtype=np.float32)) if table_texts else np.zeros((0, 1), dtype=np.float32)
+            self._column_vectors = self._normalize(np.asarray(self.embed(texts), dtype=np.float32)) if texts else np.zeros((0, 1), dtype=np.float32)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _connect(self, selected: List[str]) -> List[str]:
+        """Adds the tables on the shortest join path from the best table to every other selected table."""
+        result = list(selected)
+        root = selected[0]
+        for target in selected[1:]:
+            previous = {root: None}
+            frontier = [root]
+            while frontier and target not in previous:
+                next_frontier = []
+                for table in frontier:
+                    for neighbour in self.joins.get(table, {}):
+                        if neighbour not in previous:
+                            previous[neighbour] = table
+                            next_frontier.append(neighbour)
+                frontier = next_frontier
+            step = previous.get(target)
+            while step is not None and step != root:
+                if step not in result:
+                    result.append(step)
+                step = previous[step]
+        return result
+
+    def link(self, user_question: str) -> Dict[str, Any]:
+        """
+        Returns {"schema", "tables", "columns", "tokens_before", "tokens_after"} for the question.
+        Falls back to the full schema if it cannot be parsed.
+        """
+        tokens_before = estimate_tokens(self.db_schema)
+        if not self._column_keys:
+            return {"schema": self.db_schema, "tables": [], "columns": 0, "tokens_before": tokens_before, "tokens_after": tokens_before}
+        self._ensure_vectors()
+
+        question = self._normalize(np.asarray(self.embed([user_question]), dtype=np.float32))[0]
+        question_words = set(re.findall(r"[a-z]+", user_question.lower()))
+        column_scores = self._column_vectors @ question
+        table_names = list(self.tables)
+        table_scores = dict(zip(table_names, (self._table_vectors @ question).tolist()))
+
+        # A question word matching a column-name part (e.g. "district" -> DISTRICT) is a strong signal.
+        for i, (table, column) in enumerate(self._column_keys):
+            if question_words & {part.lower() for part in column["name"].split("_")}:
+                column_scores[i] += 0.2
+        for i, (table, _) in enumerate(self._column_keys):
+            table_scores[table] = max(table_scores[table], float(column_scores[i]))
+
+        ranked_tables = sorted(table_names, key=table_scores.get, reverse=True)
+        best = table_scores[ranked_tables[0]]
+        selected = [t for t in ranked_tables if table_scores[t] >= best - self.table_margin]
+        selected = self._connect(selected)
+
+        # Join keys are always kept so the selected tables can be joined.
+        keep = {table: set() for table in selected}
+        for table in selected:
+            for other, pairs in self.joins.get(table, {}).items():
+                if other in selected:
+                    keep[table].update(column for column, _ in pairs)
+            if self.tables[table]:
+                keep[table].add(self.tables[table][0]["name"])
+
+        def render() -> str:
+            parts = []
+            for table in selected:
+                lines = []
+                for column in self.tables[table]:
+                    if column["name"] in keep[table]:
+                        lines.append(f"    {column['definition']}," + (f" -- {column['comment']}" if column["comment"] else ""))
+                if lines:
+                    last, _, comment = lines[-1].partition(", -- ")
+                    lines[-1] = last.rstrip(",") + (f" -- {comment}" if comment else "")
+                parts.append(f"CREATE TABLE {table} (\n" + "\n".join(lines) + "\n);")
+            return "\n\n".join(parts)
+
+        # Add the remaining columns of the selected tables best-first until the budget is spent.
+        schema = render()
+        for i in np.argsort(-column_scores):
+            table, column = self._column_keys[i]
+            if table not in keep or column["name"] in keep[table]:
+                continue
+            keep[table].add(column["name"])
+            candidate = render()
+            if estimate_tokens(candidate) > self.token_budget:
+                keep[table].discard(column["name"])
+                break
+            schema = candidate
+
+        tokens_after = estimate_tokens(schema)
+        column_count = sum(len(columns) for columns in keep.values())
+        log.info("Schema linked", extra={
+            "tables": f"{len(selected)}/{len(self.tables)}", "columns": f"{column_count}/{len(self._column_keys)}",
+            "tokens_before": tokens_before, "tokens_after": tokens_after,
+        })
+        return {"schema": schema, "tables": selected, "columns": column_count, "tokens_before": tokens_before, "tokens_after": tokens_after}
@@ -0,0 +1,226 @@
+# File: agents/sql_cache.py
+# Semantic cache for generated SQL, consulted before asking the LLM to write a query.
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from core.tracing import get_logger
+from core.config import (
+    SQL_CACHE_MAX_ENTRIES, SQL_CACHE_TTL_SECONDS,
+    SQL_CACHE_SIMILARITY_THRESHOLD, SQL_CACHE_PATH,
+)
+
+log = get_logger("sql_cache")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases and strips punctuation so trivially different spellings share a cache key."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return re.sub(r"\s+", " ", question).strip()
+
+
+def _numbers(question: str) -> List[str]:
+    # Years, counts and codes change the query; two questions only match if they agree on them.
+    return sorted(re.findall(r"\d+", question))
+
+
+# Words that only phrase a question. Paraphrases may differ in these; any other word (a district,
+# an offence, a name) changes the query, however close the embeddings are.
+_PHRASING_WORDS = frozenset("""
+    a about all an and any are as at be by can could do does for from get give had has have how i
+    in is it list many me much my number numbers of on or please show shows tell than that the
+    their there these this those to total count counts was were what which who whose with would you
+    find display fetch return see want need know let lets
+    case cases fir firs crime crimes record records registered register reported report
+""".split())
+
+
+def _entity_tokens(question: str) -> List[str]:
+    """The words of a normalized question that are not phrasing, singularized, e.g. ['guntur', 'theft']."""
+    tokens = {word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+              for word in question.split()}
+    return sorted(token for token in tokens if token not in _PHRASING_WORDS and not token.isdigit())
+
+
+class SemanticSqlCache:
+    """
+    Two-tier cache of question -> SQL.
+
+    Entries are scoped to the current date (questions like "this year" depend on it) and a hash
+    of the schema prompt. The exact tier matches the normalized question; the semantic tier
+    matches a paraphrase whose embedding is within the similarity threshold and which mentions
+    the same numbers and the same non-phrasing words (so "thefts in Guntur" never answers
+    "thefts in Krishna"). Eviction is LRU with a TTL.
+    """
+
+    def __init__(
+        self,
+        embed: Optional[Callable[[List[str]], np.ndarray]] = None,
+        max_entries: int = SQL_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = SQL_CACHE_TTL_SECONDS,
+        similarity_threshold: float = SQL_CACHE_SIMILARITY_THRESHOLD,
+        persist_path: str = SQL_CACHE_PATH,
+    ):
+        self.embed = embed
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_hash_memo = (None, None)
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if self.persist_path:
+            self._load()
+        log.info("SQL cache initialized", extra={"max_entries": max_entries, "ttl_seconds": ttl_seconds, "threshold": similarity_threshold})
+
+    # --- Keys ---
+
+    def _schema_hash(self, db_schema: str) -> str:
+        schema, digest = self._schema_hash_memo
+        if schema is not db_schema:
+            digest = hashlib.sha256(db_schema.encode("utf-8")).hexdigest()[:16]
+            self._schema_hash_memo = (db_schema, digest)
+        return digest
+
+    def _scope(self, db_schema: str) -> str:
+        return f"{date.today().isoformat()}:{self._schema_hash(db_schema)}"
+
+    # --- Public API ---
+
+    def lookup(self, question: str, db_schema: str) -> Optional[Dict[str, str]]:
+        """Returns {"sql", "status"} with status 'hit_exact' or 'hit_semantic', or None on a miss."""
+        scope = self._scope(db_schema)
+        normalized = normalize_question(question)
+        key = f"{scope}|{normalized}"
+        now = time.time()
+        numbers, entities = _numbers(normalized), _entity_tokens(normalized)
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["exact_hits"] += 1
+                return {"sql": entry["sql"], "status": "hit_exact"}
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if e["scope"] == scope and e["numbers"] == numbers and e["entities"] == entities and e["embedding"] is not None
+            ]
+
+        if self.embed is not None and candidates and self.similarity_threshold < 1.0:
+            query_vec = self._embed_one(normalized)
+            matrix = np.stack([e["embedding"] for _, e in candidates])
+            similarities = matrix @ query_vec
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                best_key, best_entry = candidates[best]
+                with self._lock:
+                    if best_key in self._entries:
+                        self._entries.move_to_end(best_key)
+                    self.stats["semantic_hits"] += 1
+                log.info("Paraphrase hit", extra={"similarity": round(float(similarities[best]), 3), "question": question})
+                return {"sql": best_entry["sql"], "status": "hit_semantic"}
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, question: str, db_schema: str, sql: str):
+        """Caches SQL that executed successfully for this question."""
+        scope = self._scope(db_schema)
+        normalized = normalize_question(question)
+        key = f"{scope}|{normalized}"
+        embedding = self._embed_one(normalized) if self.embed is not None else None
+        entry = {
+            "scope": scope,
+            "question": normalized,
+            "numbers": _numbers(normalized),
+            "entities": _entity_tokens(normalized),
+            "sql": sql,
+            "created": time.time(),
+            "embedding": embedding,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.stats["evictions"] += 1
+        if self.persist_path:
+            self._persist(key, entry, evicted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["semantic_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    # --- Internals ---
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embed([text])[0], dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _expire(self, now: float):
+        # Entries are in LRU order, not age order, so scan; the cache is small.
+        expired = [k for k, e in self._entries.items() if now - e["created"] > self.ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.persist_path)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sql_cache ("
+            "key TEXT PRIMARY KEY, scope TEXT, question TEXT, sql TEXT, created REAL, embedding BLOB)"
+        )
+        return conn
+
+    def _load(self):
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM sql_cache WHERE created < ?", (cutoff,))
+                rows = conn.execute(
+                    "SELECT key, scope, question, sql, created, embedding FROM sql_cache ORDER BY created DESC LIMIT ?",
+                    (self.max_entries,),
+                ).fetchall()
+        except sqlite3.Error as e:
+            log.warning("Could not load persisted SQL cache", extra={"path": self.persist_path, "error": str(e)})
+            return
+        for key, scope, question, sql, created, embedding in reversed(rows):
+            self._entries[key] = {
+                "scope": scope,
+                "question": question,
+                "numbers": _numbers(question),
+                "entities": _entity_tokens(question),
+                "sql": sql,
+                "created": created,
+                "embedding": np.frombuffer(embedding, dtype=np.float32) if embedding else None,
+            }
+        log.info("Loaded persisted SQL cache", extra={"entries": len(rows)})
+
+    def _persist(self, key: str, entry: Dict[str, Any], evicted: List[str]):
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sql_cache (key, scope, question, sql, created, embedding) VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, entry["scope"], entry["question"], entry["sql"], entry["created"],
+                     entry["embedding"].tobytes() if entry["embedding"] is not None else None),
+                )
+                conn.executemany("DELETE FROM sql_cache WHERE key = ?", [(k,) for k in evicted])
+        except sqlite3.Error as e:
+            log.warning("Could not persist SQL cache entry", extra={"error": str(e)})
@@ -1,14 +1,28 @@
 # File: agents/tool_definitions.py
 # --- FINAL DEFINITIVE VERSION ---
 
+import asyncio
 import re
-import json
+import threading
 from datetime import date
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 
 from database.connection import Database
+from database.columnar import ColumnarResult
+from database.result_cache import referenced_tables
+from database.result_handles import pick_key_column
+from database.schema_catalog import SchemaCatalog
+from database.sql_guard import SqlGuard
 from llm.model import LanguageModel
 from rag.pipeline import RagPipeline
+from agents.sql_cache import SemanticSqlCache
+from agents.chart_rules import resolve_chart_definition
+from agents.schema_linker import SchemaLinker
+from llm.tokenizer import count_tokens
+from core.config import SQL_ROW_CAP, SQL_CALL_TIMEOUT_MS
+from core.tracing import span, annotate, observe_sql_rows, get_logger
+
+log = get_logger("tools")
 
 def _clean_sql_query(raw_sql: str) -> str:
     cleaned_sql = re.sub(r'```(sql)?', '', raw_sql, flags=re.IGNORECASE).strip()
@@ -19,15 +33,30 @@ def _clean_sql_query(raw_sql: str) -> str:
         first_half = cleaned_sql[:midpoint].strip()
         second_half = cleaned_sql[midpoint:].strip()
         if first_half == second_half:
-            print("CLEANER: Detected and removed duplicated SQL query.")
+            log.info("Removed duplicated SQL query")
             cleaned_sql = first_half
     if cleaned_sql.endswith(';'): cleaned_sql = cleaned_sql[:-1]
     return cleaned_sql
 
 # In agents/tool_definitions.py
 
-async def sql_search_tool(user_question: str, db_schema: str, db: Database, llm: LanguageModel) -> Dict[str, Any]:
-    print("TOOL: Using 'sql_search_tool' (Context-Aware Flow)")
+async def generate_sql(user_question: str, db_schema: str, llm: LanguageModel, sql_cache: Optional[SemanticSqlCache] = None,
+                       schema_linker: Optional[SchemaLinker] = None) -> Dict[str, Any]:
+    """
+    Asks the LLM for a read-only Oracle query. Returns {"sql_query", "sql_cache"} or {"error"}.
+    A cache hit skips the LLM entirely; "sql_cache" is 'hit_exact', 'hit_semantic', 'miss' or 'disabled'.
+    With a schema_linker, only the tables and columns relevant to the question go into the prompt.
+    """
+    if sql_cache is not None:
+        hit = await asyncio.to_thread(sql_cache.lookup, user_question, db_schema)
+        if hit:
+            annotate(sql_cache=hit["status"])
+            return {"sql_query": hit["sql"], "sql_cache": hit["status"]}
+
+    full_schema = db_schema
+    if schema_linker is not None:
+        db_schema = (await asyncio.to_thread(schema_linker.link, user_question))["schema"]
+
     current_date_str = date.today().strftime("%Y-%m-%d")
 
     # --- FINAL PROMPT WITH BUSINESS CONTEXT AND PERFECTED FEW-SHOT EXAMPLE ---
@@ -63,6 +92,11 @@ async def sql_search_tool(user_question: str, db_schema: str, db: Database, llm:
     Your output is ONLY the single, valid Oracle SQL query, or the word UNSUPPORTED.
     SQL QUERY:
     """
+    if schema_linker is not None:
+        prompt_tokens = count_tokens(prompt)
+        annotate(prompt_tokens=prompt_tokens)
+        log.info("SQL prompt built", extra={"prompt_tokens": prompt_tokens,
+                                            "full_schema_prompt_tokens": prompt_tokens - count_tokens(db_schema) + count_tokens(full_schema)})
     
     raw_sql = await llm.generate_response(prompt)
     if "UNSUPPORTED" in raw_sql:
@@ -70,46 +104,147 @@ async def sql_search_tool(user_question: str, db_schema: str, db: Database, llm:
     
     generated_sql = _clean_sql_query(raw_sql)
     
-    if not generated_sql.upper().startswith('SELECT'):
+    if not generated_sql.upper().startswith(('SELECT', 'WITH')):
         return {"error": "Generated query was not a valid SELECT statement."}
 
+    return {"sql_query": generated_sql, "sql_cache": "miss" if sql_cache is not None else "disabled"}
+
+async def remember_sql(user_question: str, db_schema: str, sql_evidence: Dict[str, Any], sql_cache: Optional[SemanticSqlCache]):
+    """Caches freshly generated SQL once it has executed without error."""
+    if sql_cache is not None and sql_evidence.get("sql_cache") == "miss":
+        await asyncio.to_thread(sql_cache.store, user_question, db_schema, sql_evidence["sql_query"])
+
+def _key_candidates(generated_sql: str, catalog: Optional[SchemaCatalog]) -> List[str]:
+    """Single-column unique keys of the tables a query reads, in the order the tables appear."""
+    if catalog is None:
+        return []
+    upper_sql = generated_sql.upper()
+    tables = sorted(referenced_tables(generated_sql), key=lambda t: upper_sql.find(t))
+    keys = [catalog.unique_key(t.split(".")[-1]) for t in tables]
+    return [key[0] for key in keys if len(key) == 1]
+
+async def run_sql(generated_sql: str, db: Database, catalog: Optional[SchemaCatalog] = None, columnar: bool = False,
+                  guard: Optional[SqlGuard] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Executes a generated query through the result cache, capped at SQL_ROW_CAP rows and
+    SQL_CALL_TIMEOUT_MS per round trip. With a guard, the query must pass its checks first.
+    With columnar=True "results" is a ColumnarResult rather than a list of row dicts.
+    Returns {"sql_query", "results", "result_cache", "result_handle"} or {"error", "sql_query"}.
+    "result_handle" ({"result_id", "truncated", "row_cap", "pagination"}) lets clients page through
+    or download the full result; it is None when handles are unavailable. The handle belongs to user_id
+    (the Firebase uid of the caller), and only that user can read it back.
+    """
     try:
-        results, error = db.execute_sql_query(generated_sql)
+        if guard is not None:
+            with span("sql_guard"):
+                rejection = await guard.check_async(generated_sql)
+            if rejection:
+                annotate(rejected=True)
+                return {"error": f"Query rejected before execution: {rejection}", "sql_query": generated_sql}
+        results, error, cache_status, truncated, wrappable = await db.run_capped_query_async(generated_sql, SQL_ROW_CAP, columnar=columnar,
+                                                                                             call_timeout=SQL_CALL_TIMEOUT_MS)
+        if error and "DPY-4024" in error:
+            return {"error": f"The query was cancelled after running for more than {SQL_CALL_TIMEOUT_MS / 1000:g} seconds.", "sql_query": generated_sql}
         if error:
              return {"error": f"SQL execution failed: {error}", "sql_query": generated_sql}
-        return {"sql_query": generated_sql, "results": results}
+        annotate(rows=len(results), result_cache=cache_status, truncated=truncated)
+        observe_sql_rows(len(results))
+        result_handle = None
+        if db.result_handles is not None:
+            # Keyset pages wrap the query in an inline view, which fails for duplicate column names.
+            key_column = pick_key_column(generated_sql, results, _key_candidates(generated_sql, catalog)) if wrappable else None
+            result_handle = {
+                "result_id": db.result_handles.register(generated_sql, None, key_column, truncated, user_id),
+                "truncated": truncated,
+                "row_cap": SQL_ROW_CAP,
+                "pagination": "keyset" if key_column else "offset",
+            }
+        if truncated:
+            log.info("Result truncated; the rest is available through the result handle", extra={"row_cap": SQL_ROW_CAP})
+        return {"sql_query": generated_sql, "results": results, "result_cache": cache_status, "result_handle": result_handle}
     except Exception as e:
         return {"error": f"A critical error occurred during SQL execution: {e}", "sql_query": generated_sql}
 
+async def sql_search_tool(user_question: str, db_schema: str, db: Database, llm: LanguageModel, sql_cache: Optional[SemanticSqlCache] = None,
+                          schema_linker: Optional[SchemaLinker] = None, catalog: Optional[SchemaCatalog] = None,
+                          guard: Optional[SqlGuard] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+    log.debug("Using sql_search_tool")
+    sql_evidence = await generate_sql(user_question, db_schema, llm, sql_cache, schema_linker)
+    if sql_evidence.get("error"):
+        return sql_evidence
+    result = await run_sql(sql_evidence["sql_query"], db, catalog, guard=guard, user_id=user_id)
+    if not result.get("error"):
+        await remember_sql(user_question, db_schema, sql_evidence, sql_cache)
+    result["sql_cache"] = sql_evidence.get("sql_cache")
+    return result
+
+# District name -> DISTRICT_CD, loaded once from M_DISTRICT for RAG filtering.
+_district_codes: Optional[Dict[str, int]] = None
+_district_codes_lock = threading.Lock()
+
+_YEAR = re.compile(r'\b(?:19|20)\d{2}\b')
+_SINGLE_YEAR = re.compile(r'\b(?:in|of|during)\s+(?:the\s+year\s+)?((?:19|20)\d{2})\b', re.IGNORECASE)
+# Any of these makes the year a bound of a range or comparison rather than the year asked about.
+_YEAR_RANGE = re.compile(
+    r'\b(?:since|between|before|after|until|till|through|upto|onwards?|prior|earlier|later|older|newer)\b'
+    r'|\bfrom\b.*\bto\b|[<>]|\d\s*[-\u2013]\s*\d',
+    re.IGNORECASE,
+)
+# "Cr. No. 123 of 2024", "FIR 45/2024": the year is part of a case number.
+_CASE_NUMBER = re.compile(r'\b(?:fir|cr|crime|case)\b\.?\s*(?:no\b\.?|number|#)?\s*\d+\s*(?:/|\bof\b)|\d\s*/\s*(?:19|20)\d{2}\b', re.IGNORECASE)
+
+def _get_district_codes(db: Database) -> Dict[str, int]:
+    """Loads the district map once. A failed load is not cached, so a later question tries again."""
+    global _district_codes
+    with _district_codes_lock:
+        if _district_codes is None:
+            results, error = db.execute_sql_query("SELECT DISTRICT_CD, DISTRICT FROM M_DISTRICT WHERE DISTRICT IS NOT NULL")
+            if error:
+                log.warning("Could not load districts for RAG filtering", extra={"error": error})
+                return {}
+            _district_codes = {row["district"].strip().lower(): int(row["district_cd"]) for row in results}
+        return _district_codes
+
+def _extract_rag_filters(user_question: str, db: Database) -> Dict[str, int]:
+    """
+    Pulls a registration year and district out of the question, e.g. "thefts in Guntur in 2024".
+    The year is used only when the question names exactly one, as "in/of/during <year>", and says
+    nothing that would make it a range, a comparison or part of a case number.
+    """
+    filters = {}
+
+    year = _SINGLE_YEAR.search(user_question)
+    if (year and len(_YEAR.findall(user_question)) == 1
+            and not _YEAR_RANGE.search(user_question) and not _CASE_NUMBER.search(user_question)):
+        filters["REG_YEAR"] = int(year.group(1))
+
+    district_codes = _get_district_codes(db)
+    question = user_question.lower()
+    # Prefer the longest match so "west godavari" wins over "godavari".
+    for name in sorted(district_codes, key=len, reverse=True):
+        if re.search(rf'\b{re.escape(name)}\b', question):
+            filters["DISTRICT_CD"] = district_codes[name]
+            break
+
+    return filters
+
 async def vector_search_tool(user_question: str, db: Database, llm: LanguageModel) -> Dict[str, Any]:
-    print("TOOL: Using 'vector_search_tool'")
-    rag_pipeline = RagPipeline(db=db)
-    context, sources = rag_pipeline.get_context(
-        user_question, 
-        table_name="T_FIR_REGISTRATION",
-        content_column="FIR_CONTENTS",
-        id_column="FIR_REG_NUM"
-    )
+    log.debug("Using vector_search_tool")
+    filters = await asyncio.to_thread(_extract_rag_filters, user_question, db)
+    # The shared pipeline keeps the embedder and index loaded; searching is still blocking, so it runs in a worker thread.
+    rag_pipeline = await asyncio.to_thread(RagPipeline.get_shared, db)
+    with span("rag_search", filters=filters or None):
+        context, sources = await asyncio.to_thread(
+            rag_pipeline.get_context,
+            user_question,
+            table_name="T_FIR_REGISTRATION",
+            content_column="FIR_CONTENTS",
+            id_column="FIR_REG_NUM",
+            filters=filters
+        )
+        annotate(sources=len(sources))
     return {"context": context, "sources": sources}
 
-async def graphing_tool(user_question: str, data: List[Dict[str, Any]], llm: LanguageModel) -> Dict[str, Any]:
-    print("TOOL: Using 'graphing_tool'")
-    if not data or len(data) < 2: return {"chart_definition": {"chart_type": "none"}}
-    data_sample = data[:3]
-    prompt = f"""
-    You are a data visualization expert. Based on the data and user question, provide a JSON object with "chart_type", "label_column", and "value_column".
-    User Question: "{user_question}"
-    Data Sample: {json.dumps(data_sample, indent=2, default=str)}
-    Your response MUST be ONLY the JSON object.
-    """
-    try:
-        response_str = await llm.generate_response(prompt)
-        cleaned_response = re.sub(r'```(json)?', '', response_str, flags=re.IGNORECASE).strip()
-        chart_definition = json.loads(cleaned_response)
-        if all(k in chart_definition for k in ["chart_type", "label_column", "value_column"]):
-            return {"chart_definition": chart_definition}
-        else:
-            return {"chart_definition": {"chart_type": "none"}}
-    except Exception as e:
-        print(f"TOOL 'graphing_tool' failed: {e}")
-        return {"chart_definition": {"chart_type": "none"}}
\ No newline at end of file
+async def graphing_tool(user_question: str, data: Union[List[Dict[str, Any]], ColumnarResult], llm: LanguageModel) -> Dict[str, Any]:
+    log.debug("Using graphing_tool")
+    return {"chart_definition": await resolve_chart_definition(user_question, data, llm)}
@@ -2,24 +2,43 @@
 # --- CORRECTED: Properly uses Pydantic models for validation and conversion ---
 print("--- api/endpoints.py: File imported ---") # ADD THIS LINE
 
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
-import shutil
-import os
+import asyncio
 import traceback
 import json
-from typing import Any, List, Dict, Optional
+from typing import Any, List, Dict, Optional, Union
 
-from agents.core_agent import CoreInvestigationAgent
 from core.auth import verify_firebase_token
-from services.transcription_service import TranscriptionService
+from core.components import components, ComponentUnavailable
+from database.columnar import ColumnarResult, ARROW_STREAM_MEDIA_TYPE, arrow_available
+from core.config import (
+    RESULT_PAGE_SIZE, RESULT_PAGE_MAX, RESULT_DOWNLOAD_BATCH_SIZE, RESULT_DOWNLOAD_MAX_ROWS, RESULT_DOWNLOAD_MAX_SECONDS, SQL_CALL_TIMEOUT_MS,
+)
+from services.transcription_service import TranscriptionQueueFull
 
 router = APIRouter()
-agent = CoreInvestigationAgent()
-transcriber = TranscriptionService()
 
-print("--- api/endpoints.py: Creating CoreInvestigationAgent instance... ---") # ADD THIS LINE
-print("--- api/endpoints.py: CoreInvestigationAgent instance created. ---") # ADD THIS LINE
+
+# --- Component Dependencies ---
+# The agent and the Whisper pool are created by the app's lifespan (core/components.py), not at import.
+
+async def _acquire(name: str):
+    try:
+        return await components.acquire(name)
+    except ComponentUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def get_agent():
+    """The CoreInvestigationAgent; 503 until it has finished loading."""
+    return await _acquire("agent")
+
+
+async def get_transcriber():
+    """The TranscriptionService, loaded by the first voice query when WHISPER_LOAD_MODE is 'lazy'."""
+    return await _acquire("transcriber")
 
 # --- Pydantic Models for API Validation ---
 
@@ -38,8 +57,12 @@ class BaseQueryResponse(BaseModel):
     """The base shape for all query responses."""
     response_text: str
     data_sources: List[str]
-    data_payload: Optional[List[Dict[str, Any]]] = None
+    # Row dicts, or {"columns", "types", "rows"} when the columnar shape was requested.
+    data_payload: Optional[Union[List[Dict[str, Any]], Dict[str, Any]]] = None
     chart_payload: Optional[Dict[str, Any]] = None
+    result_handle: Optional[Dict[str, Any]] = None
+    cache_status: Optional[Dict[str, Any]] = None
+    stage_timings: Optional[Dict[str, float]] = None
 
 class TextQueryResponse(BaseQueryResponse):
     pass
@@ -47,17 +70,67 @@ class TextQueryResponse(BaseQueryResponse):
 class VoiceQueryResponse(BaseQueryResponse):
     transcribed_text: str
 
+class ResultPageResponse(BaseModel):
+    """One page of a result registered by an earlier query."""
+    result_id: str
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    pagination: str
+
 
 # --- API Endpoints ---
 
+# Accept values for the columnar shapes; anything else gets the row-dict JSON response.
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.bluequery.columnar+json"
+
+
+def _negotiate_result_format(accept: str, format: Optional[str]) -> str:
+    """'rows', 'columnar' ({"columns", "types", "rows"} JSON) or 'arrow' (Arrow IPC stream)."""
+    if format:
+        return format
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return "arrow"
+    if COLUMNAR_JSON_MEDIA_TYPE in accept:
+        return "columnar"
+    return "rows"
+
+
 @router.post("/text", response_model=TextQueryResponse, tags=["Investigation"])
-async def handle_text_query(request: TextQueryRequest, token: dict = Depends(verify_firebase_token)):
-    """Handles standard text-based queries with conversation history."""
+async def handle_text_query(
+    request: TextQueryRequest,
+    http_request: Request,
+    format: Optional[str] = Query(None, pattern="^(rows|columnar|arrow)$"),
+    token: dict = Depends(verify_firebase_token),
+    agent=Depends(get_agent)
+):
+    """
+    Handles standard text-based queries with conversation history.
+    The result rows are returned as row dicts by default, as a columns/rows JSON shape for
+    Accept: application/vnd.bluequery.columnar+json, or as an Arrow IPC stream for
+    Accept: application/vnd.apache.arrow.stream (the rest of the response is then in the
+    schema metadata under "response"). ?format= overrides the Accept header.
+    """
+    result_format = _negotiate_result_format(http_request.headers.get("accept", ""), format)
+    if result_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=406, detail="Arrow responses require pyarrow on the server.")
     try:
         # Convert the list of Pydantic models into a list of simple dictionaries for the agent
         history_dicts = [item.model_dump() for item in request.conversation_history] if request.conversation_history else []
         
-        result = await agent.process_query(request.query_text, history_dicts)
+        result = await agent.process_query(request.query_text, history_dicts, columnar=result_format != "rows", user_id=token.get("uid"))
+        if result_format == "arrow":
+            payload = result.pop("data_payload", None)
+            if payload is None:
+                payload = ColumnarResult([], [])
+            if result.get("chart_payload"):
+                result["chart_payload"] = {"definition": result["chart_payload"]["definition"]}
+            body = await asyncio.to_thread(payload.to_arrow_ipc, {"response": json.dumps(result, default=str)})
+            return Response(content=body, media_type=ARROW_STREAM_MEDIA_TYPE)
+        if result_format == "columnar":
+            payload = result.get("data_payload")
+            result["data_payload"] = payload.to_json_shape() if payload is not None else None
+            if result.get("chart_payload"):
+                result["chart_payload"]["data"] = result["data_payload"]
         return TextQueryResponse(**result)
         
     except Exception as e:
@@ -65,22 +138,122 @@ async def handle_text_query(request: TextQueryRequest, token: dict = Depends(ver
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
 
 
+def _format_sse(event: str, data: Any) -> str:
+    """Formats one Server-Sent-Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.post("/text/stream", tags=["Investigation"])
+async def handle_text_query_stream(request: TextQueryRequest, token: dict = Depends(verify_firebase_token), agent=Depends(get_agent)):
+    """
+    Streams a text query as Server-Sent-Events: routed, sql_generated, rows_fetched and
+    chart_ready as each stage finishes, then the synthesized answer token by token, then done.
+    """
+    history_dicts = [item.model_dump() for item in request.conversation_history] if request.conversation_history else []
+
+    async def event_source():
+        try:
+            async for event in agent.process_query_stream(request.query_text, history_dicts, user_id=token.get("uid")):
+                yield _format_sse(event["event"], event["data"])
+        except Exception as e:
+            traceback.print_exc()
+            yield _format_sse("error", {"detail": f"An internal error occurred: {e}"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream, which would defeat the point of it.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _get_result_handle(agent, result_id: str, token: dict) -> Dict[str, Any]:
+    handle = agent.db.result_handles.get(result_id) if agent.db.result_handles is not None else None
+    # Another user's handle is reported as missing, so result ids cannot be probed.
+    if handle is None or handle["user_id"] is None or handle["user_id"] != token.get("uid"):
+        raise HTTPException(status_code=404, detail="Result not found or expired.")
+    return handle
+
+
+@router.get("/results/{result_id}", response_model=ResultPageResponse, tags=["Results"])
+async def get_result_page(
+    result_id: str,
+    cursor: Optional[str] = None,
+    page_size: int = Query(RESULT_PAGE_SIZE, ge=1, le=RESULT_PAGE_MAX),
+    token: dict = Depends(verify_firebase_token),
+    agent=Depends(get_agent)
+):
+    """
+    Pages through the full result of an earlier query. Pass the returned next_cursor to get the
+    following page; it is null on the last page.
+    """
+    handle = _get_result_handle(agent, result_id, token)
+    try:
+        page = await agent.db.fetch_result_page_async(handle, cursor, page_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=f"Could not fetch results: {e}")
+    return ResultPageResponse(result_id=result_id, **page)
+
+
+@router.get("/results/{result_id}/download", tags=["Results"])
+async def download_result(result_id: str, token: dict = Depends(verify_firebase_token), agent=Depends(get_agent)):
+    """
+    Streams the full result of an earlier query as newline-delimited JSON, one batch of rows at a time.
+    The download ends after RESULT_DOWNLOAD_MAX_ROWS rows or RESULT_DOWNLOAD_MAX_SECONDS seconds; both
+    limits are sent in the response headers.
+    """
+    handle = _get_result_handle(agent, result_id, token)
+
+    def ndjson_lines():
+        # Runs in Starlette's thread pool; the session is held only while the download is in progress.
+        batches = agent.db.iter_query_batches(handle["sql"], handle["params"], RESULT_DOWNLOAD_BATCH_SIZE, call_timeout=SQL_CALL_TIMEOUT_MS,
+                                              max_rows=RESULT_DOWNLOAD_MAX_ROWS, max_seconds=RESULT_DOWNLOAD_MAX_SECONDS)
+        for batch in batches:
+            yield "".join(json.dumps(row, default=str) + "\n" for row in batch)
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={
+            "Content-Disposition": f'attachment; filename="{result_id}.ndjson"',
+            "X-Max-Rows": str(RESULT_DOWNLOAD_MAX_ROWS),
+            "X-Max-Seconds": f"{RESULT_DOWNLOAD_MAX_SECONDS:g}",
+        },
+    )
+
+
+@router.get("/schema", tags=["Schema"])
+async def get_schema_info(token: dict = Depends(verify_firebase_token), agent=Depends(get_agent)):
+    """Reports the version and source of the schema catalog the agent is using."""
+    return agent.catalog.get_info()
+
+
+@router.post("/schema/refresh", tags=["Schema"])
+async def refresh_schema(token: dict = Depends(verify_firebase_token), agent=Depends(get_agent)):
+    """Re-reads the schema catalog from the data dictionary without restarting the server."""
+    return await asyncio.to_thread(agent.refresh_schema)
+
+
 @router.post("/voice", response_model=VoiceQueryResponse, tags=["Investigation"])
 async def handle_voice_query(
     audio_file: UploadFile = File(...), 
     conversation_history: str = Form('[]'),
-    token: dict = Depends(verify_firebase_token)
+    token: dict = Depends(verify_firebase_token),
+    agent=Depends(get_agent),
+    transcriber=Depends(get_transcriber)
 ):
-    """Handles voice queries by transcribing first, then processing."""
-    temp_dir = "temp_audio"
-    os.makedirs(temp_dir, exist_ok=True)
-    input_audio_path = os.path.join(temp_dir, f"input_{os.urandom(8).hex()}.m4a")
-    
+    """
+    Handles voice queries by transcribing first, then processing. The upload is decoded in memory
+    and transcribed on the worker pool, so other requests keep being served meanwhile.
+    """
     try:
-        with open(input_audio_path, "wb") as buffer:
-            shutil.copyfileobj(audio_file.file, buffer)
-        
-        transcribed_text = transcriber.transcribe(input_audio_path)
+        audio_bytes = await audio_file.read()
+        try:
+            transcribed_text = await transcriber.transcribe_async(audio_bytes)
+        except TranscriptionQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
         if not transcribed_text or not transcribed_text.strip():
             raise HTTPException(status_code=400, detail="Could not understand audio.")
         
@@ -90,15 +263,23 @@ async def handle_voice_query(
         # Convert the validated models into simple dictionaries for the agent
         history_dicts = [item.model_dump() for item in validated_history]
         
-        result = await agent.process_query(transcribed_text, history_dicts)
+        result = await agent.process_query(transcribed_text, history_dicts, user_id=token.get("uid"))
         
         return VoiceQueryResponse(
             transcribed_text=transcribed_text,
             **result
         )
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"An internal error occurred: {e}")
-    finally:
-        if os.path.exists(input_audio_path):
-            os.remove(input_audio_path)
\ No newline at end of file
+
+
+@router.get("/voice/stats", tags=["Investigation"])
+async def get_voice_stats(token: dict = Depends(verify_firebase_token)):
+    """Transcription queue depth, worker utilisation and recent latencies; only the load status until the pool is loaded."""
+    transcriber = components.get("transcriber")
+    if transcriber is None:
+        return components.report()["components"]["transcriber"]
+    return transcriber.get_stats()
@@ -0,0 +1,149 @@
+# File: api/voice_stream.py
+# WebSocket voice queries: audio is streamed while the officer speaks, partial transcripts are sent
+# back, and the query starts as soon as VAD detects the end of the utterance.
+#
+# Protocol (mounted at /query/voice/stream):
+#   client -> {"type": "auth", "token": "...", "conversation_history": [...]}
+#   server -> {"type": "ready", "sample_rate": 16000}
+#   client -> binary frames of 16-bit little-endian mono PCM at 16 kHz
+#   client -> {"type": "end"}                      optional: end the utterance now (push-to-talk release)
+#   server -> {"type": "partial", "text": "..."}   while speaking
+#   server -> {"type": "final", "text": "..."}     at the end of the utterance
+#   server -> {"type": "answer", ...}              the same fields as a /voice response
+# The connection stays open for further utterances; each answer is appended to the history.
+
+import asyncio
+import json
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+
+from core.auth import verify_token_async
+from core.components import components, ComponentUnavailable
+from core.config import VOICE_STREAM_PARTIAL_INTERVAL_MS
+from services.transcription_service import TranscriptionQueueFull
+from services.utterance_segmenter import UtteranceSegmenter, SAMPLE_RATE
+
+# Not included with the HTTP router's bearer-token dependency: browsers cannot set headers on a
+# WebSocket, so the token arrives in the first message. It is deliberately not accepted in the query
+# string, where it would end up in server and proxy access logs.
+router = APIRouter()
+
+_PARTIAL_INTERVAL_SAMPLES = SAMPLE_RATE * VOICE_STREAM_PARTIAL_INTERVAL_MS // 1000
+
+
+class _Session:
+    """Per-connection state: serialized sends, the utterance buffer and the conversation so far."""
+
+    def __init__(self, websocket: WebSocket, history: List[Dict[str, Any]], agent, transcriber, user_id: Optional[str]):
+        self.websocket = websocket
+        self.history = history
+        self.user_id = user_id
+        self.agent = agent
+        self.transcriber = transcriber
+        self.segmenter = UtteranceSegmenter()
+        self.partial_task: Optional[asyncio.Task] = None
+        self.partial_at = 0
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message, default=str))
+
+    async def _send_partial(self, audio):
+        try:
+            text = await self.transcriber.transcribe_async(audio, beam_size=1)
+        except TranscriptionQueueFull:
+            return  # Partials are best-effort; the final transcript still queues.
+        await self.send({"type": "partial", "text": text.strip()})
+
+    def maybe_start_partial(self):
+        """Decodes the utterance so far, greedily, if enough new speech arrived and no partial is running."""
+        segmenter = self.segmenter
+        if not segmenter.heard_speech or segmenter.samples - self.partial_at < _PARTIAL_INTERVAL_SAMPLES:
+            return
+        if self.partial_task is not None and not self.partial_task.done():
+            return
+        self.partial_at = segmenter.samples
+        self.partial_task = asyncio.create_task(self._send_partial(segmenter.audio.copy()))
+
+    async def finish_utterance(self):
+        if self.partial_task is not None and not self.partial_task.done():
+            # Its result would arrive after the final transcript; the worker finishes it regardless.
+            self.partial_task.cancel()
+        heard_speech = self.segmenter.heard_speech
+        audio = self.segmenter.speech_audio()
+        self.segmenter.reset()
+        self.partial_at = 0
+        if not heard_speech:
+            await self.send({"type": "final", "text": ""})
+            return
+
+        start = time.perf_counter()
+        text = (await self.transcriber.transcribe_async(audio)).strip()
+        await self.send({"type": "final", "text": text, "transcribe_ms": round((time.perf_counter() - start) * 1000, 1)})
+        if not text:
+            return
+
+        result = await self.agent.process_query(text, self.history, user_id=self.user_id)
+        await self.send({"type": "answer", "transcribed_text": text, **result})
+        self.history.append({"role": "user", "content": text})
+        self.history.append({"role": "assistant", "content": result.get("response_text", "")})
+
+
+@router.websocket("/voice/stream")
+async def voice_stream(websocket: WebSocket):
+    """Streaming voice queries; see the protocol at the top of this module."""
+    await websocket.accept()
+    history: List[Dict[str, Any]] = []
+    try:
+        first = await websocket.receive_json()
+        history = first.get("conversation_history") or []
+        claims = await verify_token_async(first.get("token") or "")
+    except (HTTPException, ValueError, KeyError, AttributeError):
+        await websocket.close(code=1008, reason="Invalid or missing token.")
+        return
+    except WebSocketDisconnect:
+        return
+
+    try:
+        agent = await components.acquire("agent")
+        transcriber = await components.acquire("transcriber")
+    except ComponentUnavailable as e:
+        # 1013: try again later.
+        await websocket.close(code=1013, reason=str(e)[:120])
+        return
+
+    session = _Session(websocket, history, agent, transcriber, claims.get("uid"))
+    await session.send({"type": "ready", "sample_rate": SAMPLE_RATE})
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            ended = False
+            if message.get("bytes"):
+                session.segmenter.add(message["bytes"])
+                ended = await asyncio.to_thread(session.segmenter.update)
+            elif message.get("text"):
+                control = json.loads(message["text"])
+                ended = control.get("type") == "end"
+            if ended:
+                await session.finish_utterance()
+            else:
+                session.maybe_start_partial()
+    except WebSocketDisconnect:
+        pass
+    except TranscriptionQueueFull as e:
+        await session.send({"type": "error", "detail": str(e)})
+        # 1013: try again later.
+        await websocket.close(code=1013)
+    except Exception as e:
+        traceback.print_exc()
+        await session.send({"type": "error", "detail": f"An internal error occurred: {e}"})
+        await websocket.close(code=1011)
+    finally:
+        if session.partial_task is not None:
+            session.partial_task.cancel()
@@ -0,0 +1,49 @@
+# File: benchmarks/bench_app.py
+# The real application wired for load tests: Oracle replaced by benchmarks.fake_database, the LLM
+# pointed at benchmarks.stub_llm_server, and Firebase auth bypassed.
+#
+# The auth bypass is a FastAPI dependency override on this app object only; main.app and core.auth
+# are unchanged, so it cannot leak into a production deployment.
+#
+# Usage (bench_load.py starts both processes itself unless given --url):
+#   python -m benchmarks.stub_llm_server --port 8001 &
+#   uvicorn benchmarks.bench_app:app --port 8765
+#
+# Environment (settings already exported win over these defaults and over .env):
+#   OLLAMA_BASE_URL       http://127.0.0.1:8001 (the stub server)
+#   BENCH_FIR_ROWS        synthetic FIRs in the SQLite database (default 20000)
+#   BENCH_DB_LATENCY_MS   added to every query, for the round trip to a real server (default 0)
+# The embedder (SQL cache, local router, schema linking) still needs the sentence-transformers model
+# in the local cache. To run fully offline:
+#   ROUTER_MODE=llm SQL_CACHE_ENABLED=false SCHEMA_LINKING_ENABLED=false
+
+import os
+
+for key, value in {
+    "OLLAMA_BASE_URL": "http://127.0.0.1:8001",
+    "LLM_MODEL_NAME": "stub",
+    "LLM_TOKENIZER": "",
+    "WHISPER_LOAD_MODE": "off",
+    "RAG_BUILD_ON_STARTUP": "false",
+    "SCHEMA_SNAPSHOT_PATH": "",
+}.items():
+    os.environ.setdefault(key, value)
+
+import main  # noqa: E402  (configuration is read at import time)
+from core.auth import verify_firebase_token  # noqa: E402
+from core.components import components  # noqa: E402
+
+BENCH_FIR_ROWS = int(os.getenv("BENCH_FIR_ROWS", "20000"))
+BENCH_DB_LATENCY_MS = float(os.getenv("BENCH_DB_LATENCY_MS", "0"))
+
+
+def _create_bench_agent():
+    from agents.core_agent import CoreInvestigationAgent
+    from benchmarks.fake_database import SqliteDatabase
+    return CoreInvestigationAgent(db=SqliteDatabase(fir_rows=BENCH_FIR_ROWS, query_latency_ms=BENCH_DB_LATENCY_MS))
+
+
+components.register("agent", _create_bench_agent, close=lambda agent: agent.db.close())
+
+app = main.app
+app.dependency_overrides[verify_firebase_token] = lambda: {"uid": "bench", "email": "bench@localhost"}
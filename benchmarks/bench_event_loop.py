@@ -0,0 +1,115 @@
+# File: benchmarks/bench_event_loop.py
+# A standalone benchmark showing how blocking Oracle calls affect the whole FastAPI event loop.
+#
+# It serves two routes from a throwaway app: /health (instant) and /slow (one long database
+# call). While a batch of /slow requests is in flight, it measures how many /health requests
+# the same process can still answer, once with the old synchronous call and once with the
+# executor-backed async path.
+#
+# Usage:
+#   python -m benchmarks.bench_event_loop                 # simulated Oracle latency
+#   python -m benchmarks.bench_event_loop --live          # real Oracle via DBMS_SESSION.SLEEP
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from fastapi import FastAPI
+
+from database.connection import Database
+
+SLEEP_SQL = "BEGIN DBMS_SESSION.SLEEP(:seconds); END;"
+
+
+class SimulatedDatabase(Database):
+    """A Database whose queries just sleep, so the benchmark runs without an Oracle server."""
+
+    def __init__(self, query_seconds: float, workers: int):
+        self.query_seconds = query_seconds
+        self.pool = object()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="oracle-db")
+
+    def execute_sql_query(self, query, params=None):
+        time.sleep(self.query_seconds)
+        return [], None
+
+
+def build_app(db: Database, mode: str, query_seconds: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/slow")
+    async def slow():
+        params = {"seconds": query_seconds}
+        if mode == "sync":
+            results, error = db.execute_sql_query(SLEEP_SQL, params)
+        else:
+            results, error = await db.execute_sql_query_async(SLEEP_SQL, params)
+        return {"error": error}
+
+    return app
+
+
+async def run_scenario(db: Database, mode: str, slow_requests: int, query_seconds: float) -> dict:
+    app = build_app(db, mode, query_seconds)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        health_done = 0
+        completions = []
+        stop = asyncio.Event()
+
+        async def hammer_health():
+            nonlocal health_done
+            while not stop.is_set():
+                await client.get("/health")
+                completions.append(time.perf_counter())
+                health_done += 1
+                # The in-process transport may never suspend on its own; yield so /slow can progress.
+                await asyncio.sleep(0)
+
+        start = time.perf_counter()
+        pollers = [asyncio.create_task(hammer_health()) for _ in range(4)]
+        await asyncio.gather(*(client.get("/slow") for _ in range(slow_requests)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await asyncio.gather(*pollers)
+
+    # The longest gap between two answered health checks is how long the loop was frozen.
+    gaps = [b - a for a, b in zip([start] + completions, completions)]
+    return {
+        "mode": mode,
+        "wall_s": elapsed,
+        "health_rps": health_done / elapsed,
+        "max_stall_ms": max(gaps, default=elapsed) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--live", action="store_true", help="Use the configured Oracle database.")
+    parser.add_argument("--slow-requests", type=int, default=8)
+    parser.add_argument("--query-seconds", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.live:
+        db = Database()
+    else:
+        db = SimulatedDatabase(args.query_seconds, workers=args.slow_requests)
+
+    print(f"{args.slow_requests} concurrent slow queries of {args.query_seconds}s each\n")
+    print(f"{'mode':<6} {'wall (s)':>9} {'/health req/s':>14} {'max stall (ms)':>15}")
+    for mode in ("sync", "async"):
+        r = await run_scenario(db, mode, args.slow_requests, args.query_seconds)
+        print(f"{r['mode']:<6} {r['wall_s']:>9.2f} {r['health_rps']:>14.1f} {r['max_stall_ms']:>15.1f}")
+
+    if args.live:
+        db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,218 @@
+# File: benchmarks/bench_load.py
+# Load test of /query/text at a fixed concurrency: throughput, latency percentiles and the average
+# time per pipeline stage (from the Server-Timing header).
+#
+# Without --url it starts benchmarks.stub_llm_server and benchmarks.bench_app (fake database, stub
+# LLM, no Firebase auth) as subprocesses, waits for /ready, runs the load and stops them. With --url
+# it targets a running server; pass --token for one that checks Firebase tokens.
+#
+# Usage:
+#   python -m benchmarks.bench_load --concurrency 16 --requests 500
+#   python -m benchmarks.bench_load --concurrency 32 --duration 60 --llm-latency-ms 300 --tokens-per-second 30
+#   ROUTER_MODE=llm SQL_CACHE_ENABLED=false SCHEMA_LINKING_ENABLED=false python -m benchmarks.bench_load
+#   python -m benchmarks.bench_load --url http://10.0.0.5:8000 --token "$FIREBASE_ID_TOKEN"
+#
+# Questions are taken round-robin from --questions (one per line) or from a built-in mix of
+# aggregates, listings and greetings.
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+QUESTIONS = [
+    "How many FIRs were registered in total?",
+    "Show the number of cases in each district.",
+    "What is the trend of cases by year?",
+    "Which offences are the most common?",
+    "List the most recent FIRs.",
+    "Which police stations registered the most cases?",
+    "How many cases were registered in Guntur district?",
+    "Hello, what can you do?",
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return float("nan")
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """{stage: milliseconds} from a Server-Timing header; repeated stages are summed."""
+    stages: Dict[str, float] = defaultdict(float)
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur" and name:
+                stages[name] += float(value)
+    return stages
+
+
+class Results:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.stages: Dict[str, List[float]] = defaultdict(list)
+
+    def add(self, latency: float, response: Optional[httpx.Response], error: Optional[str] = None):
+        if response is None:
+            self.errors[error] += 1
+            return
+        self.statuses[response.status_code] += 1
+        if response.status_code != 200:
+            return
+        self.latencies.append(latency)
+        for stage, ms in parse_server_timing(response.headers.get("server-timing", "")).items():
+            self.stages[stage].append(ms)
+
+
+async def run_load(url: str, questions: List[str], concurrency: int, requests: int, duration: Optional[float],
+                   warmup: int, headers: Dict[str, str], timeout: float) -> Tuple[Results, float]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, headers=headers, timeout=timeout, limits=limits) as client:
+        async def one(index: int, results: Optional[Results]):
+            body = {"query_text": questions[index % len(questions)], "conversation_history": []}
+            start = time.perf_counter()
+            try:
+                response = await client.post("/query/text", json=body)
+                error = None
+            except httpx.HTTPError as e:
+                response, error = None, type(e).__name__
+            if results is not None:
+                results.add(time.perf_counter() - start, response, error)
+
+        # Warm-up: connections, lazy components and first-call caches, outside the measurement.
+        await asyncio.gather(*(one(i, None) for i in range(warmup)))
+
+        results = Results()
+        counter = iter(range(sys.maxsize))
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def worker():
+            for index in counter:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if deadline is None and index >= requests:
+                    return
+                await one(index, results)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return results, time.perf_counter() - start
+
+
+def report(results: Results, elapsed: float, concurrency: int):
+    completed = len(results.latencies)
+    total = sum(results.statuses.values()) + sum(results.errors.values())
+    print(f"\n{total} requests at concurrency {concurrency} in {elapsed:.1f} s")
+    print(f"  throughput  {completed / elapsed:8.1f} successful requests/s")
+    if completed:
+        latencies = [latency * 1000 for latency in results.latencies]
+        print(f"  latency     p50 {percentile(latencies, 50):.0f} ms   p95 {percentile(latencies, 95):.0f} ms   "
+              f"p99 {percentile(latencies, 99):.0f} ms   max {max(latencies):.0f} ms   mean {statistics.mean(latencies):.0f} ms")
+    failures = {str(status): count for status, count in results.statuses.items() if status != 200}
+    failures.update(results.errors)
+    if failures:
+        print(f"  failures    {', '.join(f'{name}: {count}' for name, count in sorted(failures.items()))}")
+    if results.stages:
+        # Stages nest (llm runs inside routing, sql_generation and synthesis), so they do not add up to total.
+        print("\n  Mean time per successful request, by stage (Server-Timing):")
+        for stage, values in sorted(results.stages.items(), key=lambda item: (item[0] == "total", -sum(item[1]))):
+            print(f"    {stage:<22} {sum(values) / completed:8.1f} ms   (in {len(values)} of {completed})")
+
+
+def _wait_ready(url: str, processes: List[subprocess.Popen], timeout: float):
+    started = time.perf_counter()
+    with httpx.Client(timeout=2) as client:
+        while time.perf_counter() - started < timeout:
+            for process in processes:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{' '.join(process.args)} exited with code {process.returncode}.")
+            try:
+                if client.get(f"{url}/ready").status_code == 200:
+                    print(f"Server ready after {time.perf_counter() - started:.1f} s.")
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+    raise RuntimeError(f"{url}/ready did not succeed within {timeout:.0f} s.")
+
+
+def start_servers(args) -> List[subprocess.Popen]:
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, OLLAMA_BASE_URL=f"http://127.0.0.1:{args.llm_port}",
+               BENCH_FIR_ROWS=str(args.fir_rows), BENCH_DB_LATENCY_MS=str(args.db_latency_ms))
+    output = None if args.server_output else subprocess.DEVNULL
+    stub = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.stub_llm_server", "--port", str(args.llm_port),
+         "--latency-ms", str(args.llm_latency_ms), "--tokens-per-second", str(args.tokens_per_second)]
+        + (["--sql", args.sql] if args.sql else []),
+        cwd=project_root, env=env, stdout=output, stderr=output,
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_app:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=project_root, env=env, stdout=output, stderr=output,
+    )
+    return [stub, app]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Target a running server instead of starting the bench app.")
+    parser.add_argument("--token", help="Firebase ID token sent as a Bearer token (for --url).")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests (ignored with --duration).")
+    parser.add_argument("--duration", type=float, help="Run for this many seconds instead of a fixed request count.")
+    parser.add_argument("--warmup", type=int, default=8, help="Unmeasured requests sent first.")
+    parser.add_argument("--questions", help="File with one question per line.")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds.")
+    local = parser.add_argument_group("bench app (without --url)")
+    local.add_argument("--port", type=int, default=8765)
+    local.add_argument("--llm-port", type=int, default=8001)
+    local.add_argument("--llm-latency-ms", type=float, default=150)
+    local.add_argument("--tokens-per-second", type=float, default=40)
+    local.add_argument("--sql", help="Extra canned SQL for the stub server (see stub_llm_server.py).")
+    local.add_argument("--fir-rows", type=int, default=20000)
+    local.add_argument("--db-latency-ms", type=float, default=0)
+    local.add_argument("--ready-timeout", type=float, default=300)
+    local.add_argument("--server-output", action="store_true", help="Show the servers' output instead of discarding it.")
+    args = parser.parse_args()
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions, "r") as f:
+            questions = [line.strip() for line in f if line.strip()]
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+
+    processes = []
+    url = args.url.rstrip("/") if args.url else f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.url:
+            processes = start_servers(args)
+            _wait_ready(url, processes, args.ready_timeout)
+        results, elapsed = asyncio.run(run_load(
+            url, questions, args.concurrency, args.requests, args.duration, args.warmup, headers, args.timeout,
+        ))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+    report(results, elapsed, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
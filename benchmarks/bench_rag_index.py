@@ -0,0 +1,97 @@
+# File: benchmarks/bench_rag_index.py
+# A standalone recall-versus-latency benchmark for the RAG index backends.
+#
+# Uses synthetic clustered vectors shaped like MiniLM embeddings (384 dims) so it runs without
+# Oracle or the embedding model. Every backend is compared against exact IndexFlatL2 results,
+# unfiltered and filtered to one district/year slice via an id selector.
+#
+# Usage:
+#   python -m benchmarks.bench_rag_index --n 100000 --queries 200
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from rag.index_factory import create_index, with_ids, search_parameters
+
+
+def make_corpus(n: int, dim: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centers[assignment] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    ids = np.arange(1, n + 1, dtype=np.int64) * 7  # FIR-like, non-contiguous ids
+    districts = rng.integers(1, 14, size=n)
+    years = rng.integers(2020, 2025, size=n)
+    return vectors, ids, districts, years
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    return hits / max(1, int((truth >= 0).sum()))
+
+
+def timed_search(index, queries: np.ndarray, k: int, params) -> tuple:
+    labels = np.empty((len(queries), k), dtype=np.int64)
+    latencies = []
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, labels[i] = index.search(q[None, :], k, params=params)
+        latencies.append(time.perf_counter() - start)
+    return labels, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 95) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--pq-m", type=int, default=16)
+    args = parser.parse_args()
+
+    vectors, ids, districts, years = make_corpus(args.n, args.dim, clusters=64)
+    queries = vectors[np.random.default_rng(1).choice(args.n, args.queries, replace=False)]
+    queries = queries + 0.05 * np.random.default_rng(2).normal(size=queries.shape).astype(np.float32)
+
+    # One district/year slice (about 1/65 of the corpus), as in "thefts in Guntur 2024".
+    slice_ids = ids[(districts == 5) & (years == 2024)]
+    selector = faiss.IDSelectorBatch(slice_ids)
+
+    flat = with_ids(create_index("flat", args.dim), "flat")
+    flat.add_with_ids(vectors, ids)
+    truth, _, _ = timed_search(flat, queries, args.k, None)
+    truth_filtered, _, _ = timed_search(flat, queries, args.k, search_parameters("flat", selector=faiss.IDSelectorBatch(slice_ids)))
+
+    configs = [("flat", {})]
+    configs += [("ivf_flat", {"nprobe": p}) for p in (4, 16, 64)]
+    configs += [("ivf_pq", {"nprobe": p}) for p in (16, 64)]
+    configs += [("hnsw", {"ef_search": ef}) for ef in (32, 64, 128)]
+
+    print(f"n={args.n} dim={args.dim} k={args.k} queries={args.queries} filtered slice={len(slice_ids)} docs\n")
+    print(f"{'backend':<9} {'params':<14} {'build s':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7} {'filt p50':>9} {'filt recall':>12}")
+
+    built = {}
+    for index_type, params in configs:
+        if index_type not in built:
+            start = time.perf_counter()
+            index = with_ids(create_index(index_type, args.dim, vectors, nlist=args.nlist, pq_m=args.pq_m), index_type)
+            index.add_with_ids(vectors, ids)
+            built[index_type] = (index, time.perf_counter() - start)
+        index, build_s = built[index_type]
+
+        labels, p50, p95 = timed_search(index, queries, args.k, search_parameters(index_type, **params))
+        filt_params = search_parameters(index_type, selector=selector, **params)
+        filt_labels, filt_p50, _ = timed_search(index, queries, args.k, filt_params)
+
+        label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+        print(f"{index_type:<9} {label:<14} {build_s:>8.2f} {p50:>8.3f} {p95:>8.3f} {recall(labels, truth):>7.3f} "
+              f"{filt_p50:>9.3f} {recall(filt_labels, truth_filtered):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# File: benchmarks/bench_startup.py
+# Import time of the app and cold-start time of a server process.
+#
+#   import      `import main` in a fresh interpreter, repeated; --top lists the slowest modules
+#               (cumulative, from python -X importtime).
+#   cold start  launches uvicorn and polls / (process serving) and /ready (every startup component
+#               loaded), then prints the per-component init times the server reports, against their
+#               sum as a serial startup would have taken.
+#
+# Usage:
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --repeat 10 --top 15
+#   WHISPER_LOAD_MODE=lazy python -m benchmarks.bench_startup --skip-import
+#
+# Uses the same .env / environment as the server, so the cold start needs the database and models
+# the server needs.
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+
+def time_imports(repeat: int) -> list:
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], capture_output=True, text=True, check=True).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def slowest_imports(top: int) -> list:
+    """(cumulative seconds, module) for the slowest imports under `import main`."""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|"))
+            rows.append((int(cumulative) / 1e6, module.strip()))
+        except ValueError:
+            continue  # The header line.
+    return sorted(rows, reverse=True)[:top]
+
+
+def cold_start(port: int, timeout: float) -> dict:
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = {}
+    try:
+        with httpx.Client(timeout=2) as client:
+            while time.perf_counter() - started < timeout:
+                if server.poll() is not None:
+                    raise RuntimeError(f"The server exited with code {server.returncode}.")
+                try:
+                    if "live_s" not in result and client.get(f"{url}/").status_code == 200:
+                        result["live_s"] = time.perf_counter() - started
+                    if "live_s" in result:
+                        response = client.get(f"{url}/ready")
+                        if response.status_code == 200:
+                            result["ready_s"] = time.perf_counter() - started
+                            result["report"] = response.json()
+                            break
+                        result["report"] = response.json()
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh-interpreter imports to time.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imported modules to list (0 to skip).")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for /ready.")
+    parser.add_argument("--skip-import", action="store_true")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_import:
+        times = time_imports(args.repeat)
+        print(f"import main: median {statistics.median(times):.2f} s, min {min(times):.2f} s over {len(times)} runs")
+        if args.top:
+            print("\nSlowest imports (cumulative):")
+            for seconds, module in slowest_imports(args.top):
+                print(f"  {seconds:7.3f} s  {module}")
+        print()
+
+    if not args.skip_cold_start:
+        result = cold_start(args.port, args.timeout)
+        print(f"Cold start: serving / after {result.get('live_s', float('nan')):.2f} s, "
+              f"/ready after {result.get('ready_s', float('nan')):.2f} s")
+        report = result.get("report") or {}
+        components = report.get("components", {})
+        for name, info in components.items():
+            init = f"{info['init_ms'] / 1000:.2f} s" if info.get("init_ms") is not None else "-"
+            print(f"  {name:<12} {info['mode']:<8} {info['status']:<8} {init:>9}  {info.get('error') or ''}")
+        serial = sum(info["init_ms"] or 0 for info in components.values() if info["mode"] == "startup") / 1000
+        if report.get("startup_ms") is not None:
+            print(f"  startup components: {report['startup_ms'] / 1000:.2f} s concurrently, {serial:.2f} s one after another")
+
+
+if __name__ == "__main__":
+    main()
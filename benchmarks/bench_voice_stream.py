@@ -0,0 +1,129 @@
+# File: benchmarks/bench_voice_stream.py
+# Time-to-answer for recorded voice queries: upload-then-transcribe (/query/voice) versus
+# streaming (/query/voice/stream), against a running server.
+#
+# Both paths are timed from the moment the officer stops speaking (the end of the clip):
+#   /voice         the clip is only uploaded once recording has finished, so the clock starts at upload.
+#   /voice/stream  the clip is sent in real-time chunks while "speaking", followed by silence (as a
+#                  live microphone would send) until the answer arrives.
+# Time to the first partial transcript is reported for the streaming path as well.
+#
+# Usage:
+#   python -m benchmarks.bench_voice_stream clips/*.wav --token $FIREBASE_ID_TOKEN
+#   python -m benchmarks.bench_voice_stream clips/*.m4a --url http://localhost:8000 --repeat 3
+#
+# Needs the 'websockets' client, which uvicorn[standard] already installs.
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import numpy as np
+import websockets
+from faster_whisper import decode_audio
+
+SAMPLE_RATE = 16000
+CHUNK_MS = 100
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+async def time_upload(client: httpx.AsyncClient, url: str, token: str, path: str) -> dict:
+    # Recording has already finished by the time anything can be uploaded.
+    with open(path, "rb") as f:
+        audio = f.read()
+    start = time.perf_counter()
+    response = await client.post(
+        f"{url}/query/voice",
+        headers={"Authorization": f"Bearer {token}"},
+        files={"audio_file": (os.path.basename(path), audio)},
+        data={"conversation_history": "[]"},
+    )
+    response.raise_for_status()
+    return {"answer_s": time.perf_counter() - start, "text": response.json().get("transcribed_text", "")}
+
+
+async def time_stream(url: str, token: str, samples: np.ndarray, speed: float) -> dict:
+    ws_url = url.replace("http://", "ws://").replace("https://", "wss://") + "/query/voice/stream"
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    silence = to_pcm16(np.zeros(chunk, dtype=np.float32))
+    result = {}
+    async with websockets.connect(ws_url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        assert json.loads(await ws.recv())["type"] == "ready"
+        started = time.perf_counter()
+        speech_done = asyncio.Event()
+
+        async def sender():
+            for offset in range(0, len(samples), chunk):
+                await ws.send(to_pcm16(samples[offset:offset + chunk]))
+                await asyncio.sleep(CHUNK_MS / 1000 / speed)
+            result["speech_end"] = time.perf_counter()
+            speech_done.set()
+            while True:
+                await ws.send(silence)
+                await asyncio.sleep(CHUNK_MS / 1000 / speed)
+
+        send_task = asyncio.create_task(sender())
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if message["type"] == "partial" and "first_partial_s" not in result:
+                    result["first_partial_s"] = time.perf_counter() - started
+                elif message["type"] == "final":
+                    result["text"] = message["text"]
+                elif message["type"] in ("answer", "error"):
+                    await speech_done.wait()
+                    result["answer_s"] = time.perf_counter() - result["speech_end"]
+                    if message["type"] == "error":
+                        result["text"] = f"ERROR: {message['detail']}"
+                    break
+        finally:
+            send_task.cancel()
+    return result
+
+
+def summarize(name: str, values: list) -> str:
+    if not values:
+        return f"{name:<32} n/a"
+    return f"{name:<32} p50 {np.percentile(values, 50):7.2f} s   p95 {np.percentile(values, 95):7.2f} s"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("clips", nargs="+", help="Recorded voice queries (any format PyAV can decode).")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", default=os.getenv("FIREBASE_ID_TOKEN", ""))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed for simulated speaking (1.0 = real time).")
+    args = parser.parse_args()
+
+    upload_times, stream_times, partial_times = [], [], []
+    async with httpx.AsyncClient(timeout=300) as client:
+        for _ in range(args.repeat):
+            for path in args.clips:
+                samples = decode_audio(path, sampling_rate=SAMPLE_RATE)
+                clip_seconds = len(samples) / SAMPLE_RATE
+                upload = await time_upload(client, args.url, args.token, path)
+                stream = await time_stream(args.url, args.token, samples, args.speed)
+                upload_times.append(upload["answer_s"])
+                stream_times.append(stream["answer_s"])
+                if "first_partial_s" in stream:
+                    partial_times.append(stream["first_partial_s"])
+                print(f"{os.path.basename(path)} ({clip_seconds:.1f} s): /voice {upload['answer_s']:.2f} s, "
+                      f"/voice/stream {stream['answer_s']:.2f} s  [{stream.get('text', '')!r}]")
+
+    print()
+    print("Time to answer after the speaker stops:")
+    print(summarize("/voice (upload, then transcribe)", upload_times))
+    print(summarize("/voice/stream", stream_times))
+    print(summarize("first partial (from speech start)", partial_times))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# File: benchmarks/bench_whisper_pool.py
+# Transcription throughput (audio seconds per wall-clock second) across Whisper pool shapes.
+#
+# Every configuration is loaded and warmed up first, then transcribes the same batch of clips
+# with all of them submitted at once, as concurrent voice queries would be. Use recorded clips for
+# realistic numbers; without any, a synthetic clip is used (which mostly measures the encoder).
+#
+# Usage:
+#   python -m benchmarks.bench_whisper_pool clips/*.wav --configs 1x1 1x4 2x2 4x1
+#   python -m benchmarks.bench_whisper_pool --model base.en --compute-type int8 --requests 16
+#
+# A config is REPLICASxWORKERS (workers per replica); cpu_threads defaults to cores / total workers,
+# as in the service.
+
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+from faster_whisper import decode_audio
+
+from services.transcription_service import TranscriptionService, warmup_clip
+
+SAMPLE_RATE = 16000
+
+
+async def run_batch(service: TranscriptionService, clips: list) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*[service.transcribe_async(clip) for clip in clips])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("clips", nargs="*", help="Recorded clips (any format PyAV can decode).")
+    parser.add_argument("--configs", nargs="+", default=["1x1", "1x2", "1x4", "2x2", "4x1"])
+    parser.add_argument("--requests", type=int, default=8, help="Clips transcribed concurrently per configuration.")
+    parser.add_argument("--model", default=None, help="Model size (default: WHISPER_MODEL_SIZE).")
+    parser.add_argument("--compute-type", default=None, help="CTranslate2 compute type (default: WHISPER_COMPUTE_TYPE).")
+    parser.add_argument("--cpu-threads", type=int, default=0, help="Threads per worker (default: cores / workers).")
+    args = parser.parse_args()
+
+    audio = [decode_audio(path, sampling_rate=SAMPLE_RATE) for path in args.clips] or [np.tile(warmup_clip(), 4)]
+    batch = [audio[i % len(audio)] for i in range(args.requests)]
+    audio_seconds = sum(len(clip) for clip in batch) / SAMPLE_RATE
+    print(f"{len(batch)} requests, {audio_seconds:.1f} s of audio, {os.cpu_count()} cores\n")
+
+    overrides = {key: value for key, value in (("model_size", args.model), ("compute_type", args.compute_type)) if value}
+    print(f"{'replicas x workers':<20}{'threads':>8}{'load s':>9}{'warm-up s':>11}{'wall s':>9}{'audio s / s':>13}")
+    for config in args.configs:
+        replicas, workers_per_replica = (int(part) for part in config.lower().split("x"))
+        service = TranscriptionService(workers=replicas * workers_per_replica, queue_max=len(batch), replicas=replicas,
+                                       cpu_threads=args.cpu_threads, warmup=True, **overrides)
+        try:
+            wall = asyncio.run(run_batch(service, batch))
+        finally:
+            service.close()
+        print(f"{config:<20}{service.cpu_threads:>8}{service.load_seconds:>9.1f}{service.warmup_seconds:>11.2f}"
+              f"{wall:>9.2f}{audio_seconds / wall:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# File: benchmarks/fake_database.py
+# An in-process stand-in for Oracle, for benchmarks that must run without one.
+#
+# SqliteDatabase is a Database whose queries run against a SQLite file holding T_FIR_REGISTRATION
+# and M_DISTRICT, created from the shipped *_SCHEMA.txt files and filled with synthetic FIRs.
+# Generated Oracle SQL is translated with sqlglot, so the agent, SQL guard, result cache and result
+# handles all run unchanged on top of it. query_latency_ms adds a fixed delay per query to stand in
+# for the network round trip to a real server.
+#
+# There are no Oracle sessions. acquire() hands out a stand-in connection whose cursor answers the
+# data-dictionary queries of database.schema_catalog from the same schema files, so the schema
+# catalog and get_schema_string_for_tables work unchanged; any other statement on it raises
+# oracledb.NotSupportedError.
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+import oracledb
+import sqlglot
+
+from core.config import (
+    DB_EXECUTOR_WORKERS, RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL_SECONDS,
+    RESULT_HANDLE_MAX_ENTRIES, RESULT_HANDLE_TTL_SECONDS,
+)
+from database.columnar import ColumnarResult
+from database.connection import Database
+from database.result_cache import ResultCache
+from database.result_handles import ResultHandleStore
+from database.schema_catalog import parse_ddl
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SCHEMA_FILES = ("T_FIR_REGISTRATION_SCHEMA.txt", "M_DISTRICT_SCHEMA.txt")
+
+DISTRICTS = [
+    "Srikakulam", "Vizianagaram", "Visakhapatnam", "East Godavari", "West Godavari", "Krishna", "Guntur",
+    "Prakasam", "Nellore", "Kurnool", "Kadapa", "Anantapur", "Chittoor",
+]
+OFFENCES = [
+    "Theft", "House breaking", "Chain snatching", "Cheating", "Assault", "Road accident", "Cyber fraud",
+    "Dowry harassment", "Missing person", "Robbery",
+]
+YEARS = range(2019, 2025)
+STATIONS_PER_DISTRICT = 12
+# The schema files carry no constraints; these are the keys the real tables have.
+PRIMARY_KEYS = {"T_FIR_REGISTRATION": ["FIR_REG_NUM"], "M_DISTRICT": ["DISTRICT_CD"]}
+
+
+@lru_cache(maxsize=1024)
+def to_sqlite(query: str) -> str:
+    """Oracle SQL (including the FETCH FIRST / OFFSET wrappers the result handles add) as SQLite SQL."""
+    return sqlglot.transpile(query, read="oracle", write="sqlite")[0]
+
+
+def _sqlite_type(oracle_type: str) -> str:
+    oracle_type = oracle_type.upper()
+    if oracle_type.startswith("NUMBER"):
+        return "REAL" if "," in oracle_type and not oracle_type.rstrip(")").endswith(",0") else "INTEGER"
+    return "TEXT"  # VARCHAR2, CHAR, CLOB and DATE (stored as ISO text, which sorts and compares correctly).
+
+
+def _dictionary_type(column_type: str) -> tuple:
+    """'NUMBER(10, 2)' -> ('NUMBER', 22, 10, 2): DATA_TYPE, DATA_LENGTH, DATA_PRECISION, DATA_SCALE as ALL_TAB_COLUMNS has them."""
+    name, _, size = column_type.upper().partition("(")
+    sizes = [int(part) for part in size.rstrip(")").split(",") if part.strip()]
+    if name == "NUMBER":
+        return name, 22, sizes[0] if sizes else None, sizes[1] if len(sizes) > 1 else (0 if sizes else None)
+    return name, sizes[0] if sizes else 7, None, None
+
+
+def _load_schema_files() -> Dict[str, Dict[str, Any]]:
+    tables = {}
+    for name in _SCHEMA_FILES:
+        with open(os.path.join(_PROJECT_ROOT, name), "r") as f:
+            tables.update(parse_ddl(f.read()))
+    return tables
+
+
+class _DictionaryCursor:
+    """Answers the ALL_* dictionary queries of database.schema_catalog from the parsed schema files."""
+
+    def __init__(self, tables: Dict[str, Dict[str, Any]]):
+        self.tables = tables
+        self.arraysize = 100
+        self._rows: List[tuple] = []
+
+    def execute(self, statement: str, parameters: Optional[dict] = None, **kwargs):
+        binds = {**(parameters or {}), **kwargs}
+        if "ALL_TAB_COLUMNS" in statement:
+            wanted = {value for key, value in binds.items() if key.startswith("table_")}
+            self._rows = [
+                (table_name, column["name"], *_dictionary_type(column["type"]), "Y" if column["nullable"] else "N", column["comment"])
+                for table_name, table in self.tables.items() if not wanted or table_name in wanted
+                for column in table["columns"]
+            ]
+        elif "ALL_CONSTRAINTS" in statement:
+            self._rows = [
+                (table_name, f"{table_name}_PK", "P", column, None, None)
+                for table_name, columns in PRIMARY_KEYS.items() if table_name in self.tables
+                for column in columns
+            ]
+        elif "ALL_TAB_COMMENTS" in statement or "ALL_INDEXES" in statement:
+            self._rows = []
+        else:
+            raise oracledb.NotSupportedError("SqliteDatabase sessions only answer data-dictionary queries.")
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _DictionaryConnection:
+    def __init__(self, tables: Dict[str, Dict[str, Any]]):
+        self.tables = tables
+
+    def cursor(self) -> _DictionaryCursor:
+        return _DictionaryCursor(self.tables)
+
+
+def _value_type(values: List[Any]) -> str:
+    sample = next((value for value in values if value is not None), None)
+    if isinstance(sample, (int, float)):
+        return "number"
+    return "string"
+
+
+class SqliteDatabase(Database):
+    """A Database backed by SQLite; see the top of this module."""
+
+    def __init__(self, fir_rows: int = 20000, query_latency_ms: float = 0.0, workers: int = DB_EXECUTOR_WORKERS,
+                 path: Optional[str] = None, seed: int = 0):
+        # Instance attributes shadow the pooled class-level ones, so a real Database in the same
+        # process is unaffected. The base class only checks that a pool exists.
+        self.pool = "sqlite"
+        self.db_owner = "BENCH"
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite-db")
+        self.result_cache = ResultCache(int(RESULT_CACHE_MAX_MB * 1024 * 1024), RESULT_CACHE_TTL_SECONDS) if RESULT_CACHE_ENABLED else None
+        self.result_handles = ResultHandleStore(RESULT_HANDLE_MAX_ENTRIES, RESULT_HANDLE_TTL_SECONDS)
+        self.query_latency = query_latency_ms / 1000
+        self.path = path or os.path.join(tempfile.mkdtemp(prefix="bluequery-bench-"), "bench.db")
+        self._local = threading.local()
+        self.tables = _load_schema_files()
+        if not os.path.exists(self.path):
+            start = time.perf_counter()
+            self._populate(fir_rows, seed)
+            print(f"FAKE DB: {fir_rows} FIRs in {len(DISTRICTS)} districts written to {self.path} in {time.perf_counter() - start:.1f} s.")
+
+    # --- Data ---
+
+    def _populate(self, fir_rows: int, seed: int):
+        tables = self.tables
+        rng = random.Random(seed)
+        now = datetime(2025, 1, 1)
+
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for table_name, table in tables.items():
+                columns = ", ".join(f"{c['name']} {_sqlite_type(c['type'])}" for c in table["columns"])
+                connection.execute(f"CREATE TABLE {table_name} ({columns})")
+            # Oracle's one-row table, for queries such as SELECT SYSDATE FROM DUAL.
+            connection.execute("CREATE TABLE DUAL (DUMMY TEXT)")
+            connection.execute("INSERT INTO DUAL VALUES ('X')")
+
+            districts = [
+                {"DISTRICT_CD": code, "LANG_CD": 1, "STATE_CD": 28, "DISTRICT": name, "RECORD_STATUS": "A",
+                 "LAST_UPDATED_ON": now.isoformat(sep=" "), "DIST_SHORT_FORM": name[:3].upper(), "SEB_FLAG": 0}
+                for code, name in enumerate(DISTRICTS, start=1)
+            ]
+            self._insert(connection, tables["M_DISTRICT"]["columns"], "M_DISTRICT", districts)
+
+            firs = []
+            for number in range(1, fir_rows + 1):
+                district = rng.randint(1, len(DISTRICTS))
+                year = rng.choice(YEARS)
+                registered = datetime(year, 1, 1) + timedelta(days=rng.randrange(365), minutes=rng.randrange(1440))
+                offence = rng.choice(OFFENCES)
+                firs.append({
+                    "FIR_REG_NUM": 10 ** 12 + number, "DISTRICT_CD": district, "PS_CD": district * 100 + rng.randint(1, STATIONS_PER_DISTRICT),
+                    "FIR_SRNO": number, "REG_YEAR": year, "REG_DT": registered.isoformat(sep=" "),
+                    "NATURE_OF_OFFENCE": offence, "CRIME_CLASS_CD": OFFENCES.index(offence) + 1, "GRAVE_TYPE_CD": rng.randint(1, 3),
+                    "FIR_STATUS": rng.randint(1, 4), "PROPERTY_VALUE": rng.choice((None, rng.randrange(1000, 500000))),
+                    "PERSONS_DEAD_COUNT": int(offence == "Road accident" and rng.random() < 0.2),
+                    "RECORD_CREATED_ON": registered.isoformat(sep=" "), "RECORD_UPDATED_ON": registered.isoformat(sep=" "),
+                    "FIR_CONTENTS": f"{offence} reported at police station {district * 100} in {DISTRICTS[district - 1]} on "
+                                    f"{registered:%d %B %Y}. The complainant stated that the incident happened near the market "
+                                    f"around {registered:%H:%M}. Investigation is in progress.",
+                })
+            self._insert(connection, tables["T_FIR_REGISTRATION"]["columns"], "T_FIR_REGISTRATION", firs)
+            connection.execute("CREATE INDEX FIR_DISTRICT_IDX ON T_FIR_REGISTRATION (DISTRICT_CD)")
+            connection.execute("CREATE INDEX FIR_YEAR_IDX ON T_FIR_REGISTRATION (REG_YEAR)")
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, columns: List[Dict[str, Any]], table_name: str, rows: List[Dict[str, Any]]):
+        """Inserts rows, filling NOT NULL columns they leave out with a neutral value of the column's type."""
+        def default(column: Dict[str, Any]) -> Any:
+            if column["nullable"]:
+                return None
+            column_type = column["type"].upper()
+            if column_type.startswith("NUMBER"):
+                return 0
+            if column_type.startswith("DATE"):
+                return "2025-01-01 00:00:00"
+            return "N" if column_type.startswith("CHAR") else ""
+
+        defaults = {column["name"]: default(column) for column in columns}
+        names = [column["name"] for column in columns]
+        placeholders = ", ".join("?" for _ in names)
+        connection.executemany(
+            f"INSERT INTO {table_name} ({', '.join(names)}) VALUES ({placeholders})",
+            ([row.get(name, defaults[name]) for name in names] for row in rows),
+        )
+
+    # --- Queries ---
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def acquire(self):
+        """A stand-in session for data-dictionary reads; queries go through execute_sql_query instead."""
+        yield _DictionaryConnection(self.tables)
+
+    def execute_sql_query(self, query: str, params: Optional[dict] = None, max_rows: Optional[int] = None, skip_rows: int = 0,
+                          columnar: bool = False, call_timeout: Optional[int] = None):
+        try:
+            sql = to_sqlite(query)
+        except sqlglot.errors.SqlglotError as e:
+            return None, f"Could not translate the query for SQLite: {e}"
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        try:
+            cursor = self._connection().execute(sql, params or {})
+            if not cursor.description:
+                return (ColumnarResult([], []) if columnar else []), None
+            if skip_rows:
+                cursor.fetchmany(skip_rows)
+            rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+        except sqlite3.Error as e:
+            return None, f"{type(e).__name__}: {e}"
+        columns = [col[0].lower() for col in cursor.description]
+        if columnar:
+            types = [_value_type([row[i] for row in rows]) for i in range(len(columns))]
+            return ColumnarResult.from_rows(columns, types, rows), None
+        return [dict(zip(columns, row)) for row in rows], None
+
+    def iter_query_batches(self, query: str, params: Optional[dict] = None, batch_size: int = 1000, call_timeout: Optional[int] = None,
+                           max_rows: Optional[int] = None, max_seconds: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        started = time.perf_counter()
+        sent = 0
+        cursor = self._connection().execute(to_sqlite(query), params or {})
+        columns = [col[0].lower() for col in cursor.description]
+        while (max_rows is None or sent < max_rows) and (max_seconds is None or time.perf_counter() - started <= max_seconds):
+            rows = cursor.fetchmany(batch_size if max_rows is None else min(batch_size, max_rows - sent))
+            if not rows:
+                return
+            sent += len(rows)
+            yield [dict(zip(columns, row)) for row in rows]
+
+    def explain_plan(self, query: str, call_timeout: Optional[int] = None):
+        # No optimizer estimates to check; every query is reported as cheap.
+        return {"cost": 10, "cardinality": 100, "bytes": 1000}, None
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return {"status": "sqlite", "path": self.path}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
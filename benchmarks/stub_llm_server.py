@@ -0,0 +1,126 @@
+# File: benchmarks/stub_llm_server.py
+# A stand-in for the OpenAI-compatible LLM server, for benchmarks that must run without a GPU.
+#
+# Serves /v1/chat/completions (plain and streaming) with canned answers chosen from the prompt:
+#   routing prompts     DATA_QUERY, or GENERAL_CONVERSATION for greetings
+#   SQL prompts         a query over T_FIR_REGISTRATION / M_DISTRICT picked by keywords in the question
+#   chart prompts       a bar chart over the first two columns
+#   anything else       a filler answer of --answer-tokens tokens
+# Every completion takes --latency-ms to its first token and then streams at --tokens-per-second,
+# so the timing of a real server can be imitated. Words stand in for tokens.
+#
+# Usage:
+#   python -m benchmarks.stub_llm_server --port 8001 --latency-ms 150 --tokens-per-second 40
+#   python -m benchmarks.stub_llm_server --sql canned_sql.json
+#
+# --sql takes a JSON object of {"regex": "SQL"} pairs, tried in order before the built-in ones.
+
+import argparse
+import asyncio
+import json
+import re
+import time
+import uuid
+from typing import List, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CANNED_SQL: List[Tuple[str, str]] = [
+    (r"\bdistrict", "SELECT d.DISTRICT, COUNT(f.FIR_REG_NUM) AS CASES FROM T_FIR_REGISTRATION f "
+                    "JOIN M_DISTRICT d ON f.DISTRICT_CD = d.DISTRICT_CD GROUP BY d.DISTRICT ORDER BY CASES DESC"),
+    (r"\b(year|trend|annual)", "SELECT REG_YEAR, COUNT(*) AS CASES FROM T_FIR_REGISTRATION GROUP BY REG_YEAR ORDER BY REG_YEAR"),
+    (r"\b(offence|crime type|nature)", "SELECT NATURE_OF_OFFENCE, COUNT(*) AS CASES FROM T_FIR_REGISTRATION "
+                                       "GROUP BY NATURE_OF_OFFENCE ORDER BY CASES DESC"),
+    (r"\b(station|police station)", "SELECT PS_CD, COUNT(*) AS CASES FROM T_FIR_REGISTRATION GROUP BY PS_CD ORDER BY CASES DESC"),
+    (r"\b(list|show|recent|latest)", "SELECT FIR_REG_NUM, REG_DT, NATURE_OF_OFFENCE, DISTRICT_CD FROM T_FIR_REGISTRATION ORDER BY REG_DT DESC"),
+]
+DEFAULT_SQL = "SELECT COUNT(*) AS TOTAL_CASES FROM T_FIR_REGISTRATION"
+_GREETING = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening)|what can you do)\b", re.IGNORECASE)
+_FILLER = ("Based on the records retrieved, the figures show a steady pattern across the districts, with the largest "
+           "share of cases concentrated in a few areas and the remainder spread evenly. ").split()
+
+app = FastAPI(title="Stub LLM server")
+settings = argparse.Namespace(latency_ms=150.0, tokens_per_second=40.0, answer_tokens=80, sql=CANNED_SQL)
+
+
+def _quoted_after(marker: str, prompt: str) -> str:
+    match = re.search(re.escape(marker) + r'[^"]*"(.*?)"', prompt, re.DOTALL)
+    return match.group(1) if match else ""
+
+
+def answer_for(prompt: str) -> str:
+    if "You are a routing agent" in prompt:
+        return "GENERAL_CONVERSATION" if _GREETING.match(_quoted_after("User Question:", prompt)) else "DATA_QUERY"
+    if "Oracle SQL developer" in prompt:
+        question = _quoted_after("NEW USER'S QUESTION", prompt).lower()
+        return next((sql for pattern, sql in settings.sql if re.search(pattern, question)), DEFAULT_SQL)
+    if "data visualization expert" in prompt:
+        match = re.search(r"The columns and their detected types are:\s*(\{.*?\})", prompt, re.DOTALL)
+        columns = list(json.loads(match.group(1))) if match else []
+        if len(columns) < 2:
+            return json.dumps({"chart_type": "none"})
+        return json.dumps({"chart_type": "bar", "label_column": columns[0], "value_column": columns[1]})
+    return " ".join(_FILLER[i % len(_FILLER)] for i in range(settings.answer_tokens))
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason=None) -> str:
+    return "data: " + json.dumps({
+        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }) + "\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    model = body.get("model", "stub")
+    words = answer_for(prompt).split(" ")
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    per_token = 1 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(settings.latency_ms / 1000)
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(per_token)
+                yield _chunk(completion_id, model, {"content": word if i == 0 else " " + word})
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(settings.latency_ms / 1000 + per_token * max(0, len(words) - 1))
+    return JSONResponse({
+        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words), "total_tokens": len(prompt.split()) + len(words)},
+    })
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "benchmarks"}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=settings.latency_ms, help="Time to the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=settings.tokens_per_second, help="0 returns the whole answer at once.")
+    parser.add_argument("--answer-tokens", type=int, default=settings.answer_tokens, help="Length of synthesized answers.")
+    parser.add_argument("--sql", help="JSON file of {regex: SQL} pairs tried before the built-in canned queries.")
+    args = parser.parse_args()
+
+    settings.latency_ms, settings.tokens_per_second, settings.answer_tokens = args.latency_ms, args.tokens_per_second, args.answer_tokens
+    if args.sql:
+        with open(args.sql, "r") as f:
+            settings.sql = list(json.load(f).items()) + CANNED_SQL
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
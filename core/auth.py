@@ -1,26 +1,82 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 import firebase_admin
 from firebase_admin import credentials, auth
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from core.config import FIREBASE_KEY_PATH
+from core.config import FIREBASE_KEY_PATH, AUTH_CACHE_MAX_ENTRIES, AUTH_CERT_REFRESH_SECONDS
+from core.tracing import get_logger
+
+log = get_logger("auth")
 
 try:
     cred = credentials.Certificate(FIREBASE_KEY_PATH)
     firebase_admin.initialize_app(cred)
 except Exception as e:
-    print(f"Failed to initialize Firebase Admin SDK: {e}")
+    log.error("Failed to initialize Firebase Admin SDK", extra={"error": str(e)})
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-async def verify_firebase_token(token: str = Depends(oauth2_scheme)):
+
+class ClaimsCache:
+    """
+    LRU cache of decoded token claims, keyed by the SHA-256 of the token (the token itself is never
+    stored). An entry is served only until the token's own exp.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            claims = self._entries.get(key)
+            if claims is not None and claims.get("exp", 0) > time.time():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return claims
+            if claims is not None:
+                del self._entries[key]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, token: str, claims: dict):
+        if self.max_entries <= 0 or "exp" not in claims:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = claims
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+claims_cache = ClaimsCache(AUTH_CACHE_MAX_ENTRIES)
+
+
+def _check_initialized():
     if not firebase_admin._apps:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Firebase Admin SDK not initialized."
         )
+
+
+def _verify_uncached(token: str) -> dict:
     try:
         decoded_token = auth.verify_id_token(token)
-        return decoded_token
     except auth.InvalidIdTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -31,4 +87,82 @@ async def verify_firebase_token(token: str = Depends(oauth2_scheme)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during token verification: {e}",
-        )
\ No newline at end of file
+        )
+    claims_cache.put(token, decoded_token)
+    return decoded_token
+
+
+def verify_token(token: str) -> dict:
+    """Verifies a Firebase ID token and returns its claims; raises HTTPException otherwise. Blocking on a cache miss."""
+    _check_initialized()
+    claims = claims_cache.get(token)
+    return claims if claims is not None else _verify_uncached(token)
+
+
+async def verify_token_async(token: str) -> dict:
+    """verify_token without blocking the event loop: cached tokens return at once, others verify in a worker thread."""
+    _check_initialized()
+    claims = claims_cache.get(token)
+    return claims if claims is not None else await asyncio.to_thread(_verify_uncached, token)
+
+
+async def verify_firebase_token(request: Request, token: str = Depends(oauth2_scheme)):
+    # The router and the endpoints both declare this dependency; verify once per request.
+    claims = getattr(request.state, "firebase_claims", None)
+    if claims is None:
+        claims = await verify_token_async(token)
+        request.state.firebase_claims = claims
+    return claims
+
+
+def refresh_certificates() -> bool:
+    """
+    Re-downloads Google's ID-token signing certificates into firebase_admin's HTTP cache, so no
+    request has to wait for the fetch. Relies on firebase_admin internals; returns False if they
+    are not as expected.
+    """
+    try:
+        verifier = auth._get_client(None)._token_verifier
+        request, cert_url = verifier.request, verifier.id_token_verifier.cert_url
+    except (AttributeError, ValueError) as e:
+        log.warning("Cannot prefetch certificates with this firebase_admin version", extra={"error": str(e)})
+        return False
+    # no-cache makes the cached session revalidate; the fresh response replaces the cached one.
+    response = request(url=cert_url, method="GET", headers={"Cache-Control": "no-cache"})
+    if response.status != 200:
+        log.warning("Certificate refresh failed", extra={"status": response.status})
+        return False
+    return True
+
+
+_refresh_thread: Optional[threading.Thread] = None
+_refresh_stop = threading.Event()
+
+
+def start_certificate_refresh(interval_seconds: int = AUTH_CERT_REFRESH_SECONDS):
+    """
+    Fetches the certificates now and then every interval_seconds, on a daemon thread. Called from
+    the app lifespan, so importing this module (tools, benchmarks) starts no network polling.
+    """
+    global _refresh_thread
+    if interval_seconds <= 0 or _refresh_thread is not None or not firebase_admin._apps:
+        return
+
+    def _loop():
+        while not _refresh_stop.is_set():
+            try:
+                refresh_certificates()
+            except Exception as e:
+                log.warning("Certificate refresh failed", extra={"error": str(e)})
+            _refresh_stop.wait(interval_seconds)
+
+    _refresh_stop.clear()
+    _refresh_thread = threading.Thread(target=_loop, name="auth-cert-refresh", daemon=True)
+    _refresh_thread.start()
+    log.info("Certificate refresh started", extra={"interval_seconds": interval_seconds})
+
+
+def stop_certificate_refresh():
+    global _refresh_thread
+    _refresh_stop.set()
+    _refresh_thread = None
@@ -0,0 +1,163 @@
+# File: core/components.py
+# The heavyweight parts of the server (the agent with its Oracle pool and schema catalog, the
+# embedder, the tokenizer and the Whisper pool), created in the FastAPI lifespan instead of at
+# import. Startup components load concurrently in worker threads; lazy ones on first use.
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from core.config import (
+    WHISPER_LOAD_MODE, SQL_CACHE_ENABLED, ROUTER_MODE, SCHEMA_LINKING_ENABLED, RAG_BUILD_ON_STARTUP,
+)
+
+# How a component is loaded: with the server ('startup'), by the first request that needs it ('lazy'),
+# or not at all ('off').
+LOAD_MODES = ("startup", "lazy", "off")
+
+
+class ComponentUnavailable(RuntimeError):
+    """Raised when a component is disabled, still loading, or failed to load."""
+
+
+class _Component:
+    def __init__(self, name: str, factory: Callable[[], Any], mode: str, close: Optional[Callable[[Any], None]]):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{mode}' for component '{name}'.")
+        self.name = name
+        self.factory = factory
+        self.mode = mode
+        self.close = close
+        self.value: Any = None
+        self.status = "off" if mode == "off" else "pending"
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class ComponentRegistry:
+    """Named components with their load mode, status and initialisation time."""
+
+    def __init__(self):
+        self._components: Dict[str, _Component] = {}
+        self.startup_seconds: Optional[float] = None
+
+    def register(self, name: str, factory: Callable[[], Any], mode: str = "startup", close: Optional[Callable[[Any], None]] = None):
+        self._components[name] = _Component(name, factory, mode, close)
+
+    async def _init(self, component: _Component) -> Any:
+        component.status = "loading"
+        start = time.perf_counter()
+        try:
+            # Factories block (network, disk, model loading); threads let them overlap.
+            value = await asyncio.to_thread(component.factory)
+        except Exception as e:
+            component.status, component.error = "failed", str(e)
+            print(f"STARTUP: {component.name} failed after {time.perf_counter() - start:.2f} s: {e}")
+            raise
+        finally:
+            component.init_seconds = time.perf_counter() - start
+        component.value, component.status, component.error = value, "ready", None
+        print(f"STARTUP: {component.name} ready in {component.init_seconds:.2f} s.")
+        return value
+
+    async def load(self, name: str) -> Any:
+        """Loads a component, or waits for the load already under way. A failed load is retried."""
+        component = self._components[name]
+        if component.mode == "off":
+            raise ComponentUnavailable(f"'{name}' is disabled on this server.")
+        if component.task is None or (component.task.done() and component.status == "failed"):
+            component.task = asyncio.create_task(self._init(component))
+        # Shielded so one cancelled caller does not cancel the load for everyone else waiting on it.
+        return await asyncio.shield(component.task)
+
+    async def start(self):
+        """Loads every startup component concurrently. Failures are reported by report(), not raised."""
+        start = time.perf_counter()
+        names = [name for name, component in self._components.items() if component.mode == "startup"]
+        await asyncio.gather(*(self.load(name) for name in names), return_exceptions=True)
+        self.startup_seconds = time.perf_counter() - start
+        serial = sum(self._components[name].init_seconds or 0.0 for name in names)
+        print(f"STARTUP: {len(names)} components initialised in {self.startup_seconds:.2f} s ({serial:.2f} s if run one after another).")
+
+    async def acquire(self, name: str) -> Any:
+        """The component's value; lazy components are loaded here, startup ones must have finished loading."""
+        component = self._components[name]
+        if component.status == "ready":
+            return component.value
+        if component.mode == "lazy":
+            try:
+                return await self.load(name)
+            except Exception as e:
+                raise ComponentUnavailable(f"'{name}' could not be loaded: {e}")
+        if component.mode == "off":
+            raise ComponentUnavailable(f"'{name}' is disabled on this server.")
+        if component.status == "failed":
+            raise ComponentUnavailable(f"'{name}' failed to load: {component.error}")
+        raise ComponentUnavailable(f"'{name}' is still loading.")
+
+    def get(self, name: str) -> Any:
+        """The component's value if it has loaded, otherwise None; never triggers a load."""
+        component = self._components[name]
+        return component.value if component.status == "ready" else None
+
+    @property
+    def ready(self) -> bool:
+        """True once every startup component has loaded."""
+        return all(c.status == "ready" for c in self._components.values() if c.mode == "startup")
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "startup_ms": round(self.startup_seconds * 1000, 1) if self.startup_seconds is not None else None,
+            "components": {
+                c.name: {
+                    "mode": c.mode,
+                    "status": c.status,
+                    "init_ms": round(c.init_seconds * 1000, 1) if c.init_seconds is not None else None,
+                    "error": c.error,
+                }
+                for c in self._components.values()
+            },
+        }
+
+    def close(self):
+        for component in self._components.values():
+            if component.close is not None and component.value is not None:
+                try:
+                    component.close(component.value)
+                except Exception as e:
+                    print(f"STARTUP: Closing {component.name} failed: {e}")
+
+
+# --- Factories. Heavy modules are imported here, in the loading thread, so importing the app stays cheap. ---
+
+def _create_agent():
+    from agents.core_agent import CoreInvestigationAgent
+    return CoreInvestigationAgent()
+
+
+def _load_embedder():
+    from rag.pipeline import RagPipeline
+    return RagPipeline.get_embedder()
+
+
+def _load_tokenizer():
+    from llm.tokenizer import load_tokenizer
+    # None when no tokenizer is configured; the agent then estimates prompt sizes.
+    return load_tokenizer() or "estimate"
+
+
+def _create_transcriber():
+    from services.transcription_service import TranscriptionService
+    return TranscriptionService()
+
+
+# The embedder is needed by the first query when any of these use it; otherwise only RAG fallbacks load it.
+_EMBEDDER_MODE = "startup" if (SQL_CACHE_ENABLED or ROUTER_MODE in ("local", "shadow") or SCHEMA_LINKING_ENABLED or RAG_BUILD_ON_STARTUP) else "lazy"
+
+components = ComponentRegistry()
+components.register("agent", _create_agent, close=lambda agent: agent.db.close())
+components.register("embedder", _load_embedder, mode=_EMBEDDER_MODE)
+components.register("tokenizer", _load_tokenizer)
+components.register("transcriber", _create_transcriber, mode=WHISPER_LOAD_MODE, close=lambda transcriber: transcriber.close())
@@ -13,12 +13,181 @@ ORACLE_PORT = os.getenv("ORACLE_PORT")
 ORACLE_SERVICE = os.getenv("ORACLE_SERVICE")
 ORACLE_SCHEMA_OWNER = os.getenv("ORACLE_SCHEMA_OWNER")
 
+# --- Oracle Session Pool Configuration ---
+# Every request borrows its own session from the pool instead of sharing one connection.
+ORACLE_POOL_MIN = int(os.getenv("ORACLE_POOL_MIN", "2"))
+ORACLE_POOL_MAX = int(os.getenv("ORACLE_POOL_MAX", "10"))
+ORACLE_POOL_INCREMENT = int(os.getenv("ORACLE_POOL_INCREMENT", "1"))
+# Seconds a session may sit idle before it is pinged on checkout (0 = ping on every checkout).
+ORACLE_POOL_PING_INTERVAL = int(os.getenv("ORACLE_POOL_PING_INTERVAL", "60"))
+# Seconds a request waits for a free session before giving up.
+ORACLE_POOL_WAIT_TIMEOUT = int(os.getenv("ORACLE_POOL_WAIT_TIMEOUT", "30"))
+# Worker threads that run blocking Oracle calls off the event loop. Defaults to the pool size,
+# since a thread without a free session would only wait on the pool anyway.
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(ORACLE_POOL_MAX)))
+
 # --- Firebase Configuration ---
 FIREBASE_KEY_PATH = os.getenv("FIREBASE_SERVICE_ACCOUNT_KEY_PATH")
+# Verified ID tokens are remembered (by hash) until they expire, so each token is checked once.
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Seconds between background refreshes of Google's signing certificates (0 disables the refresh).
+AUTH_CERT_REFRESH_SECONDS = int(os.getenv("AUTH_CERT_REFRESH_SECONDS", "3600"))
+
+# --- SQL Result Cache Configuration ---
+# Results of executed queries are reused until a referenced table changes or the TTL expires.
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESULT_CACHE_MAX_MB = float(os.getenv("RESULT_CACHE_MAX_MB", "256"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+# How long a table-freshness probe is trusted before the table is probed again.
+RESULT_CACHE_PROBE_INTERVAL_SECONDS = float(os.getenv("RESULT_CACHE_PROBE_INTERVAL_SECONDS", "5"))
+# TABLE:COLUMN pairs probed with COUNT(*) + MAX(column); other tables fall back to MAX(ORA_ROWSCN).
+RESULT_CACHE_FRESHNESS_COLUMNS = dict(
+    pair.split(":", 1) for pair in os.getenv(
+        "RESULT_CACHE_FRESHNESS_COLUMNS", "T_FIR_REGISTRATION:RECORD_UPDATED_ON,M_DISTRICT:LAST_UPDATED_ON"
+    ).upper().split(",") if ":" in pair
+)
 
 # --- Language Model Configuration ---
 # These now correctly match your .env file
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 LLM_MODEL_NAME = os.getenv("LLM_MODEL_NAME")
+# Hugging Face repo id of the served model's tokenizer (e.g. "Qwen/Qwen2.5-7B-Instruct"), used to
+# count prompt tokens. LLM_MODEL_NAME is the serving name and usually not a hub id, so it is not
+# used as a fallback; when unset, tokens are estimated from length.
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER", "")
+
+# --- Language Model HTTP Client Configuration ---
+# One keep-alive client is shared by every request in the process.
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes")
+# Maximum completions in flight against the LLM server; further calls queue in this process.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+
+# --- Speech-to-Text Configuration ---
+# faster-whisper model: size (tiny.en ... large-v3), device and CTranslate2 compute type.
+WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny.en")
+WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+# 'startup' loads the Whisper pool with the server, 'lazy' on the first voice query (for nodes that
+# rarely serve voice), 'off' disables the voice endpoints.
+WHISPER_LOAD_MODE = os.getenv("WHISPER_LOAD_MODE", "startup").lower()
+WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Models are downloaded here once and loaded from disk afterwards; set WHISPER_LOCAL_FILES_ONLY on hosts without internet access.
+WHISPER_MODEL_DIR = os.getenv("WHISPER_MODEL_DIR", "whisper_models")
+WHISPER_LOCAL_FILES_ONLY = os.getenv("WHISPER_LOCAL_FILES_ONLY", "false").lower() in ("1", "true", "yes")
+# Independent copies of the model; the workers below are split between them.
+WHISPER_REPLICAS = int(os.getenv("WHISPER_REPLICAS", "1"))
+# Decode a short synthetic clip on every replica at startup so the first voice query is not the slow one.
+WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "true").lower() in ("1", "true", "yes")
+# Voice queries transcribed at once; each worker is a CTranslate2 worker sharing its replica's weights.
+TRANSCRIBE_WORKERS = int(os.getenv("TRANSCRIBE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Threads per worker (0 divides the machine's cores evenly between the workers).
+TRANSCRIBE_CPU_THREADS = int(os.getenv("TRANSCRIBE_CPU_THREADS", "0"))
+# Voice queries allowed to wait for a free worker; beyond that /voice answers 503.
+TRANSCRIBE_QUEUE_MAX = int(os.getenv("TRANSCRIBE_QUEUE_MAX", "16"))
+
+# --- Voice Streaming Configuration ---
+# Trailing silence that ends an utterance on /voice/stream, and the longest utterance accepted.
+VOICE_STREAM_SILENCE_MS = int(os.getenv("VOICE_STREAM_SILENCE_MS", "700"))
+VOICE_STREAM_MAX_SECONDS = float(os.getenv("VOICE_STREAM_MAX_SECONDS", "30"))
+# Silero VAD speech probability threshold.
+VOICE_STREAM_VAD_THRESHOLD = float(os.getenv("VOICE_STREAM_VAD_THRESHOLD", "0.5"))
+# New audio between partial transcripts.
+VOICE_STREAM_PARTIAL_INTERVAL_MS = int(os.getenv("VOICE_STREAM_PARTIAL_INTERVAL_MS", "1000"))
+
+# --- Agent Execution Configuration ---
+# 'speculative' starts SQL generation alongside routing and charts alongside synthesis;
+# 'sequential' runs every stage one after another.
+AGENT_EXECUTION_MODE = os.getenv("AGENT_EXECUTION_MODE", "speculative").lower()
+# 'local' routes with keyword rules + embedding centroids and asks the LLM only when unsure,
+# 'shadow' routes with the LLM but logs whether the local router agreed, 'llm' always asks the LLM.
+ROUTER_MODE = os.getenv("ROUTER_MODE", "local").lower()
+# Minimum centroid-similarity margin for the local router to decide without the LLM.
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.05"))
+
+# --- RAG Index Configuration ---
+# The FIR vector index is built once, saved here and memory-mapped by every worker.
+RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+RAG_EMBEDDER_MODEL = os.getenv("RAG_EMBEDDER_MODEL", "all-MiniLM-L6-v2")
+# Column whose maximum value (together with the row count) tells us the saved index is stale.
+RAG_WATERMARK_COLUMN = os.getenv("RAG_WATERMARK_COLUMN", "RECORD_UPDATED_ON")
+RAG_BUILD_ON_STARTUP = os.getenv("RAG_BUILD_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+# Rows per Oracle round trip and texts per embedding batch during ingestion.
+RAG_FETCH_ARRAYSIZE = int(os.getenv("RAG_FETCH_ARRAYSIZE", "1000"))
+RAG_EMBED_BATCH_SIZE = int(os.getenv("RAG_EMBED_BATCH_SIZE", "256"))
+# Index backend: flat (exact), ivf_flat, ivf_pq or hnsw, plus their build and search knobs.
+RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat").lower()
+RAG_IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "1024"))
+RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+RAG_PQ_M = int(os.getenv("RAG_PQ_M", "16"))
+RAG_PQ_NBITS = int(os.getenv("RAG_PQ_NBITS", "8"))
+RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+RAG_HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "80"))
+RAG_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+# Seconds between incremental index refreshes (0 disables the background refresh).
+RAG_REFRESH_INTERVAL_SECONDS = int(os.getenv("RAG_REFRESH_INTERVAL_SECONDS", "0"))
+
+# --- Result Size Configuration ---
+# Generated queries return at most this many rows inline; the rest is reachable through a result handle.
+SQL_ROW_CAP = int(os.getenv("SQL_ROW_CAP", "1000"))
+# Default and maximum page sizes for /query/results/{id}.
+RESULT_PAGE_SIZE = int(os.getenv("RESULT_PAGE_SIZE", "500"))
+RESULT_PAGE_MAX = int(os.getenv("RESULT_PAGE_MAX", "5000"))
+RESULT_HANDLE_MAX_ENTRIES = int(os.getenv("RESULT_HANDLE_MAX_ENTRIES", "1000"))
+RESULT_HANDLE_TTL_SECONDS = int(os.getenv("RESULT_HANDLE_TTL_SECONDS", "3600"))
+# Rows per fetchmany round trip when streaming a download.
+RESULT_DOWNLOAD_BATCH_SIZE = int(os.getenv("RESULT_DOWNLOAD_BATCH_SIZE", "1000"))
+# A download stops after this many rows or seconds, so one client cannot hold a pooled session indefinitely.
+RESULT_DOWNLOAD_MAX_ROWS = int(os.getenv("RESULT_DOWNLOAD_MAX_ROWS", "1000000"))
+RESULT_DOWNLOAD_MAX_SECONDS = float(os.getenv("RESULT_DOWNLOAD_MAX_SECONDS", "300"))
+
+# --- Synthesis Prompt Configuration ---
+# Token budget for the evidence in the synthesis prompt; larger results are summarized to fit.
+SYNTHESIS_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_TOKEN_BUDGET", "3000"))
+# Rows included verbatim alongside the statistics of a summarized result.
+SYNTHESIS_TOP_K_ROWS = int(os.getenv("SYNTHESIS_TOP_K_ROWS", "20"))
+
+# --- Schema Catalog Configuration ---
+# Versioned JSON snapshot of the data dictionary, loaded at startup instead of querying Oracle.
+SCHEMA_SNAPSHOT_PATH = os.getenv("SCHEMA_SNAPSHOT_PATH", "schema_catalog.json")
+# Comma-separated tables exposed to the agent; empty means every table of ORACLE_SCHEMA_OWNER.
+SCHEMA_TABLES = [t.strip().upper() for t in os.getenv("SCHEMA_TABLES", "").split(",") if t.strip()]
+# CREATE TABLE files used when neither the snapshot nor the database is available.
+SCHEMA_FALLBACK_FILES = [f.strip() for f in os.getenv("SCHEMA_FALLBACK_FILES", "T_FIR_REGISTRATION_SCHEMA.txt,M_DISTRICT_SCHEMA.txt").split(",") if f.strip()]
+
+# --- Schema Linking Configuration ---
+# Schema linking sends only the tables/columns relevant to a question to the SQL prompt.
+SCHEMA_LINKING_ENABLED = os.getenv("SCHEMA_LINKING_ENABLED", "true").lower() in ("1", "true", "yes")
+# Approximate token budget for the trimmed CREATE TABLE text.
+SCHEMA_LINK_TOKEN_BUDGET = int(os.getenv("SCHEMA_LINK_TOKEN_BUDGET", "600"))
+# Tables scoring within this similarity of the best table are included.
+SCHEMA_LINK_TABLE_MARGIN = float(os.getenv("SCHEMA_LINK_TABLE_MARGIN", "0.15"))
+
+# --- SQL Guard Configuration ---
+# Generated SQL is parsed and checked against the schema catalog and the optimizer's estimates before it runs.
+SQL_GUARD_ENABLED = os.getenv("SQL_GUARD_ENABLED", "true").lower() in ("1", "true", "yes")
+# Queries whose EXPLAIN PLAN estimates exceed these are rejected (0 disables a limit, and both disables EXPLAIN PLAN).
+SQL_MAX_PLAN_COST = int(os.getenv("SQL_MAX_PLAN_COST", "1000000"))
+SQL_MAX_PLAN_CARDINALITY = int(os.getenv("SQL_MAX_PLAN_CARDINALITY", "100000000"))
+# Per-round-trip timeout for generated queries, in milliseconds (0 means no timeout).
+SQL_CALL_TIMEOUT_MS = int(os.getenv("SQL_CALL_TIMEOUT_MS", "30000"))
+
+# --- NL->SQL Cache Configuration ---
+# Generated SQL is reused for repeated or paraphrased questions asked on the same day against the same schema.
+SQL_CACHE_ENABLED = os.getenv("SQL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQL_CACHE_MAX_ENTRIES = int(os.getenv("SQL_CACHE_MAX_ENTRIES", "1000"))
+SQL_CACHE_TTL_SECONDS = int(os.getenv("SQL_CACHE_TTL_SECONDS", "86400"))
+# Cosine similarity above which a paraphrase reuses a cached query (1.0 disables the semantic tier).
+SQL_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("SQL_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+# Optional SQLite file so the cache survives restarts; empty keeps it in memory only.
+SQL_CACHE_PATH = os.getenv("SQL_CACHE_PATH", "")
+
+# --- Observability Configuration ---
+# Application log level and format: 'json' (one object per line, for log shippers) or 'text'.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
 
 print("Configuration loaded successfully.")
\ No newline at end of file
@@ -0,0 +1,253 @@
+# File: core/tracing.py
+# Per-request tracing: timed spans around the pipeline stages, exported as Prometheus histograms
+# (/metrics) and as a Server-Timing response header, plus structured logging tagged with the
+# request id.
+
+import contextvars
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from core.config import LOG_LEVEL, LOG_FORMAT
+
+try:
+    from prometheus_client import Histogram, generate_latest, CONTENT_TYPE_LATEST
+except ImportError:  # Optional: without it spans still reach the logs and Server-Timing, but /metrics is unavailable.
+    Histogram = None
+
+# Spans kept per request for Server-Timing; a WebSocket connection keeps none, as it can run for hours.
+_MAX_SPANS_PER_TRACE = 64
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram(
+        "bluequery_stage_duration_seconds", "Duration of query pipeline stages.", ["stage"],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    )
+    REQUEST_SECONDS = Histogram(
+        "bluequery_http_request_duration_seconds", "HTTP request duration until the response starts.", ["method", "route", "status"],
+        buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+    )
+    SQL_ROWS = Histogram(
+        "bluequery_sql_rows", "Rows returned by generated SQL queries.",
+        buckets=(0, 1, 10, 100, 1000, 10000, 100000),
+    )
+
+
+def metrics_available() -> bool:
+    return Histogram is not None
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """The Prometheus exposition and its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+# --- Spans ---
+
+class Span:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+
+
+class Trace:
+    """The request id and the spans finished so far in one request."""
+
+    def __init__(self, request_id: str, keep_spans: bool = True):
+        self.request_id = request_id
+        self.keep_spans = keep_spans
+        self.spans: List[Span] = []
+        self.start = time.perf_counter()
+
+    def add(self, span: Span):
+        if self.keep_spans and len(self.spans) < _MAX_SPANS_PER_TRACE:
+            self.spans.append(span)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value: every finished span, then the total so far."""
+        entries = [f"{finished.name};dur={finished.duration * 1000:.1f}" for finished in list(self.spans)]
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    trace = _trace.get()
+    return trace.request_id if trace is not None else None
+
+
+def record_span(name: str, duration: float, **attributes):
+    """Records a span timed by the caller (for code that cannot hold a context manager open, such as generators)."""
+    finished = Span(name, attributes)
+    finished.duration = duration
+    _finish(finished)
+
+
+def _finish(finished: Span):
+    if Histogram is not None:
+        STAGE_SECONDS.labels(finished.name).observe(finished.duration)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(finished)
+    _log.info("span", extra={"span": finished.name, "duration_ms": round(finished.duration * 1000, 1), **finished.attributes})
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Times the enclosed block as a pipeline stage. Attributes can be added with annotate() from inside it."""
+    opened = Span(name, attributes)
+    token = _current_span.set(opened)
+    try:
+        yield opened
+    except BaseException as e:
+        opened.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        opened.duration = time.perf_counter() - opened.start
+        _current_span.reset(token)
+        _finish(opened)
+
+
+def annotate(**attributes):
+    """Adds attributes (row counts, cache status...) to the innermost open span, if any."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def observe_sql_rows(rows: int):
+    if Histogram is not None:
+        SQL_ROWS.observe(rows)
+
+
+# --- Structured logging ---
+
+# LogRecord attributes that are not extra fields.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class _RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, request id, message and any extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", None),
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with the extra fields appended as key=value."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in _extra_fields(record).items())
+        line = f"{self.formatTime(record)} {record.levelname} [{getattr(record, 'request_id', None) or '-'}] {record.name}: {record.getMessage()}"
+        line = f"{line} {fields}" if fields else line
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        return line
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """Sends the application's 'bluequery.*' loggers to stdout; other libraries' logging is left alone."""
+    root = logging.getLogger("bluequery")
+    if root.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    handler.addFilter(_RequestIdFilter())
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"bluequery.{name}")
+
+
+configure_logging()
+_log = get_logger("trace")
+_access_log = get_logger("access")
+
+
+# --- Middleware ---
+
+def _route_label(scope) -> str:
+    """The request path with path parameters put back as {name}, so metrics get one series per route."""
+    if scope.get("route") is None:
+        return "unmatched"
+    path = scope["path"]
+    for name, value in (scope.get("path_params") or {}).items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+class TracingMiddleware:
+    """
+    Starts a trace per request (reusing an incoming X-Request-ID), returns the id and a Server-Timing
+    header with the spans finished before the response started, and records the request duration.
+    Streaming responses start before their stages finish, so their header carries only the total so far.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+        incoming = dict(scope.get("headers") or []).get(b"x-request-id", b"").decode("latin-1")[:64]
+        trace = Trace(incoming or uuid.uuid4().hex, keep_spans=scope["type"] == "http")
+        token = _trace.set(trace)
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", [])
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", trace.request_id)
+                headers.append("Server-Timing", trace.server_timing())
+                if Histogram is not None:
+                    REQUEST_SECONDS.labels(scope["method"], _route_label(scope), str(status)).observe(time.perf_counter() - trace.start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            if scope["type"] == "http":
+                _access_log.info("request", extra={
+                    "method": scope["method"], "path": scope["path"], "status": status,
+                    "duration_ms": round((time.perf_counter() - trace.start) * 1000, 1),
+                })
+            _trace.reset(token)
@@ -0,0 +1,171 @@
+# File: database/columnar.py
+# Column-oriented query results: names, types and one array per column instead of a dict per row.
+
+import io
+import sys
+from typing import Optional, List, Dict, Any, Union
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow is optional; results fall back to Python lists.
+    pa = None
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def arrow_available() -> bool:
+    return pa is not None
+
+
+# The "types" reported to clients, whichever fetch path produced the result.
+_ORACLE_TYPES = {
+    "number": ("NUMBER", "BINARY_FLOAT", "BINARY_DOUBLE", "BINARY_INTEGER"),
+    "string": ("VARCHAR", "NVARCHAR", "CHAR", "NCHAR", "LONG", "CLOB", "NCLOB", "ROWID", "UROWID", "JSON"),
+    "datetime": ("DATE", "TIMESTAMP", "TIMESTAMP_TZ", "TIMESTAMP_LTZ"),
+    "binary": ("RAW", "LONG_RAW", "BLOB"),
+    "boolean": ("BOOLEAN",),
+}
+_ORACLE_TYPE_NAMES = {oracle: name for name, oracle_types in _ORACLE_TYPES.items() for oracle in oracle_types}
+
+
+def _type_name(db_type: Any) -> str:
+    """DB_TYPE_VARCHAR -> 'string': one of number, string, datetime, binary, boolean or other."""
+    name = getattr(db_type, "name", None) or str(db_type)
+    return _ORACLE_TYPE_NAMES.get(name.replace("DB_TYPE_", ""), "other")
+
+
+def _arrow_type_name(arrow_type) -> str:
+    """The same vocabulary as _type_name, for a pyarrow type."""
+    if pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type) or pa.types.is_decimal(arrow_type):
+        return "number"
+    if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+        return "string"
+    if pa.types.is_timestamp(arrow_type) or pa.types.is_date(arrow_type):
+        return "datetime"
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return "binary"
+    return "boolean" if pa.types.is_boolean(arrow_type) else "other"
+
+
+def _narrow_decimals(table):
+    """
+    Decimal columns (from fetch_decimals) as int64 or double where that is exact enough, as the
+    cursor path would return them. Integers wider than int64 stay decimal128, so IDs above 2**53
+    keep every digit.
+    """
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_decimal(field.type):
+            continue
+        if field.type.scale > 0:
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+        elif field.type.precision <= 18:
+            table = table.set_column(i, field.name, table.column(i).cast(pa.int64()))
+    return table
+
+
+def _arrow_array(values: list):
+    try:
+        return pa.array(values)
+    except (OverflowError, pa.ArrowInvalid):
+        # Integers wider than int64 (NUMBER(24) IDs from the cursor path).
+        return pa.array(values, type=pa.decimal128(38, 0))
+
+
+class ColumnarResult:
+    """
+    A query result held column by column. Backed either by a pyarrow.Table (from python-oracledb's
+    DataFrame fetch) or by per-column Python lists; the other representation is built on demand.
+    """
+
+    def __init__(self, columns: List[str], types: List[str], data: Optional[List[list]] = None, arrow_table=None):
+        self.columns = columns
+        self.types = types
+        self._data = data if data is not None or arrow_table is not None else []
+        self._arrow_table = arrow_table
+
+    @classmethod
+    def from_rows(cls, columns: List[str], types: List[str], rows: List[tuple]) -> "ColumnarResult":
+        data = [list(values) for values in zip(*rows)] if rows else [[] for _ in columns]
+        return cls(columns, types, data=data)
+
+    @classmethod
+    def from_cursor(cls, cursor, rows: List[tuple]) -> "ColumnarResult":
+        columns = [col[0].lower() for col in cursor.description]
+        types = [_type_name(col[1]) for col in cursor.description]
+        return cls.from_rows(columns, types, rows)
+
+    @classmethod
+    def from_arrow(cls, table) -> "ColumnarResult":
+        table = _narrow_decimals(table.rename_columns([name.lower() for name in table.column_names]))
+        return cls(list(table.column_names), [_arrow_type_name(field.type) for field in table.schema], arrow_table=table)
+
+    @property
+    def data(self) -> List[list]:
+        if self._data is None:
+            # Wide integer decimals come back as Decimal; the cursor path returns them as int.
+            self._data = [
+                [None if v is None else int(v) for v in column.to_pylist()] if pa.types.is_decimal(column.type) else column.to_pylist()
+                for column in self._arrow_table.columns
+            ]
+        return self._data
+
+    def __len__(self) -> int:
+        if self._arrow_table is not None:
+            return self._arrow_table.num_rows
+        return len(self._data[0]) if self._data else 0
+
+    def head(self, n: int) -> "ColumnarResult":
+        if self._arrow_table is not None:
+            return ColumnarResult(self.columns, self.types, arrow_table=self._arrow_table.slice(0, n))
+        return ColumnarResult(self.columns, self.types, data=[values[:n] for values in self._data])
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held, for the byte-bounded result cache."""
+        if self._arrow_table is not None and self._data is None:
+            return self._arrow_table.nbytes
+        rows = len(self)
+        sample = min(rows, 100)
+        sample_bytes = sum(sys.getsizeof(values[i]) for values in self._data for i in range(sample))
+        return sum(sys.getsizeof(values) for values in self._data) + (sample_bytes * rows // sample if sample else 0)
+
+    def column_values(self) -> Dict[str, list]:
+        return dict(zip(self.columns, self.data))
+
+    def to_rows(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Row dicts, for callers that still need them (optionally only the first `limit`)."""
+        data = self.data if limit is None else [values[:limit] for values in self.data]
+        return [dict(zip(self.columns, row)) for row in zip(*data)]
+
+    def to_json_shape(self) -> Dict[str, Any]:
+        """
+        {"columns", "types", "rows"}: column names once, then each row as an array. Types are
+        number, string, datetime, binary, boolean or other.
+        """
+        return {"columns": self.columns, "types": self.types, "rows": [list(row) for row in zip(*self.data)]}
+
+    def to_arrow(self):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed.")
+        if self._arrow_table is None:
+            self._arrow_table = pa.table({name: _arrow_array(values) for name, values in zip(self.columns, self.data)})
+        return self._arrow_table
+
+    def to_arrow_ipc(self, metadata: Optional[Dict[str, str]] = None) -> bytes:
+        """Serializes the result as an Arrow IPC stream; metadata is attached to the schema."""
+        table = self.to_arrow()
+        if metadata:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+
+def column_values(results: Union[List[Dict[str, Any]], ColumnarResult]) -> Dict[str, list]:
+    """{column: values} for either row dicts or a ColumnarResult."""
+    if isinstance(results, ColumnarResult):
+        return results.column_values()
+    if not results:
+        return {}
+    return {column: [row.get(column) for row in results] for column in results[0].keys()}
@@ -1,119 +1,439 @@
 # File: database/connection.py
-# --- FINAL ENHANCED VERSION: Now includes column comments for better AI context ---
-print("--- database/connection.py: File imported ---") # ADD THIS LINE
+# --- POOLED VERSION: Every request borrows its own session from an Oracle session pool ---
 
+import asyncio
+import contextvars
 import oracledb
 import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from dotenv import load_dotenv
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Iterator
+
+from core.config import (
+    ORACLE_POOL_MIN, ORACLE_POOL_MAX, ORACLE_POOL_INCREMENT,
+    ORACLE_POOL_PING_INTERVAL, ORACLE_POOL_WAIT_TIMEOUT, DB_EXECUTOR_WORKERS,
+    RESULT_CACHE_ENABLED, RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL_SECONDS,
+    RESULT_CACHE_PROBE_INTERVAL_SECONDS, RESULT_CACHE_FRESHNESS_COLUMNS,
+    RESULT_HANDLE_MAX_ENTRIES, RESULT_HANDLE_TTL_SECONDS, SQL_CALL_TIMEOUT_MS,
+)
+from database.result_cache import ResultCache, referenced_tables
+from database.schema_catalog import fetch_table_columns, format_create_table
+from database.columnar import ColumnarResult, arrow_available, pa
+from database.result_handles import ResultHandleStore, cap_query, page_query, encode_cursor, decode_cursor
+from core.tracing import get_logger
 
 load_dotenv()
 
+log = get_logger("db")
+
+# Return CLOB columns (e.g. FIR_CONTENTS) as plain strings so results can be embedded and
+# serialized after the session has gone back to the pool.
+oracledb.defaults.fetch_lobs = False
+
 class Database:
-    # ... (class variables __init__ and close methods remain the same) ...
-    connection = None
+    # The pool is shared by every Database instance in the process; sessions are not.
+    pool = None
     db_owner = None
+    # Bounded thread pool used by the *_async methods so Oracle round trips never block the event loop.
+    executor = None
+    # Process-wide cache of query results, plus the last freshness probe per table: {table: (probed_at, token)}.
+    result_cache = None
+    _freshness_probes: Dict[str, Any] = {}
+    _freshness_lock = threading.Lock()
+    # SQL behind recent results, so they can be paged or downloaded after the response is sent.
+    result_handles = None
+
+    # Checkout statistics, guarded by _stats_lock because sessions are acquired from many threads.
+    _stats_lock = threading.Lock()
+    _acquire_count = 0
+    _acquire_failures = 0
+    _total_wait_time = 0.0
+    _max_wait_time = 0.0
 
     def __init__(self):
-        if Database.connection is None:
+        if Database.pool is None:
             try:
-                # --- THIS IS THE CORRECTED LOGIC ---
                 # It looks for ORACLE_SCHEMA_OWNER first, and falls back to ORACLE_USER
                 owner_from_env = os.getenv("ORACLE_SCHEMA_OWNER") or os.getenv("ORACLE_USER")
                 if not owner_from_env:
                     raise ValueError("CRITICAL: ORACLE_USER or ORACLE_SCHEMA_OWNER environment variable not set.")
                 
-                self.db_owner = owner_from_env.upper()
+                Database.db_owner = owner_from_env.upper()
                 
                 dsn = f'{os.getenv("ORACLE_HOST")}:{os.getenv("ORACLE_PORT")}/{os.getenv("ORACLE_SERVICE")}'
                 
-                print("Attempting to connect to Oracle Database...")
-                Database.connection = oracledb.connect(
+                log.info("Creating Oracle session pool", extra={"min": ORACLE_POOL_MIN, "max": ORACLE_POOL_MAX, "increment": ORACLE_POOL_INCREMENT})
+                Database.pool = oracledb.create_pool(
                     user=os.getenv("ORACLE_USER"),
                     password=os.getenv("ORACLE_PASSWORD"),
-                    dsn=dsn
+                    dsn=dsn,
+                    min=ORACLE_POOL_MIN,
+                    max=ORACLE_POOL_MAX,
+                    increment=ORACLE_POOL_INCREMENT,
+                    # Sessions idle for longer than ping_interval are pinged on checkout,
+                    # so a session killed by the server is replaced instead of handed out.
+                    ping_interval=ORACLE_POOL_PING_INTERVAL,
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=ORACLE_POOL_WAIT_TIMEOUT * 1000,
+                )
+                Database.executor = ThreadPoolExecutor(
+                    max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="oracle-db"
                 )
-                print("Successfully connected to Oracle Database!")
+                if RESULT_CACHE_ENABLED:
+                    Database.result_cache = ResultCache(int(RESULT_CACHE_MAX_MB * 1024 * 1024), RESULT_CACHE_TTL_SECONDS)
+                Database.result_handles = ResultHandleStore(RESULT_HANDLE_MAX_ENTRIES, RESULT_HANDLE_TTL_SECONDS)
+                log.info("Oracle session pool created")
             except (oracledb.Error, ValueError) as e:
-                print(f"FATAL: Error during database initialization: {e}")
-                Database.connection = None
+                log.error("Database initialization failed", extra={"error": str(e)})
+                Database.pool = None
                 raise e
 
-    def execute_sql_query(self, query: str, params: Optional[dict] = None):
-        if self.connection is None: return [], None
+    @contextmanager
+    def acquire(self):
+        """
+        Borrows a session from the pool for the duration of the block and
+        always returns it, even if the work inside the block fails.
+        """
+        start = time.perf_counter()
+        try:
+            connection = self.pool.acquire()
+        except oracledb.Error:
+            with Database._stats_lock:
+                Database._acquire_failures += 1
+            raise
+        waited = time.perf_counter() - start
+        with Database._stats_lock:
+            Database._acquire_count += 1
+            Database._total_wait_time += waited
+            Database._max_wait_time = max(Database._max_wait_time, waited)
+        try:
+            yield connection
+        finally:
+            try:
+                self.pool.release(connection)
+            except oracledb.Error as e:
+                # A broken session is dropped by the pool; the service keeps running.
+                log.warning("Could not release session back to pool", extra={"error": str(e)})
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Returns a snapshot of pool utilisation and checkout wait times."""
+        if self.pool is None:
+            return {"status": "unavailable"}
+        with Database._stats_lock:
+            acquires = Database._acquire_count
+            avg_wait = Database._total_wait_time / acquires if acquires else 0.0
+            return {
+                "status": "ok",
+                "min": self.pool.min,
+                "max": self.pool.max,
+                "increment": self.pool.increment,
+                "open": self.pool.opened,
+                "busy": self.pool.busy,
+                "acquires": acquires,
+                "acquire_failures": Database._acquire_failures,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(Database._max_wait_time * 1000, 3),
+            }
+
+    @contextmanager
+    def _call_timeout(self, connection, call_timeout: Optional[int]):
+        """Applies a per-round-trip timeout (ms) to a pooled session and clears it before the session goes back."""
+        if not call_timeout:
+            yield
+            return
+        connection.call_timeout = call_timeout
+        try:
+            yield
+        finally:
+            try:
+                connection.call_timeout = 0
+            except oracledb.Error:
+                pass
+
+    def execute_sql_query(self, query: str, params: Optional[dict] = None, max_rows: Optional[int] = None, skip_rows: int = 0,
+                          columnar: bool = False, call_timeout: Optional[int] = None):
+        """
+        Runs a query and returns (rows, error). max_rows stops fetching after that many rows;
+        skip_rows discards leading rows first (only used when a query cannot be wrapped for OFFSET).
+        With columnar=True the rows come back as a ColumnarResult instead of a list of dicts,
+        fetched straight into Arrow when pyarrow and python-oracledb's DataFrame fetch are available.
+        call_timeout (ms) bounds every round trip; an exceeded timeout is returned as a DPY-4024 error.
+        """
+        if self.pool is None: return (ColumnarResult([], []) if columnar else []), None
         try:
-            with self.connection.cursor() as cursor:
-                print(f"Executing Query:\n---\n{query}\n---")
-                cursor.execute(query, params or {})
-                if cursor.description:
+            with self.acquire() as connection, self._call_timeout(connection, call_timeout):
+                log.info("Executing query", extra={"sql": query})
+                if columnar and max_rows is None and not skip_rows and arrow_available() and hasattr(connection, "fetch_df_all"):
+                    try:
+                        # Decimals keep NUMBER columns wider than int64 (FIR_REG_NUM is NUMBER(24)) exact instead of doubles.
+                        data_frame = connection.fetch_df_all(query, params or {}, arraysize=1000, fetch_decimals=True)
+                        return ColumnarResult.from_arrow(pa.table(data_frame)), None
+                    except oracledb.NotSupportedError as e:
+                        log.info("DataFrame fetch not supported for this query; fetching rows instead", extra={"error": str(e)})
+                with connection.cursor() as cursor:
+                    if max_rows is not None:
+                        cursor.arraysize = max(1, min(max_rows, 1000))
+                        cursor.prefetchrows = cursor.arraysize + 1
+                    cursor.execute(query, params or {})
+                    if not cursor.description:
+                        return (ColumnarResult([], []) if columnar else []), None
+                    while skip_rows > 0:
+                        skipped = cursor.fetchmany(min(skip_rows, 1000))
+                        if not skipped:
+                            break
+                        skip_rows -= len(skipped)
+                    rows = cursor.fetchall() if max_rows is None else cursor.fetchmany(max_rows)
+                    if columnar:
+                        return ColumnarResult.from_cursor(cursor, rows), None
                     columns = [col[0].lower() for col in cursor.description]
-                    return [dict(zip(columns, row)) for row in cursor.fetchall()], None
-                else:
-                    return [], None
+                    return [dict(zip(columns, row)) for row in rows], None
         except oracledb.Error as e:
-            print(f"Error executing query: {e}")
+            log.warning("Query failed", extra={"sql": query, "error": str(e)})
             return None, str(e)
 
-    def get_schema_string_for_tables(self, table_names: List[str]) -> str:
-        if self.connection is None: return "-- Database connection not available."
-        
-        all_schemas = []
-        with self.connection.cursor() as cursor:
-            # --- QUERY NOW JOINS WITH ALL_COL_COMMENTS ---
-            query = """
-            SELECT 
-                c.COLUMN_NAME, c.DATA_TYPE, c.DATA_LENGTH, c.DATA_PRECISION, c.DATA_SCALE, c.NULLABLE,
-                cm.COMMENTS
-            FROM ALL_TAB_COLUMNS c
-            LEFT JOIN ALL_COL_COMMENTS cm ON c.OWNER = cm.OWNER AND c.TABLE_NAME = cm.TABLE_NAME AND c.COLUMN_NAME = cm.COLUMN_NAME
-            WHERE c.TABLE_NAME = :table_name AND c.OWNER = :owner
-            ORDER BY c.COLUMN_ID
-            """
-            for table_name in table_names:
+    def _probe_freshness(self, tables: List[str]) -> Optional[Dict[str, str]]:
+        """
+        Returns a cheap change token per table: COUNT(*) + MAX(last-updated column) where one is
+        configured, otherwise MAX(ORA_ROWSCN). Probes are reused for a few seconds so a burst of
+        queries costs one probe. Returns None if any table cannot be probed.
+        """
+        freshness = {}
+        now = time.monotonic()
+        for table in tables:
+            with Database._freshness_lock:
+                probed = Database._freshness_probes.get(table)
+            if probed and now - probed[0] < RESULT_CACHE_PROBE_INTERVAL_SECONDS:
+                freshness[table] = probed[1]
+                continue
+
+            column = RESULT_CACHE_FRESHNESS_COLUMNS.get(table.split(".")[-1])
+            if column:
+                probe = f"SELECT COUNT(*) AS ROW_COUNT, MAX({column}) AS LAST_CHANGE FROM {table}"
+            else:
+                probe = f"SELECT MAX(ORA_ROWSCN) AS LAST_CHANGE FROM {table}"
+            results, error = self.execute_sql_query(probe)
+            if error or not results:
+                return None
+            token = "|".join(str(v) for v in results[0].values())
+            with Database._freshness_lock:
+                Database._freshness_probes[table] = (now, token)
+            freshness[table] = token
+        return freshness
+
+    def run_cached_query(self, query: str, params: Optional[dict] = None, max_rows: Optional[int] = None, columnar: bool = False,
+                         call_timeout: Optional[int] = None):
+        """
+        Like execute_sql_query, but serves repeated queries from the result cache while their
+        tables are unchanged. Returns (results, error, status) with status one of
+        'hit', 'miss', 'stale' (a cached result was invalidated), 'bypass' or 'disabled'.
+        Cached rows are shared between callers and must not be mutated.
+        """
+        if self.result_cache is None:
+            results, error = self.execute_sql_query(query, params, max_rows, columnar=columnar, call_timeout=call_timeout)
+            return results, error, "disabled"
+
+        tables = referenced_tables(query)
+        freshness = self._probe_freshness(tables) if tables else None
+        if freshness is None:
+            results, error = self.execute_sql_query(query, params, max_rows, columnar=columnar, call_timeout=call_timeout)
+            return results, error, "bypass"
+
+        key_params = dict(params or {})
+        if max_rows is not None: key_params["__max_rows"] = max_rows
+        if columnar: key_params["__columnar"] = True
+        key = ResultCache.make_key(query, key_params)
+        rows, status = self.result_cache.get(key, freshness)
+        if rows is not None:
+            log.info("Serving cached result", extra={"rows": len(rows), "result_cache": status})
+            return rows, None, status
+
+        results, error = self.execute_sql_query(query, params, max_rows, columnar=columnar, call_timeout=call_timeout)
+        if not error and results is not None:
+            self.result_cache.put(key, results, freshness)
+        return results, error, status
+
+    def run_capped_query(self, query: str, row_cap: int, params: Optional[dict] = None, columnar: bool = False,
+                         call_timeout: Optional[int] = None):
+        """
+        Runs a query through the result cache with at most row_cap rows, limited on the server with
+        FETCH FIRST. Returns (results, error, cache_status, truncated, wrappable); wrappable is False
+        when the query could not be selected from an inline view, so it cannot be paged by key either.
+        """
+        wrappable = True
+        results, error, status = self.run_cached_query(cap_query(query, row_cap + 1), params, columnar=columnar, call_timeout=call_timeout)
+        if error and "ORA-00918" in error:
+            # Duplicate column names cannot be selected from an inline view; cap while fetching instead.
+            wrappable = False
+            results, error, status = self.run_cached_query(query, params, max_rows=row_cap + 1, columnar=columnar, call_timeout=call_timeout)
+        if error or results is None:
+            return results, error, status, False, wrappable
+        truncated = len(results) > row_cap
+        if truncated:
+            results = results.head(row_cap) if columnar else results[:row_cap]
+        return results, None, status, truncated, wrappable
+
+    def fetch_result_page(self, handle: Dict[str, Any], cursor: Optional[str], page_size: int) -> Dict[str, Any]:
+        """
+        Returns one page of a registered result: {"rows", "next_cursor", "pagination"}.
+        Keyset pagination (ordered by the handle's key column) is used when the result has a unique
+        key; otherwise pages are OFFSET windows over the query's own order. Oracle only guarantees
+        that order when the query has an ORDER BY on unique values, so without one rows may repeat
+        or be skipped between offset pages. Raises ValueError for a malformed cursor and
+        RuntimeError if the query fails.
+        """
+        position = decode_cursor(cursor) if cursor else {}
+        key_column = handle["key_column"]
+        params = dict(handle["params"])
+        if key_column:
+            after = "after" in position
+            if after:
+                params["after_key"] = position["after"]
+            rows, error = self.execute_sql_query(page_query(handle["sql"], page_size, key_column, after=after), params, call_timeout=SQL_CALL_TIMEOUT_MS)
+        else:
+            offset = int(position.get("offset", 0))
+            rows, error = self.execute_sql_query(page_query(handle["sql"], page_size, offset=offset), params, call_timeout=SQL_CALL_TIMEOUT_MS)
+            if error and "ORA-00918" in error:
+                rows, error = self.execute_sql_query(handle["sql"], params, max_rows=page_size + 1, skip_rows=offset, call_timeout=SQL_CALL_TIMEOUT_MS)
+        if error:
+            raise RuntimeError(error)
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = None
+        if has_more:
+            if key_column:
+                next_cursor = encode_cursor({"after": rows[-1][key_column.lower()]})
+            else:
+                next_cursor = encode_cursor({"offset": int(position.get("offset", 0)) + page_size})
+        return {"rows": rows, "next_cursor": next_cursor, "pagination": "keyset" if key_column else "offset"}
+
+    def explain_plan(self, query: str, call_timeout: Optional[int] = None):
+        """
+        Asks the optimizer for its estimates without running the query. Returns
+        ({"cost", "cardinality", "bytes"} of the plan's root step, error).
+        """
+        if self.pool is None: return None, "Database connection not available."
+        statement_id = f"BQ_{secrets.token_hex(8)}"
+        try:
+            with self.acquire() as connection, self._call_timeout(connection, call_timeout):
                 try:
-                    cursor.execute(query, table_name=table_name.upper(), owner=self.db_owner)
-                    rows = cursor.fetchall()
-                    if not rows: continue
-                    
-                    columns_str = []
-                    for row in rows:
-                        col_name, data_type, length, precision, scale, nullable, comments = row
-                        
-                        if data_type in ("VARCHAR2", "CHAR"): type_str = f"{data_type}({int(length)})"
-                        elif data_type == "NUMBER":
-                            if precision is not None and scale is not None and scale != 0: type_str = f"NUMBER({int(precision)}, {int(scale)})"
-                            elif precision is not None: type_str = f"NUMBER({int(precision)})"
-                            else: type_str = "NUMBER"
-                        else: type_str = data_type
-                        
-                        null_str = " NOT NULL" if nullable == 'N' else ""
-                        comment_str = f" -- {comments}" if comments else ""
-                        columns_str.append(f"    {col_name} {type_str}{null_str},{comment_str}")
-                    
-                    # Remove comma from last line
-                    if columns_str: columns_str[-1] = columns_str[-1].rstrip(',')
-
-                    schema_str = f"CREATE TABLE {table_name.upper()} (\n" + "\n".join(columns_str) + "\n);"
-                    all_schemas.append(schema_str)
-                except oracledb.Error as e:
-                    print(f"Could not fetch schema for table {table_name}: {e}")
-
-        return "\n\n".join(all_schemas)
-    
-    # ... (Keep the fetch_all_for_rag and close methods) ...
-    def fetch_all_for_rag(self, table_name: str, columns: List[str]):
-        if self.connection is None: return [], None
-        column_str = ", ".join(columns)
-        query = f"SELECT {column_str} FROM {table_name}"
-        print(f"Fetching data for RAG pipeline with query: {query}")
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {query}")
+                        cursor.execute(
+                            "SELECT COST, CARDINALITY, BYTES FROM PLAN_TABLE WHERE STATEMENT_ID = :statement_id AND ID = 0",
+                            statement_id=statement_id,
+                        )
+                        row = cursor.fetchone()
+                finally:
+                    # The plan rows are only needed for this read; don't leave them in PLAN_TABLE.
+                    connection.rollback()
+        except oracledb.Error as e:
+            return None, str(e)
+        if row is None:
+            return None, "EXPLAIN PLAN produced no plan."
+        cost, cardinality, plan_bytes = row
+        return {"cost": cost, "cardinality": cardinality, "bytes": plan_bytes}, None
+
+    def get_schema_string_for_tables(self, table_names: List[str]) -> str:
+        if self.pool is None: return "-- Database connection not available."
+
+        # One dictionary query for all tables, instead of one per table.
+        try:
+            with self.acquire() as connection, connection.cursor() as cursor:
+                columns = fetch_table_columns(cursor, self.db_owner, table_names)
+        except oracledb.Error as e:
+            log.warning("Could not fetch schema for tables", extra={"tables": table_names, "error": str(e)})
+            return ""
+        return "\n\n".join(format_create_table(t, columns[t.upper()]) for t in table_names if t.upper() in columns)
+
+    # --- Async data-access path ---
+    # python-oracledb's async API requires thin mode and a separate AsyncConnectionPool, so the
+    # existing synchronous methods are reused and dispatched to the bounded executor instead.
+
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # run_in_executor does not carry context variables over; copy them so the request id reaches the logs.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, partial(context.run, func, *args, **kwargs))
+
+    async def execute_sql_query_async(self, query: str, params: Optional[dict] = None):
+        return await self._run_in_executor(self.execute_sql_query, query, params)
+
+    async def run_cached_query_async(self, query: str, params: Optional[dict] = None):
+        return await self._run_in_executor(self.run_cached_query, query, params)
+
+    async def run_capped_query_async(self, query: str, row_cap: int, params: Optional[dict] = None, columnar: bool = False,
+                                     call_timeout: Optional[int] = None):
+        return await self._run_in_executor(self.run_capped_query, query, row_cap, params, columnar, call_timeout)
+
+    async def explain_plan_async(self, query: str, call_timeout: Optional[int] = None):
+        return await self._run_in_executor(self.explain_plan, query, call_timeout)
+
+    async def fetch_result_page_async(self, handle: Dict[str, Any], cursor: Optional[str], page_size: int) -> Dict[str, Any]:
+        return await self._run_in_executor(self.fetch_result_page, handle, cursor, page_size)
+
+    async def get_schema_string_for_tables_async(self, table_names: List[str]) -> str:
+        return await self._run_in_executor(self.get_schema_string_for_tables, table_names)
+
+    def iter_query_batches(self, query: str, params: Optional[dict] = None, batch_size: int = 1000, call_timeout: Optional[int] = None,
+                           max_rows: Optional[int] = None, max_seconds: Optional[float] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Streams a query as lists of row dicts using fetchmany, so large tables never sit in memory at once.
+        The session is held for the lifetime of the iterator and returned when it is exhausted or closed.
+        Each round trip is bounded by call_timeout (ms); the stream ends early after max_rows rows or
+        max_seconds seconds, so a slow or huge download cannot keep the session out of the pool.
+        """
+        if self.pool is None: return
+        started = time.perf_counter()
+        sent = 0
+        with self.acquire() as connection, self._call_timeout(connection, call_timeout), connection.cursor() as cursor:
+            # arraysize rows per round trip; prefetching one extra saves a round trip on small results.
+            cursor.arraysize = batch_size
+            cursor.prefetchrows = batch_size + 1
+            log.info("Streaming query", extra={"sql": query, "batch_size": batch_size, "max_rows": max_rows, "max_seconds": max_seconds})
+            cursor.execute(query, params or {})
+            columns = [col[0].lower() for col in cursor.description]
+            while True:
+                if max_seconds is not None and time.perf_counter() - started > max_seconds:
+                    log.warning("Streaming query stopped at the time limit", extra={"rows": sent, "max_seconds": max_seconds})
+                    break
+                rows = cursor.fetchmany()
+                if not rows:
+                    break
+                if max_rows is not None and sent + len(rows) > max_rows:
+                    if max_rows > sent:
+                        yield [dict(zip(columns, row)) for row in rows[:max_rows - sent]]
+                    log.warning("Streaming query stopped at the row limit", extra={"max_rows": max_rows})
+                    break
+                sent += len(rows)
+                yield [dict(zip(columns, row)) for row in rows]
+
+    def get_table_watermark(self, table_name: str, column: str) -> Dict[str, Any]:
+        """
+        Returns the row count and latest value of a last-updated column. Used to tell whether
+        data derived from the table (such as the RAG index) is still current.
+        """
+        query = f"SELECT COUNT(*) AS ROW_COUNT, MAX({column}) AS MAX_UPDATED FROM {table_name}"
         results, error = self.execute_sql_query(query)
-        if error:
-            print(f"Failed to fetch data for RAG: {error}")
-            return []
-        return results
+        if error or not results:
+            log.warning("Could not read table watermark", extra={"table": table_name, "error": error})
+            return {}
+        max_updated = results[0].get("max_updated")
+        return {
+            "row_count": int(results[0].get("row_count") or 0),
+            "max_updated": max_updated.isoformat() if max_updated is not None else None,
+        }
 
     def close(self):
-        if self.connection:
-            self.connection.close()
-            Database.connection = None
-            print("Oracle database connection closed.")
\ No newline at end of file
+        if self.executor:
+            self.executor.shutdown(wait=False)
+            Database.executor = None
+        if self.pool:
+            self.pool.close(force=True)
+            Database.pool = None
+            log.info("Oracle session pool closed")
\ No newline at end of file
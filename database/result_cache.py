@@ -0,0 +1,140 @@
+# File: database/result_cache.py
+# Bounded, size-aware cache of executed SQL results, invalidated when the referenced tables change.
+
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+# Fallback for SQL sqlglot cannot parse: names that follow FROM or JOIN, optionally owner-qualified
+# (e.g. "CCTNS.T_FIR_REGISTRATION"), except the FROM inside EXTRACT(... FROM x) and TRIM(... FROM x).
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+((?:"?\w+"?\.)?"?\w+"?)', re.IGNORECASE)
+_FUNCTION_FROM = re.compile(r"\b(?:EXTRACT|TRIM)\s*\([^()]*\)", re.IGNORECASE)
+_CTE_NAME = re.compile(r'(?:\bWITH|,)\s*"?(\w+)"?\s+AS\s*\(', re.IGNORECASE)
+# Sample size used to estimate the memory footprint of large results.
+_SIZE_SAMPLE_ROWS = 100
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Uppercases and collapses whitespace outside string literals and quoted identifiers, so formatting
+    differences share a key while quoted aliases (which become result keys) stay distinct.
+    """
+    parts = re.split(r"('(?:[^']|'')*'|\"[^\"]*\")", query.strip().rstrip(";"))
+    normalized = [p if p[:1] in ("'", '"') else re.sub(r"\s+", " ", p).upper() for p in parts]
+    return "".join(normalized).strip()
+
+
+def referenced_tables(query: str) -> List[str]:
+    """
+    Tables the query reads, uppercased and owner-qualified only if the query qualifies them. CTE
+    names and DUAL are not tables.
+    """
+    return list(_referenced_tables(query))
+
+
+@lru_cache(maxsize=1024)
+def _referenced_tables(query: str) -> Tuple[str, ...]:
+    try:
+        tree = sqlglot.parse_one(query, read="oracle")
+    except SqlglotError:
+        tree = None
+    if tree is not None:
+        ctes = {cte.alias.upper() for cte in tree.find_all(exp.CTE)}
+        names = (f"{table.db}.{table.name}" if table.db else table.name for table in tree.find_all(exp.Table))
+    else:
+        ctes = {name.upper() for name in _CTE_NAME.findall(query)}
+        names = _TABLE_PATTERN.findall(_FUNCTION_FROM.sub("", query))
+
+    tables = set()
+    for name in names:
+        name = name.replace('"', "").upper()
+        if name.split(".")[-1] != "DUAL" and name not in ctes:
+            tables.add(name)
+    return tuple(sorted(tables))
+
+
+def estimate_size(rows: List[Dict[str, Any]]) -> int:
+    """Approximate bytes held by a list of row dicts, extrapolated from a sample for large results."""
+    if hasattr(rows, "nbytes"):  # ColumnarResult
+        return rows.nbytes
+    if not rows:
+        return sys.getsizeof(rows)
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sample_bytes = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row.values())
+        for row in sample
+    )
+    # Column-name keys are shared between rows, so they are not counted per row.
+    return sys.getsizeof(rows) + int(sample_bytes * len(rows) / len(sample))
+
+
+class ResultCache:
+    """
+    LRU cache of query results bounded by estimated memory, not entry count. Each entry remembers
+    the freshness tokens of its tables at execution time; a lookup with different tokens is stale.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0, "too_large": 0}
+
+    @staticmethod
+    def make_key(query: str, params: Optional[dict]) -> str:
+        return normalize_sql(query) + "|" + json.dumps(params or {}, sort_keys=True, default=str)
+
+    def get(self, key: str, freshness: Dict[str, Any]) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+        """Returns (rows, status) where status is 'hit', 'miss' or 'stale'."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, "miss"
+            if entry["freshness"] != freshness or time.time() - entry["created"] > self.ttl_seconds:
+                self._remove(key)
+                self.stats["stale"] += 1
+                return None, "stale"
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry["rows"], "hit"
+
+    def put(self, key: str, rows: List[Dict[str, Any]], freshness: Dict[str, Any]):
+        size = estimate_size(rows)
+        with self._lock:
+            if size > self.max_bytes // 4:
+                # One huge result would flush everything else; don't cache it.
+                self.stats["too_large"] += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {"rows": rows, "freshness": freshness, "created": time.time(), "size": size}
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry["size"]
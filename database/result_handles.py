@@ -0,0 +1,131 @@
+# File: database/result_handles.py
+# Row caps for generated queries and short-lived handles for paging through, or downloading,
+# the full result of a query the agent has already run.
+
+import base64
+import json
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Union
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from database.columnar import ColumnarResult, column_values
+
+_IDENTIFIER = re.compile(r"^[A-Z][A-Z0-9_$#]*$")
+
+
+def cap_query(query: str, max_rows: int) -> str:
+    """Limits a query on the server. Callers ask for one row more than they keep, to detect truncation."""
+    return f"SELECT * FROM (\n{query}\n) FETCH FIRST {int(max_rows)} ROWS ONLY"
+
+
+def page_query(query: str, page_size: int, key_column: Optional[str] = None, after: bool = False, offset: int = 0) -> str:
+    """
+    Builds the query for one page (plus one look-ahead row). With a key_column this is keyset
+    pagination (bind :after_key when after=True); otherwise it is an OFFSET window, which is only
+    deterministic if the query itself orders by unique values.
+    """
+    if key_column:
+        if not _IDENTIFIER.match(key_column):
+            raise ValueError(f"Invalid key column: {key_column}")
+        where = f" WHERE {key_column} > :after_key" if after else ""
+        return f"SELECT * FROM (\n{query}\n){where} ORDER BY {key_column} FETCH FIRST {int(page_size) + 1} ROWS ONLY"
+    return f"SELECT * FROM (\n{query}\n) OFFSET {int(offset)} ROWS FETCH NEXT {int(page_size) + 1} ROWS ONLY"
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError("Malformed cursor.")
+    if not isinstance(position, dict) or not ({"after", "offset"} & position.keys()):
+        raise ValueError("Malformed cursor.")
+    return position
+
+
+def _reads_one_table(query: str) -> bool:
+    """
+    True if the query reads a single table, one row per table row: no joins (also comma joins),
+    subqueries, set operations, grouping, DISTINCT, CONNECT BY or lateral/unnested rows.
+    """
+    try:
+        tree = sqlglot.parse_one(query, read="oracle")
+    except SqlglotError:
+        return False
+    if not isinstance(tree, exp.Select):
+        return False
+    if any(tree.find(node) for node in (exp.Join, exp.Subquery, exp.Union, exp.Intersect, exp.Except, exp.Group,
+                                        exp.Distinct, exp.Connect, exp.Lateral, exp.Unnest)):
+        return False
+    return len([table for table in tree.find_all(exp.Table) if table.name.upper() != "DUAL"]) == 1
+
+
+def pick_key_column(query: str, results: Union[List[Dict[str, Any]], ColumnarResult], candidates: List[str]) -> Optional[str]:
+    """
+    Chooses a column that identifies result rows, for keyset pagination. Only a query that reads a
+    single table without multiplying or combining rows qualifies: the results are just the first
+    capped page, so a key that looks unique in them can still repeat later in a join, and keyset
+    pages would then skip rows. The candidate (a single-column primary/unique key of that table)
+    must also be in the result under its own name with unique, non-null numeric or string values.
+
+    >>> pick_key_column("SELECT * FROM T_FIR_REGISTRATION WHERE REG_YEAR = 2024", [{"fir_reg_num": 1}, {"fir_reg_num": 2}], ["FIR_REG_NUM"])
+    'FIR_REG_NUM'
+    >>> pick_key_column("SELECT f.FIR_REG_NUM, a.ACCUSED_NAME FROM T_FIR_REGISTRATION f JOIN T_ACCUSED_INFO a ON f.FIR_REG_NUM = a.FIR_REG_NUM",
+    ...                 [{"fir_reg_num": 1, "accused_name": "A"}, {"fir_reg_num": 2, "accused_name": "B"}], ["FIR_REG_NUM"])
+    """
+    if not results or not _reads_one_table(query):
+        return None
+    columns = column_values(results)
+    for candidate in candidates:
+        values = columns.get(candidate.lower())
+        if values is None:
+            continue
+        if all(isinstance(v, (int, float, str)) and not isinstance(v, bool) for v in values) and len(set(values)) == len(values):
+            return candidate.upper()
+    return None
+
+
+class ResultHandleStore:
+    """
+    Remembers the SQL behind recent results so clients can page through or download them later.
+    Bounded by entry count (LRU) and age; only the query text is stored, never the rows. Each handle
+    records the user whose query produced it, and only that user may read it back.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, query: str, params: Optional[dict], key_column: Optional[str], truncated: bool, user_id: Optional[str]) -> str:
+        result_id = secrets.token_urlsafe(16)
+        entry = {"sql": query, "params": params or {}, "key_column": key_column, "truncated": truncated, "user_id": user_id,
+                 "created_at": time.time()}
+        with self._lock:
+            self._entries[result_id] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None:
+                return None
+            if time.time() - entry["created_at"] > self.ttl_seconds:
+                del self._entries[result_id]
+                return None
+            self._entries.move_to_end(result_id)
+            return entry
@@ -0,0 +1,287 @@
+# File: database/schema_catalog.py
+# Owner-wide schema catalog (columns, comments, keys, indexes) read with a few bulk dictionary
+# queries, persisted as a versioned JSON snapshot so startup does not have to touch the dictionary.
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional, List, Dict, Any, Tuple
+
+from core.config import SCHEMA_SNAPSHOT_PATH, SCHEMA_TABLES, SCHEMA_FALLBACK_FILES
+
+SNAPSHOT_FORMAT = 1
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_COLUMNS_QUERY = """
+SELECT
+    c.TABLE_NAME, c.COLUMN_NAME, c.DATA_TYPE, c.DATA_LENGTH, c.DATA_PRECISION, c.DATA_SCALE, c.NULLABLE,
+    cm.COMMENTS
+FROM ALL_TAB_COLUMNS c
+LEFT JOIN ALL_COL_COMMENTS cm ON c.OWNER = cm.OWNER AND c.TABLE_NAME = cm.TABLE_NAME AND c.COLUMN_NAME = cm.COLUMN_NAME
+WHERE c.OWNER = :owner{table_filter}
+ORDER BY c.TABLE_NAME, c.COLUMN_ID
+"""
+# Oracle's limit on expressions in an IN list; longer table lists are filtered client-side.
+_MAX_IN_LIST = 1000
+_TABLE_COMMENTS_QUERY = """
+SELECT TABLE_NAME, COMMENTS FROM ALL_TAB_COMMENTS WHERE OWNER = :owner AND COMMENTS IS NOT NULL
+"""
+_CONSTRAINTS_QUERY = """
+SELECT c.TABLE_NAME, c.CONSTRAINT_NAME, c.CONSTRAINT_TYPE, cc.COLUMN_NAME, r.TABLE_NAME, r.COLUMN_NAME
+FROM ALL_CONSTRAINTS c
+JOIN ALL_CONS_COLUMNS cc ON c.OWNER = cc.OWNER AND c.CONSTRAINT_NAME = cc.CONSTRAINT_NAME
+LEFT JOIN ALL_CONS_COLUMNS r ON c.R_OWNER = r.OWNER AND c.R_CONSTRAINT_NAME = r.CONSTRAINT_NAME AND r.POSITION = cc.POSITION
+WHERE c.OWNER = :owner AND c.CONSTRAINT_TYPE IN ('P', 'U', 'R')
+ORDER BY c.TABLE_NAME, c.CONSTRAINT_NAME, cc.POSITION
+"""
+_INDEXES_QUERY = """
+SELECT i.TABLE_NAME, i.INDEX_NAME, i.UNIQUENESS, ic.COLUMN_NAME
+FROM ALL_INDEXES i
+JOIN ALL_IND_COLUMNS ic ON i.OWNER = ic.INDEX_OWNER AND i.INDEX_NAME = ic.INDEX_NAME
+WHERE i.TABLE_OWNER = :owner
+ORDER BY i.TABLE_NAME, i.INDEX_NAME, ic.COLUMN_POSITION
+"""
+
+
+def format_column_type(data_type: str, length: Any, precision: Any, scale: Any) -> str:
+    if data_type in ("VARCHAR2", "CHAR"): return f"{data_type}({int(length)})"
+    if data_type == "NUMBER":
+        if precision is not None and scale is not None and scale != 0: return f"NUMBER({int(precision)}, {int(scale)})"
+        if precision is not None: return f"NUMBER({int(precision)})"
+        return "NUMBER"
+    return data_type
+
+
+def format_create_table(table_name: str, columns: List[Dict[str, Any]]) -> str:
+    """Renders catalog columns ({"name", "type", "nullable", "comment"}) as the CREATE TABLE text the prompts use."""
+    columns_str = []
+    for i, column in enumerate(columns):
+        null_str = " NOT NULL" if not column["nullable"] else ""
+        # No comma after the last column
+        comma = "," if i < len(columns) - 1 else ""
+        comment_str = f" -- {column['comment']}" if column.get("comment") else ""
+        columns_str.append(f"    {column['name']} {column['type']}{null_str}{comma}{comment_str}")
+    return f"CREATE TABLE {table_name.upper()} (\n" + "\n".join(columns_str) + "\n);"
+
+
+def fetch_table_columns(cursor, owner: str, table_names: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Reads every column of the owner's tables (or just table_names) in a single dictionary query."""
+    wanted = {t.upper() for t in table_names} if table_names else None
+    binds = {"owner": owner.upper()}
+    table_filter = ""
+    if wanted and len(wanted) <= _MAX_IN_LIST:
+        binds.update({f"table_{i}": name for i, name in enumerate(sorted(wanted))})
+        table_filter = " AND c.TABLE_NAME IN (" + ", ".join(f":table_{i}" for i in range(len(wanted))) + ")"
+    cursor.arraysize = 1000
+    cursor.execute(_COLUMNS_QUERY.format(table_filter=table_filter), binds)
+    tables: Dict[str, List[Dict[str, Any]]] = {}
+    for table_name, col_name, data_type, length, precision, scale, nullable, comments in cursor:
+        if wanted is not None and table_name not in wanted:
+            continue
+        tables.setdefault(table_name, []).append({
+            "name": col_name,
+            "type": format_column_type(data_type, length, precision, scale),
+            "nullable": nullable != 'N',
+            "comment": comments,
+        })
+    return tables
+
+
+def parse_ddl(text: str) -> Dict[str, Dict[str, Any]]:
+    """Parses CREATE TABLE text (the shipped *_SCHEMA.txt files) into catalog table entries."""
+    tables = {}
+    for table_name, body in re.findall(r"CREATE\s+TABLE\s+(\w+)\s*\((.*?)\n\);", text, re.IGNORECASE | re.DOTALL):
+        columns = []
+        for line in body.strip().splitlines():
+            definition, _, comment = line.strip().partition("--")
+            definition = definition.strip().rstrip(",").strip()
+            if not definition:
+                continue
+            name, _, column_type = definition.partition(" ")
+            not_null = column_type.upper().endswith("NOT NULL")
+            if not_null:
+                column_type = column_type[:-len("NOT NULL")].strip()
+            columns.append({"name": name.upper(), "type": column_type.strip(), "nullable": not not_null, "comment": comment.strip() or None})
+        tables[table_name.upper()] = {"comment": None, "columns": columns, "primary_key": [], "unique_keys": [], "foreign_keys": [], "indexes": []}
+    return tables
+
+
+class SchemaCatalog:
+    """
+    Holds the schema of the configured tables (SCHEMA_TABLES, or every table of the owner).
+    load() prefers the JSON snapshot, then the data dictionary, then the shipped *_SCHEMA.txt files;
+    refresh() re-reads the dictionary and swaps the catalog in place without a restart.
+    """
+
+    def __init__(self, db, snapshot_path: str = SCHEMA_SNAPSHOT_PATH, table_names: Optional[List[str]] = None):
+        self.db = db
+        self.snapshot_path = snapshot_path
+        self.table_names = [t.upper() for t in (table_names if table_names is not None else SCHEMA_TABLES)]
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.version = None
+        self.source = None
+        self.loaded_at = None
+        self._refresh_lock = threading.Lock()
+
+    # --- Loading ---
+
+    def load(self) -> "SchemaCatalog":
+        start = time.perf_counter()
+        if not self._load_snapshot() and not self.refresh():
+            self._load_files()
+        print(f"SCHEMA CATALOG: {len(self.tables)} tables (version {self.version}, from {self.source}) "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms.")
+        return self
+
+    def _load_snapshot(self) -> bool:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"SCHEMA CATALOG: Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return False
+        if (snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("table_names") != self.table_names
+                or (snapshot.get("owner") or "").upper() != (self.db.db_owner or "").upper()):
+            print("SCHEMA CATALOG: Snapshot was written for a different configuration; ignoring it.")
+            return False
+        self._activate(snapshot["tables"], "snapshot", snapshot.get("version"))
+        return True
+
+    def _load_files(self):
+        tables = {}
+        for name in SCHEMA_FALLBACK_FILES:
+            path = name if os.path.isabs(name) else os.path.join(_PROJECT_ROOT, name)
+            try:
+                with open(path, "r") as f:
+                    tables.update(parse_ddl(f.read()))
+            except FileNotFoundError as e:
+                print(f"CRITICAL ERROR: Schema file not found: {e}. Please generate it using schema_checker.py.")
+        self._activate(tables, "files")
+
+    def refresh(self) -> bool:
+        """Re-reads the data dictionary. Returns False (keeping the current catalog) if the database is unavailable."""
+        if self.db.pool is None:
+            return False
+        with self._refresh_lock:
+            try:
+                tables = self._read_dictionary()
+            except Exception as e:
+                print(f"SCHEMA CATALOG: Could not read the data dictionary: {e}")
+                return False
+            if not tables:
+                print(f"SCHEMA CATALOG: No visible tables for owner {self.db.db_owner}; keeping the current catalog.")
+                return False
+            self._activate(tables, "database")
+            self._save_snapshot()
+            return True
+
+    def _read_dictionary(self) -> Dict[str, Dict[str, Any]]:
+        owner = self.db.db_owner
+        with self.db.acquire() as connection, connection.cursor() as cursor:
+            columns = fetch_table_columns(cursor, owner, self.table_names or None)
+            tables = {
+                name: {"comment": None, "columns": cols, "primary_key": [], "unique_keys": [], "foreign_keys": [], "indexes": []}
+                for name, cols in columns.items()
+            }
+
+            cursor.execute(_TABLE_COMMENTS_QUERY, owner=owner)
+            for table_name, comments in cursor:
+                if table_name in tables:
+                    tables[table_name]["comment"] = comments
+
+            constraints: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            cursor.execute(_CONSTRAINTS_QUERY, owner=owner)
+            for table_name, constraint_name, constraint_type, column, ref_table, ref_column in cursor:
+                if table_name not in tables:
+                    continue
+                entry = constraints.setdefault((table_name, constraint_name), {"type": constraint_type, "columns": [], "ref_table": ref_table, "ref_columns": []})
+                entry["columns"].append(column)
+                if ref_column:
+                    entry["ref_columns"].append(ref_column)
+            for (table_name, constraint_name), entry in constraints.items():
+                table = tables[table_name]
+                if entry["type"] == "P":
+                    table["primary_key"] = entry["columns"]
+                elif entry["type"] == "U":
+                    table["unique_keys"].append(entry["columns"])
+                else:
+                    table["foreign_keys"].append({"name": constraint_name, "columns": entry["columns"], "ref_table": entry["ref_table"], "ref_columns": entry["ref_columns"]})
+
+            indexes: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            cursor.execute(_INDEXES_QUERY, owner=owner)
+            for table_name, index_name, uniqueness, column in cursor:
+                if table_name in tables:
+                    indexes.setdefault((table_name, index_name), {"name": index_name, "unique": uniqueness == "UNIQUE", "columns": []})["columns"].append(column)
+            for (table_name, _), entry in indexes.items():
+                tables[table_name]["indexes"].append(entry)
+        return tables
+
+    def _activate(self, tables: Dict[str, Dict[str, Any]], source: str, version: Optional[str] = None):
+        self.tables = tables
+        self.version = version or hashlib.sha256(json.dumps(tables, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+        self.source = source
+        self.loaded_at = time.time()
+
+    def _save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "version": self.version,
+            "owner": self.db.db_owner,
+            "table_names": self.table_names,
+            "created_at": self.loaded_at,
+            "tables": self.tables,
+        }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"SCHEMA CATALOG: Could not write snapshot {self.snapshot_path}: {e}")
+
+    # --- Lookups ---
+
+    def ddl(self, table_names: Optional[List[str]] = None) -> str:
+        """CREATE TABLE text for the given tables (default: all) in catalog order."""
+        names = [t.upper() for t in table_names] if table_names else list(self.tables)
+        return "\n\n".join(format_create_table(name, self.tables[name]["columns"]) for name in names if name in self.tables)
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name.upper() in self.tables
+
+    def column_names(self, table_name: str) -> List[str]:
+        table = self.tables.get(table_name.upper())
+        return [c["name"] for c in table["columns"]] if table else []
+
+    def unique_key(self, table_name: str) -> List[str]:
+        """The primary key, else the first unique constraint or unique index, else []."""
+        table = self.tables.get(table_name.upper())
+        if not table:
+            return []
+        if table["primary_key"]:
+            return table["primary_key"]
+        if table["unique_keys"]:
+            return table["unique_keys"][0]
+        for index in table["indexes"]:
+            if index["unique"]:
+                return index["columns"]
+        return []
+
+    def foreign_keys(self) -> List[Tuple[str, str, str, str]]:
+        """(table, column, referenced_table, referenced_column) pairs between catalogued tables."""
+        pairs = []
+        for table_name, table in self.tables.items():
+            for fk in table["foreign_keys"]:
+                for column, ref_column in zip(fk["columns"], fk["ref_columns"]):
+                    pairs.append((table_name, column, fk["ref_table"], ref_column))
+        return pairs
+
+    def get_info(self) -> Dict[str, Any]:
+        return {"version": self.version, "source": self.source, "loaded_at": self.loaded_at, "tables": list(self.tables)}
@@ -0,0 +1,190 @@
+# File: database/sql_guard.py
+# Pre-execution checks for generated SQL: parsed locally in the Oracle dialect and checked against
+# the schema catalog and read-only rules, then against the optimizer's cost and row estimates.
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Set
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import SqlglotError
+
+from core.config import SQL_MAX_PLAN_COST, SQL_MAX_PLAN_CARDINALITY, SQL_CALL_TIMEOUT_MS
+from core.tracing import get_logger
+
+log = get_logger("sql_guard")
+
+# Identifiers Oracle resolves without a table.
+_PSEUDO_COLUMNS = {
+    "ROWNUM", "ROWID", "LEVEL", "SYSDATE", "SYSTIMESTAMP", "CURRENT_DATE", "CURRENT_TIMESTAMP",
+    "USER", "UID", "NULL", "ORA_ROWSCN", "CONNECT_BY_ISLEAF", "CONNECT_BY_ISCYCLE",
+}
+# Statement types that can change data, schema or session state.
+_WRITE_NODES = (
+    exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+    exp.Command, exp.Transaction, exp.Commit, exp.Rollback,
+)
+# Calls into PL/SQL packages can have side effects (and autonomous transactions) even inside a SELECT.
+_PACKAGE_CALL = re.compile(r"\b(DBMS|UTL|OWA|HTP|HTF|APEX|SYS)_?\w*\s*\.\s*\w+\s*\(", re.IGNORECASE)
+# Used only when sqlglot cannot parse the query.
+_FOR_UPDATE = re.compile(r"\bFOR\s+UPDATE\b", re.IGNORECASE)
+_DB_LINK = re.compile(r"@\s*[A-Z_\"]", re.IGNORECASE)
+# Plan verdicts kept per query text, so repeated queries skip the EXPLAIN PLAN round trip.
+_PLAN_CACHE_ENTRIES = 512
+
+
+def _upper(name: str) -> str:
+    return (name or "").upper()
+
+
+class SqlGuard:
+    """
+    Rejects generated queries before they reach Oracle for execution. check() returns None for an
+    accepted query, or a reason suitable for the user/LLM. Static checks need only the catalog; the
+    plan check runs EXPLAIN PLAN and compares the root step's cost and cardinality to the limits.
+    """
+
+    def __init__(self, catalog, db, max_cost: int = SQL_MAX_PLAN_COST, max_cardinality: int = SQL_MAX_PLAN_CARDINALITY):
+        self.catalog = catalog
+        self.db = db
+        self.max_cost = max_cost
+        self.max_cardinality = max_cardinality
+        self._plan_verdicts: "OrderedDict[tuple, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"accepted": 0, "rejected_static": 0, "rejected_plan": 0}
+
+    # --- Static checks ---
+
+    def validate(self, sql: str) -> Optional[str]:
+        """Read-only rules plus table/column existence, without touching the database."""
+        if _PACKAGE_CALL.search(sql):
+            return "Calls to PL/SQL packages are not allowed."
+        try:
+            statements = [s for s in sqlglot.parse(sql, read="oracle") if s is not None]
+        except SqlglotError as e:
+            # Oracle accepts syntax sqlglot does not know; the plan check still gets the final say.
+            log.info("Could not parse the query locally; skipping schema checks", extra={"error": str(e).splitlines()[0]})
+            if not re.match(r"^\s*(SELECT|WITH)\b", sql, re.IGNORECASE) or _FOR_UPDATE.search(sql):
+                return "Only read-only SELECT queries are allowed."
+            return "Database links are not allowed." if _DB_LINK.search(sql) else None
+        if len(statements) != 1:
+            return "Exactly one SQL statement is allowed."
+        tree = statements[0]
+        if not isinstance(tree, exp.Query) or tree.find(*_WRITE_NODES) is not None:
+            return "Only read-only SELECT queries are allowed."
+        if tree.find(exp.Lock) is not None:
+            return "SELECT ... FOR UPDATE is not allowed."
+        if any("@" in table.name for table in tree.find_all(exp.Table)):
+            return "Database links are not allowed."
+        if not self.catalog.tables:
+            return None
+        return self._check_schema(tree)
+
+    def _check_schema(self, tree: exp.Expression) -> Optional[str]:
+        derived = {_upper(cte.alias) for cte in tree.find_all(exp.CTE)}
+        derived |= {_upper(sub.alias) for sub in tree.find_all(exp.Subquery) if sub.alias}
+        owner = _upper(self.db.db_owner)
+
+        # Alias (or name) -> catalog table, for every real table the query reads.
+        sources: Dict[str, str] = {}
+        for table in tree.find_all(exp.Table):
+            name = _upper(table.name)
+            if not table.db and (name in derived or name == "DUAL"):
+                continue
+            if table.db and owner and _upper(table.db) != owner:
+                return f"Table {table.db}.{table.name} is outside the application schema."
+            if not self.catalog.has_table(name):
+                return f"Unknown table {table.name}."
+            sources[_upper(table.alias_or_name)] = name
+            sources.setdefault(name, name)
+
+        known_columns: Set[str] = set()
+        for name in set(sources.values()):
+            known_columns.update(_upper(c) for c in self.catalog.column_names(name))
+        # Oracle lets ORDER BY refer to select-list aliases.
+        aliases = {_upper(alias.alias) for alias in tree.find_all(exp.Alias)}
+
+        for column in tree.find_all(exp.Column):
+            if isinstance(column.this, exp.Star):
+                continue
+            name = _upper(column.name)
+            qualifier = _upper(column.table)
+            if qualifier:
+                if qualifier in sources:
+                    table_name = sources[qualifier]
+                    if name not in {_upper(c) for c in self.catalog.column_names(table_name)}:
+                        return f"Unknown column {column.table}.{column.name}: {table_name} has no column {column.name}."
+                elif qualifier not in derived:
+                    return f"Unknown table or alias {column.table} in {column.sql(dialect='oracle')}."
+            elif not derived and name not in known_columns and name not in aliases and name not in _PSEUDO_COLUMNS:
+                # With CTEs or inline views an unqualified name may come from them; Oracle decides.
+                return f"Unknown column {column.name}."
+        return None
+
+    # --- Plan check ---
+
+    def check_plan(self, sql: str) -> Optional[str]:
+        """EXPLAIN PLAN limits. Errors Oracle raises while planning (e.g. ORA-00904) reject the query too."""
+        if not (self.max_cost or self.max_cardinality) or self.db.pool is None:
+            return None
+        key = (sql, self.catalog.version)
+        with self._lock:
+            if key in self._plan_verdicts:
+                self._plan_verdicts.move_to_end(key)
+                return self._plan_verdicts[key]
+
+        plan, error = self.db.explain_plan(sql, call_timeout=SQL_CALL_TIMEOUT_MS)
+        if error:
+            if "ORA-02402" in error or "ORA-02404" in error or "PLAN_TABLE" in error.upper():
+                log.warning("PLAN_TABLE is unavailable; skipping the cost check", extra={"error": error})
+                return None
+            verdict = f"The database rejected the query: {error}"
+        else:
+            log.info("Plan estimate", extra={"cost": plan["cost"], "cardinality": plan["cardinality"]})
+            verdict = self._plan_verdict(plan)
+
+        if error and not error.startswith("ORA-"):
+            # Client-side failures (timeouts, lost sessions) say nothing about the query; don't remember them.
+            return verdict
+        with self._lock:
+            self._plan_verdicts[key] = verdict
+            while len(self._plan_verdicts) > _PLAN_CACHE_ENTRIES:
+                self._plan_verdicts.popitem(last=False)
+        return verdict
+
+    def _plan_verdict(self, plan: Dict[str, Any]) -> Optional[str]:
+        cost, cardinality = plan.get("cost"), plan.get("cardinality")
+        if self.max_cost and cost is not None and cost > self.max_cost:
+            return f"The query is too expensive to run (estimated cost {cost}, limit {self.max_cost}). Add filters or aggregate."
+        if self.max_cardinality and cardinality is not None and cardinality > self.max_cardinality:
+            return (f"The query would produce too many rows (estimated {cardinality}, limit {self.max_cardinality}). "
+                    "Check the join conditions or add filters.")
+        return None
+
+    # --- Entry point ---
+
+    def _record(self, reason: Optional[str], stage: str) -> Optional[str]:
+        with self._lock:
+            self.stats[f"rejected_{stage}" if reason else "accepted"] += 1
+        if reason:
+            log.info("Rejected query", extra={"reason": reason, "stage": stage})
+        return reason
+
+    def check(self, sql: str) -> Optional[str]:
+        reason = self.validate(sql)
+        if reason:
+            return self._record(reason, "static")
+        return self._record(self.check_plan(sql), "plan")
+
+    async def check_async(self, sql: str) -> Optional[str]:
+        """check() with the EXPLAIN PLAN round trip on the database executor."""
+        reason = self.validate(sql)
+        if reason:
+            return self._record(reason, "static")
+        return self._record(await self.db._run_in_executor(self.check_plan, sql), "plan")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
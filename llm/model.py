@@ -1,11 +1,25 @@
 # File: llm/model.py
-# --- UPDATED for OpenAI-Compatible API ---
+# --- UPDATED for OpenAI-Compatible API, with a shared keep-alive client ---
 
+import asyncio
 import httpx
+import json
 import os
-from core.config import OLLAMA_BASE_URL, LLM_MODEL_NAME
+from typing import AsyncIterator, Optional
+from core.config import (
+    OLLAMA_BASE_URL, LLM_MODEL_NAME,
+    LLM_REQUEST_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS, LLM_KEEPALIVE_EXPIRY, LLM_HTTP2, LLM_MAX_IN_FLIGHT,
+)
+from core.tracing import span, get_logger
+
+log = get_logger("llm")
 
 class LanguageModel:
+    # Shared by every LanguageModel in the process so connections to the LLM server are reused.
+    _client: Optional[httpx.AsyncClient] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+
     def __init__(self):
         self.base_url = OLLAMA_BASE_URL
         self.model_name = LLM_MODEL_NAME
@@ -14,18 +28,57 @@ class LanguageModel:
         self.api_endpoint = "/v1/chat/completions" 
         self.full_url = f"{self.base_url.rstrip('/') if self.base_url else ''}{self.api_endpoint}"
         
-        print(f"LanguageModel initialized to use model '{self.model_name}' at '{self.full_url}'")
+        log.info("LanguageModel initialized", extra={"model": self.model_name, "url": self.full_url})
+
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        """Returns the process-wide HTTP client, creating it on first use."""
+        if cls._client is None or cls._client.is_closed:
+            http2 = LLM_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    log.warning("LLM_HTTP2 is enabled but the 'h2' package is not installed; falling back to HTTP/1.1")
+                    http2 = False
+
+            cls._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+            log.info("Created shared HTTP client", extra={"http2": http2, "max_connections": LLM_MAX_CONNECTIONS})
+        return cls._client
 
-    async def generate_response(self, prompt: str) -> str:
+    @classmethod
+    def _get_semaphore(cls) -> asyncio.Semaphore:
+        if cls._semaphore is None:
+            cls._semaphore = asyncio.Semaphore(LLM_MAX_IN_FLIGHT)
+        return cls._semaphore
+
+    @classmethod
+    async def aclose(cls):
+        """
+        Closes the shared HTTP client and drops the in-flight semaphore. Called on application shutdown;
+        both are recreated on next use, so a later event loop (a test client, a restarted app) starts clean.
+        """
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+            log.info("Shared HTTP client closed")
+        cls._client = None
+        cls._semaphore = None
+
+    async def generate_response(self, prompt: str, timeout: Optional[float] = None) -> str:
         if not self.base_url or not self.model_name:
             error_msg = "Error: OLLAMA_BASE_URL or LLM_MODEL_NAME is not configured in .env file."
-            print(error_msg)
+            log.error(error_msg)
             return error_msg
 
-        headers = {
-            "Content-Type": "application/json",
-        }
-
         # This is the standard OpenAI-compatible payload structure
         payload = {
             "model": self.model_name,
@@ -36,28 +89,91 @@ class LanguageModel:
             "stream": False
         }
 
+        # A per-call timeout overrides the client default (e.g. short routing calls).
+        request_timeout = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                print(f"Sending request to OpenAI-compatible server at {self.full_url}...")
-                response = await client.post(self.full_url, headers=headers, json=payload)
-                
-                # Raise an error if the request was unsuccessful
-                response.raise_for_status() 
-                
-                response_data = response.json()
-                
-                # This is how we parse the content from a standard chat completion response
-                content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
-                
-                if not content:
-                    print(f"Warning: LLM returned an empty response. Full response data: {response_data}")
-                    return "Error: Received an empty response from the model."
-                
-                return content.strip()
+            client = self._get_client()
+            # Includes any wait for an in-flight slot, which is part of what the caller waited for.
+            with span("llm"):
+                async with self._get_semaphore():
+                    log.debug("Sending completion request", extra={"url": self.full_url})
+                    response = await client.post(self.full_url, json=payload, timeout=request_timeout)
+            
+            # Raise an error if the request was unsuccessful
+            response.raise_for_status() 
+            
+            response_data = response.json()
+            
+            # This is how we parse the content from a standard chat completion response
+            content = response_data.get('choices', [{}])[0].get('message', {}).get('content', '')
+            
+            if not content:
+                log.warning("LLM returned an empty response", extra={"response_data": response_data})
+                return "Error: Received an empty response from the model."
+            
+            return content.strip()
 
+        except httpx.TimeoutException as e:
+            log.warning("Timed out waiting for LLM service", extra={"error": str(e)})
+            return "Error: The language model service timed out."
         except httpx.RequestError as e:
-            print(f"Error communicating with LLM service: {e}")
+            log.warning("Error communicating with LLM service", extra={"error": str(e)})
             return "Error: Could not connect to the language model service."
-        except Exception as e:
-            print(f"An unexpected error occurred in LLM interaction: {e}")
-            return "Error: An unexpected error occurred while generating the response."
\ No newline at end of file
+        except Exception:
+            log.exception("Unexpected error in LLM interaction")
+            return "Error: An unexpected error occurred while generating the response."
+
+
+    async def stream_response(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Streams the completion as text deltas using the server's Server-Sent-Events mode.
+        Errors are yielded as a single 'Error: ...' chunk, mirroring generate_response.
+        """
+        if not self.base_url or not self.model_name:
+            error_msg = "Error: OLLAMA_BASE_URL or LLM_MODEL_NAME is not configured in .env file."
+            log.error(error_msg)
+            yield error_msg
+            return
+
+        payload = {
+            "model": self.model_name,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.0,
+            "stream": True
+        }
+
+        request_timeout = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+
+        try:
+            client = self._get_client()
+            async with self._get_semaphore():
+                log.debug("Sending streaming completion request", extra={"url": self.full_url})
+                async with client.stream("POST", self.full_url, json=payload, timeout=request_timeout) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        # Each event is a line of the form 'data: {...}'; blank lines separate events.
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            chunk = json.loads(data)
+                        except json.JSONDecodeError:
+                            continue
+                        delta = chunk.get('choices', [{}])[0].get('delta', {}).get('content')
+                        if delta:
+                            yield delta
+
+        except httpx.TimeoutException as e:
+            log.warning("Timed out waiting for LLM service", extra={"error": str(e)})
+            yield "Error: The language model service timed out."
+        except httpx.RequestError as e:
+            log.warning("Error communicating with LLM service", extra={"error": str(e)})
+            yield "Error: Could not connect to the language model service."
+        except Exception:
+            log.exception("Unexpected error in LLM streaming")
+            yield "Error: An unexpected error occurred while generating the response."
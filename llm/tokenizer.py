@@ -0,0 +1,41 @@
+# File: llm/tokenizer.py
+# Token counting for prompt budgets, using the served model's own tokenizer when it can be loaded.
+
+import threading
+from typing import Optional
+
+from core.config import LLM_TOKENIZER
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def load_tokenizer():
+    """Loads the Hugging Face tokenizer named by LLM_TOKENIZER once; None if unavailable."""
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        with _tokenizer_lock:
+            if not _tokenizer_loaded:
+                if LLM_TOKENIZER:
+                    try:
+                        from transformers import AutoTokenizer
+                        _tokenizer = AutoTokenizer.from_pretrained(LLM_TOKENIZER)
+                        print(f"Tokenizer '{LLM_TOKENIZER}' loaded for prompt budgeting.")
+                    except Exception as e:
+                        print(f"Warning: could not load tokenizer '{LLM_TOKENIZER}' ({e}); estimating tokens from length.")
+                _tokenizer_loaded = True
+    return _tokenizer
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt-size estimate (about four characters per token for English and SQL)."""
+    return (len(text) + 3) // 4
+
+
+def count_tokens(text: str, tokenizer: Optional[object] = None) -> int:
+    """Exact token count with the model's tokenizer, or the length-based estimate without one."""
+    tokenizer = tokenizer or load_tokenizer()
+    if tokenizer is None:
+        return estimate_tokens(text)
+    return len(tokenizer.encode(text, add_special_tokens=False))
@@ -1,17 +1,37 @@
 # File: main.py
 print("--- main.py: Script execution started ---") # ADD THIS LINE
 
-from fastapi import FastAPI, Depends
-# ... rest of the file
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from api.endpoints import router as api_router
-from core.auth import verify_firebase_token
+from api.voice_stream import router as voice_stream_router
+from core.auth import verify_firebase_token, start_certificate_refresh, stop_certificate_refresh
+from core.components import components
+from core.tracing import TracingMiddleware, metrics_available, render_metrics
+from llm.model import LanguageModel
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Components load in the background: / answers at once, /ready reports progress, and
+    # /query endpoints answer 503 until the components they need are ready.
+    startup = asyncio.create_task(components.start())
+    start_certificate_refresh()
+    yield
+    startup.cancel()
+    stop_certificate_refresh()
+    await LanguageModel.aclose()
+    components.close()
+
 
 app = FastAPI(
     title="Secure Investigation & Intelligence Platform (SIIP)",
     description="Backend services for the SIIP application.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -20,10 +40,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID"],
 )
+# Added last, so it is the outermost layer and times the whole request.
+app.add_middleware(TracingMiddleware)
 
 app.include_router(api_router, prefix="/query", dependencies=[Depends(verify_firebase_token)])
+# The WebSocket authenticates inside the handler (token in the first message).
+app.include_router(voice_stream_router, prefix="/query")
 
 @app.get("/", tags=["Health Check"])
 async def read_root():
-    return {"status": "SIIP Backend is running"}
\ No newline at end of file
+    return {"status": "SIIP Backend is running"}
+
+@app.get("/ready", tags=["Health Check"])
+async def read_ready(response: Response):
+    """200 once every startup component has loaded, 503 before; per-component status and init times either way."""
+    report = components.report()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+@app.get("/metrics", tags=["Health Check"])
+async def read_metrics():
+    """Prometheus exposition: per-stage, per-route request and SQL row-count histograms."""
+    if not metrics_available():
+        return Response("prometheus-client is not installed.\n", status_code=503, media_type="text/plain")
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
@@ -0,0 +1,97 @@
+# File: rag/index_factory.py
+# Builds the FAISS index backends used by the RAG pipeline and their per-query search parameters.
+
+import faiss
+import numpy as np
+from typing import Optional
+
+from core.config import (
+    RAG_IVF_NLIST, RAG_IVF_NPROBE, RAG_PQ_M, RAG_PQ_NBITS,
+    RAG_HNSW_M, RAG_HNSW_EF_CONSTRUCTION, RAG_HNSW_EF_SEARCH,
+)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# FAISS wants roughly this many training points per IVF list (and per PQ centroid).
+_POINTS_PER_CENTROID = 39
+
+
+def needs_training(index_type: str) -> bool:
+    return index_type in ("ivf_flat", "ivf_pq")
+
+
+def supports_removal(index_type: str) -> bool:
+    """HNSW graphs cannot delete vectors, so changes to an HNSW index require a rebuild."""
+    return index_type != "hnsw"
+
+
+def training_size(index_type: str, nlist: int = RAG_IVF_NLIST, pq_nbits: int = RAG_PQ_NBITS) -> int:
+    """How many vectors to collect before the index can be trained (0 if it needs none)."""
+    if not needs_training(index_type):
+        return 0
+    size = nlist * _POINTS_PER_CENTROID
+    if index_type == "ivf_pq":
+        size = max(size, (1 << pq_nbits) * _POINTS_PER_CENTROID)
+    return size
+
+
+def create_index(
+    index_type: str,
+    dim: int,
+    train_vectors: Optional[np.ndarray] = None,
+    nlist: int = RAG_IVF_NLIST,
+    pq_m: int = RAG_PQ_M,
+    pq_nbits: int = RAG_PQ_NBITS,
+    hnsw_m: int = RAG_HNSW_M,
+    ef_construction: int = RAG_HNSW_EF_CONSTRUCTION,
+):
+    """
+    Creates (and, for IVF types, trains) an empty index of the requested type. The number of IVF
+    lists is capped by the training sample so small tables still get a usable index.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown RAG index type '{index_type}'. Expected one of {INDEX_TYPES}.")
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        return index
+
+    if train_vectors is None or len(train_vectors) == 0:
+        raise ValueError(f"Index type '{index_type}' needs training vectors.")
+    train_vectors = np.ascontiguousarray(train_vectors, dtype=np.float32)
+    nlist = max(1, min(nlist, len(train_vectors) // _POINTS_PER_CENTROID))
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+    else:
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+    index.train(train_vectors)
+    return index
+
+
+def with_ids(index, index_type: str):
+    """
+    Makes the index addressable by FIR id. IVF indexes store ids natively and can remove them;
+    flat and HNSW indexes are wrapped in an IndexIDMap2 (which would break IVF removals).
+    """
+    if needs_training(index_type):
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def search_parameters(
+    index_type: str,
+    selector=None,
+    nprobe: int = RAG_IVF_NPROBE,
+    ef_search: int = RAG_HNSW_EF_SEARCH,
+):
+    """Per-query search parameters, optionally restricted to the ids accepted by `selector`."""
+    if needs_training(index_type):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    if index_type == "hnsw":
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
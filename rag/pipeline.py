@@ -1,94 +1,494 @@
 # File: rag/pipeline.py
-# --- CORRECTED with robust checks for type safety ---
+# --- PERSISTENT, INCREMENTAL VERSION: The index is saved to disk, memory-mapped, and refreshed from FIR changes ---
 
 from sentence_transformers import SentenceTransformer
 import faiss
+import json
 import numpy as np
-from typing import List, Tuple, Dict, Any
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import List, Tuple, Dict, Any, Optional, NamedTuple
 
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; builds are then not coordinated across workers.
+    fcntl = None
+
+from core.config import (
+    RAG_INDEX_DIR, RAG_EMBEDDER_MODEL, RAG_WATERMARK_COLUMN,
+    RAG_FETCH_ARRAYSIZE, RAG_EMBED_BATCH_SIZE, RAG_INDEX_TYPE,
+    RAG_IVF_NPROBE, RAG_HNSW_EF_SEARCH,
+)
 from database.connection import Database
+from rag.index_factory import create_index, with_ids, training_size, supports_removal, search_parameters
+from core.tracing import get_logger
+
+log = get_logger("rag")
+
+# Stored per document so searches can be restricted to a district, police station or year.
+FILTER_COLUMNS = ("DISTRICT_CD", "PS_CD", "REG_YEAR")
+
+# Data files of one index generation, by suffix. Each save writes them under new names and then
+# points meta.json at them, so replacing meta.json is the one step that publishes a new index.
+DATA_FILES = {"index": "faiss", "ids": "ids.npy", "spans": "spans.npy", "attrs": "attrs.npy", "docs": "docs.bin"}
+
+
+class IndexState(NamedTuple):
+    """
+    Everything a search needs, swapped in as one object so a refresh never exposes a half-updated index.
+    `ids` is sorted ascending; `spans[i]` is the (start, length) of that FIR's text in `docs` and
+    `attrs[i]` holds its FILTER_COLUMNS values.
+    """
+    index: Any
+    ids: np.ndarray
+    spans: np.ndarray
+    attrs: np.ndarray
+    docs: np.ndarray
+
 
 class RagPipeline:
-    def __init__(self, db: Database):
+    # The embedder and the pipeline itself are process-wide: loading the model and the index is
+    # expensive, searching them is not.
+    _embedder: Optional[SentenceTransformer] = None
+    _embedder_lock = threading.Lock()
+    _shared: Optional["RagPipeline"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db: Database, index_dir: str = RAG_INDEX_DIR):
         """
         Initializes the RAG pipeline with a database connection.
         """
         self.db = db
-        # Use a lightweight model for generating embeddings
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.index = None
-        self.documents = []
-        print("RAG Pipeline initialized.")
+        self.index_dir = index_dir
+        self.embedder = self.get_embedder()
+        self.state: Optional[IndexState] = None
+        self.meta: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        log.info("RAG pipeline initialized", extra={"index_dir": index_dir})
 
-    def build_index(self, table_name: str, content_column: str, id_column: str):
+    @property
+    def index(self):
+        return self.state.index if self.state else None
+
+    @classmethod
+    def get_embedder(cls) -> SentenceTransformer:
+        """Loads the sentence embedder once per process."""
+        if cls._embedder is None:
+            with cls._embedder_lock:
+                if cls._embedder is None:
+                    cls._embedder = SentenceTransformer(RAG_EMBEDDER_MODEL)
+        return cls._embedder
+
+    @classmethod
+    def get_shared(cls, db: Database) -> "RagPipeline":
+        """Returns the process-wide pipeline, creating it on first use."""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls(db)
+        return cls._shared
+
+    # --- Persistence ---
+
+    def _paths(self, table_name: str, meta: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+        """The fixed meta and lock paths, plus the data files of the generation `meta` describes."""
+        stem = os.path.join(self.index_dir, table_name.lower())
+        paths = {"meta": f"{stem}.meta.json", "lock": f"{stem}.lock"}
+        for key, name in (meta or {}).get("files", {}).items():
+            paths[key] = os.path.join(self.index_dir, name)
+        return paths
+
+    @staticmethod
+    def _generation_file(table_name: str, generation: str, key: str) -> str:
+        return f"{table_name.lower()}.{generation}.{DATA_FILES[key]}"
+
+    def _read_meta(self, table_name: str) -> Dict[str, Any]:
+        try:
+            with open(self._paths(table_name)["meta"], "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _is_compatible(self, meta: Dict[str, Any], content_column: str, id_column: str) -> bool:
+        """A saved index can be refreshed in place only if it was built with the same embedder, backend and columns."""
+        return (
+            bool(meta)
+            and meta.get("embedder") == RAG_EMBEDDER_MODEL
+            and meta.get("index_type") == RAG_INDEX_TYPE
+            and meta.get("filter_columns") == list(FILTER_COLUMNS)
+            and meta.get("content_column") == content_column.upper()
+            and meta.get("id_column") == id_column.upper()
+        )
+
+    def _load_state(self, table_name: str, meta: Dict[str, Any], mmap: bool = True) -> Optional[IndexState]:
         """
-        Fetches data from the database and builds a FAISS vector index.
+        Reads the index generation `meta` points at, memory-mapped by default. Returns None if it is
+        missing or inconsistent.
         """
-        self.documents = self.db.fetch_all_for_rag(table_name, [id_column, content_column])
-        
-        if not self.documents:
-            print(f"RAG Pipeline: No documents found in table '{table_name}' to build index.")
-            return
+        paths = self._paths(table_name, meta)
+        if not all(key in paths for key in DATA_FILES):
+            return None
+        try:
+            if mmap:
+                index = faiss.read_index(paths["index"], faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                ids = np.load(paths["ids"], mmap_mode="r")
+                spans = np.load(paths["spans"], mmap_mode="r")
+                attrs = np.load(paths["attrs"], mmap_mode="r")
+            else:
+                index = faiss.read_index(paths["index"])
+                ids = np.load(paths["ids"])
+                spans = np.load(paths["spans"])
+                attrs = np.load(paths["attrs"])
+            docs = np.memmap(paths["docs"], dtype=np.uint8, mode="r") if os.path.getsize(paths["docs"]) else np.zeros(0, dtype=np.uint8)
+        except (RuntimeError, OSError, ValueError) as e:
+            log.warning("Could not load saved index", extra={"table": table_name, "error": str(e)})
+            return None
+
+        if index.ntotal != len(ids) or len(spans) != len(ids) or len(attrs) != len(ids):
+            log.warning("Saved index is inconsistent; it will be rebuilt", extra={"table": table_name})
+            return None
+        return IndexState(index, ids, spans, attrs, docs)
+
+    def _activate(self, table_name: str) -> bool:
+        meta = self._read_meta(table_name)
+        state = self._load_state(table_name, meta)
+        if state is None:
+            return False
+        self.state = state
+        self.meta = meta
+        return True
+
+    @staticmethod
+    def _replace(path: str, write):
+        """Writes a file under a temporary name and renames it into place, so readers never see a partial file."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _save(self, table_name: str, generation: str, docs_name: str, index, ids: np.ndarray, spans: np.ndarray, attrs: np.ndarray,
+              meta: Dict[str, Any]):
+        """
+        Writes the index and sidecars as files of a new generation, then atomically replaces meta.json
+        to point at them together with the document file docs_name. Until then readers keep loading the
+        previous generation, whose files are deleted only afterwards, so no reader ever pairs files
+        from two different saves.
+        """
+        meta["files"] = {key: self._generation_file(table_name, generation, key) for key in DATA_FILES if key != "docs"}
+        meta["files"]["docs"] = docs_name
+        paths = self._paths(table_name, meta)
+        with open(paths["index"], "wb") as f:
+            f.write(faiss.serialize_index(index).tobytes())
+        for key, array in (("ids", ids), ("spans", spans), ("attrs", attrs)):
+            with open(paths[key], "wb") as f:
+                np.save(f, array)
+        self._replace(paths["meta"], lambda f: f.write(json.dumps(meta, indent=2).encode("utf-8")))
+        self._remove_stale_files(table_name, set(meta["files"].values()))
+
+    def _remove_stale_files(self, table_name: str, current: set):
+        """
+        Deletes data files of earlier generations (and of the unversioned layout). Workers that still
+        have them memory-mapped keep reading them until they load the new generation.
+        """
+        prefix = f"{table_name.lower()}."
+        for name in os.listdir(self.index_dir):
+            if (name.startswith(prefix) and name not in current and ".tmp-" not in name
+                    and any(name.endswith(f".{suffix}") for suffix in DATA_FILES.values())):
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError as e:
+                    log.warning("Could not remove old index file", extra={"file": name, "error": str(e)})
+
+    # --- Ingestion ---
 
-        # --- FIX 1: Add 'if doc is not None' to prevent error on potential None values ---
-        contents = [doc.get(content_column.lower(), "") or "" for doc in self.documents if doc is not None]
-        
-        # If after filtering, there are no contents, do nothing.
-        if not contents:
-            print(f"RAG Pipeline: No valid content found in documents to build index.")
+    def load_or_build(self, table_name: str, content_column: str, id_column: str):
+        """
+        Memory-maps the saved index and brings it up to date with the table: unchanged data loads in
+        milliseconds, changed FIRs are re-embedded incrementally, and only an incompatible or missing
+        index triggers a full build. Only one worker ingests at a time; the others wait and load its result.
+        """
+        with self._lock:
+            meta = self._read_meta(table_name)
+            watermark = self.db.get_table_watermark(table_name, RAG_WATERMARK_COLUMN)
+            if self._is_compatible(meta, content_column, id_column) and meta.get("watermark") == watermark and self._activate(table_name):
+                log.info("Loaded saved index", extra={"table": table_name, "documents": self.state.index.ntotal})
+                return
+
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(self._paths(table_name)["lock"], "w") as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Another worker may have finished ingesting while we waited for the lock.
+                    meta = self._read_meta(table_name)
+                    if meta.get("watermark") == watermark and self._is_compatible(meta, content_column, id_column) and self._activate(table_name):
+                        log.info("Loaded index refreshed by another worker", extra={"table": table_name})
+                        return
+                    # HNSW graphs cannot delete vectors, so a stale HNSW index is always rebuilt.
+                    full = (
+                        not self._is_compatible(meta, content_column, id_column)
+                        or not supports_removal(RAG_INDEX_TYPE)
+                        or self._load_state(table_name, meta) is None
+                    )
+                    self._ingest(table_name, content_column, id_column, watermark, full=full)
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self, table_name: str = "T_FIR_REGISTRATION", content_column: str = "FIR_CONTENTS", id_column: str = "FIR_REG_NUM"):
+        """Embeds FIRs added or changed since the last ingest and tombstones deleted ones."""
+        self.load_or_build(table_name, content_column, id_column)
+
+    def build_index(self, table_name: str, content_column: str, id_column: str):
+        """Rebuilds the index from scratch, discarding any saved state."""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            watermark = self.db.get_table_watermark(table_name, RAG_WATERMARK_COLUMN)
+            self._ingest(table_name, content_column, id_column, watermark, full=True)
+
+    def start_periodic_refresh(self, interval_seconds: int, table_name: str = "T_FIR_REGISTRATION", content_column: str = "FIR_CONTENTS", id_column: str = "FIR_REG_NUM"):
+        """Runs refresh() every interval_seconds on a daemon thread."""
+        if interval_seconds <= 0 or self._refresh_thread is not None:
             return
 
-        print(f"RAG Pipeline: Creating embeddings for {len(contents)} documents...")
-        embeddings = self.embedder.encode(contents, convert_to_tensor=False)
-        
-        # --- FIX 2: Add a check to ensure embeddings are not empty before adding to index ---
-        if embeddings.size > 0:
-            # Build the FAISS index for efficient similarity search
-            self.index = faiss.IndexFlatL2(embeddings.shape[1])
-            self.index.add(np.array(embeddings, dtype=np.float32))
-            print("RAG Pipeline: Index built successfully.")
+        def _loop():
+            while True:
+                time.sleep(interval_seconds)
+                try:
+                    self.refresh(table_name, content_column, id_column)
+                except Exception as e:
+                    log.warning("Periodic refresh failed", extra={"table": table_name, "error": str(e)})
+
+        self._refresh_thread = threading.Thread(target=_loop, name="rag-refresh", daemon=True)
+        self._refresh_thread.start()
+        log.info("Periodic refresh started", extra={"interval_seconds": interval_seconds})
+
+    def _ingest(self, table_name: str, content_column: str, id_column: str, watermark: Dict[str, Any], full: bool):
+        """
+        Streams rows from Oracle in fetchmany batches, embeds them in fixed-size batches and upserts
+        them into an index keyed on the FIR id. An incremental run only reads rows whose
+        watermark column is at or after the previous watermark. IVF indexes are trained on the first
+        embedded vectors of a full build before anything is added.
+        """
+        id_key, content_key = id_column.lower(), content_column.lower()
+        filter_keys = [c.lower() for c in FILTER_COLUMNS]
+        old_meta = {} if full else self._read_meta(table_name)
+        # Names this run's files; nothing refers to them until _save publishes the new meta.json.
+        generation = secrets.token_hex(6)
+        start = time.perf_counter()
+
+        if full:
+            index = None
+            ids = np.zeros(0, dtype=np.int64)
+            spans = np.zeros((0, 2), dtype=np.int64)
+            attrs = np.zeros((0, len(FILTER_COLUMNS)), dtype=np.int64)
+            dead_bytes = 0
+            docs_name = self._generation_file(table_name, generation, "docs")
+            docs_file = open(os.path.join(self.index_dir, docs_name), "wb")
         else:
-            print("RAG Pipeline: Embedding generation resulted in no data; index not built.")
+            state = self._load_state(table_name, old_meta, mmap=False)
+            index, ids, spans, attrs = state.index, state.ids, state.spans, state.attrs
+            dead_bytes = int(old_meta.get("dead_bytes", 0))
+            docs_name = old_meta["files"]["docs"]
+            # Appending never moves existing bytes, and the current meta.json only describes bytes
+            # before them, so other workers can keep reading the file meanwhile.
+            docs_file = open(os.path.join(self.index_dir, docs_name), "ab")
+
+        # Vectors held back until there are enough to train an IVF index.
+        pending_vectors, pending_ids = [], []
+        train_size = training_size(RAG_INDEX_TYPE)
+
+        def _train_and_flush():
+            nonlocal index
+            sample = np.concatenate(pending_vectors)
+            index = with_ids(create_index(RAG_INDEX_TYPE, sample.shape[1], sample), RAG_INDEX_TYPE)
+            index.add_with_ids(sample, np.concatenate(pending_ids))
+            pending_vectors.clear()
+            pending_ids.clear()
 
+        def _add(vectors: np.ndarray, batch_ids: np.ndarray):
+            if index is None:
+                pending_vectors.append(vectors)
+                pending_ids.append(batch_ids)
+                if sum(len(v) for v in pending_vectors) >= train_size:
+                    _train_and_flush()
+                return
+            if not full:
+                index.remove_ids(batch_ids)
+            index.add_with_ids(vectors, batch_ids)
+
+        columns = ", ".join([id_column, content_column, *FILTER_COLUMNS])
+        query = f"SELECT {columns} FROM {table_name}"
+        params = {}
+        since = (old_meta.get("watermark") or {}).get("max_updated")
+        if since:
+            # '>=' rather than '>' so rows committed later with the same timestamp are not missed;
+            # re-embedding a few unchanged rows is harmless because upserts replace by id.
+            query += f" WHERE {RAG_WATERMARK_COLUMN} >= :since"
+            params["since"] = datetime.fromisoformat(since)
+
+        new_ids, new_spans, new_attrs = [], [], []
+        offset = docs_file.tell()
+        embedded = 0
+        try:
+            for rows in self.db.iter_query_batches(query, params, batch_size=RAG_FETCH_ARRAYSIZE):
+                rows = [row for row in rows if row.get(id_key) is not None]
+                for i in range(0, len(rows), RAG_EMBED_BATCH_SIZE):
+                    batch = rows[i:i + RAG_EMBED_BATCH_SIZE]
+                    batch_ids = np.array([int(row[id_key]) for row in batch], dtype=np.int64)
+                    encoded = [(row.get(content_key) or "").encode("utf-8") for row in batch]
+                    embeddings = self.embedder.encode([b.decode("utf-8") for b in encoded], batch_size=RAG_EMBED_BATCH_SIZE, convert_to_tensor=False)
+                    _add(np.asarray(embeddings, dtype=np.float32), batch_ids)
+
+                    lengths = np.array([len(b) for b in encoded], dtype=np.int64)
+                    starts = offset + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                    docs_file.write(b"".join(encoded))
+                    offset += int(lengths.sum())
+                    new_ids.append(batch_ids)
+                    new_spans.append(np.stack([starts, lengths], axis=1))
+                    # Missing filter values are stored as -1 so they never match a filter.
+                    new_attrs.append(np.array([[int(row[k]) if row.get(k) is not None else -1 for k in filter_keys] for row in batch], dtype=np.int64))
+                    embedded += len(batch)
+            if index is None and pending_vectors:
+                # Fewer rows than the training target: train on everything we have.
+                _train_and_flush()
+        finally:
+            docs_file.close()
+
+        if index is None:
+            # Empty table: an untrained IVF index cannot be created, so fall back to an empty flat index.
+            index = faiss.IndexIDMap2(faiss.IndexFlatL2(self.embedder.get_sentence_embedding_dimension()))
+
+        # Merge upserted rows into the sidecar arrays: replaced FIRs lose their old span.
+        if new_ids:
+            upserted = np.concatenate(new_ids)
+            keep = ~np.isin(ids, upserted)
+            dead_bytes += int(spans[~keep, 1].sum())
+            ids = np.concatenate([ids[keep], upserted])
+            spans = np.concatenate([spans[keep], np.concatenate(new_spans)])
+            attrs = np.concatenate([attrs[keep], np.concatenate(new_attrs)])
+            order = np.argsort(ids, kind="stable")
+            ids, spans, attrs = ids[order], spans[order], attrs[order]
+
+        # Tombstone deleted FIRs by diffing against the live ids (an index-only scan of the key). Counts
+        # are no shortcut: a delete and an insert between refreshes leave the row count unchanged.
+        if not full:
+            live_ids = np.concatenate([
+                np.array([int(row[id_key]) for row in rows], dtype=np.int64)
+                for rows in self.db.iter_query_batches(f"SELECT {id_column} FROM {table_name}", batch_size=RAG_FETCH_ARRAYSIZE)
+            ] or [np.zeros(0, dtype=np.int64)])
+            deleted = ~np.isin(ids, live_ids)
+            if deleted.any():
+                index.remove_ids(ids[deleted])
+                dead_bytes += int(spans[deleted, 1].sum())
+                log.info("Tombstoned deleted documents", extra={"table": table_name, "documents": int(deleted.sum())})
+                ids, spans, attrs = ids[~deleted], spans[~deleted], attrs[~deleted]
+
+        if not full and dead_bytes > int(spans[:, 1].sum()):
+            # More than half the document file is superseded text; copy only live documents into a new one.
+            compacted_name = self._generation_file(table_name, generation, "docs")
+            spans = self._compact_docs(os.path.join(self.index_dir, docs_name), os.path.join(self.index_dir, compacted_name), spans)
+            docs_name = compacted_name
+            dead_bytes = 0
+
+        meta = {
+            "embedder": RAG_EMBEDDER_MODEL,
+            "dim": int(index.d),
+            "index_type": RAG_INDEX_TYPE,
+            "table": table_name.upper(),
+            "content_column": content_column.upper(),
+            "id_column": id_column.upper(),
+            "filter_columns": list(FILTER_COLUMNS),
+            "watermark": watermark,
+            "count": int(len(ids)),
+            "dead_bytes": dead_bytes,
+            "built_at": old_meta.get("built_at") or time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "refreshed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self._save(table_name, generation, docs_name, index, ids, spans, attrs, meta)
+        self._activate(table_name)
+        log.info("Index built" if full else "Index refreshed", extra={
+            "table": table_name, "index_type": RAG_INDEX_TYPE, "embedded": embedded, "documents": int(len(ids)),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+
+    def _compact_docs(self, docs_path: str, new_docs_path: str, spans: np.ndarray) -> np.ndarray:
+        """Copies only the live spans of a document file into a new one and returns their new positions."""
+        old_docs = np.memmap(docs_path, dtype=np.uint8, mode="r")
+        new_spans = np.zeros_like(spans)
+        with open(new_docs_path, "wb") as f:
+            for i, (start, length) in enumerate(spans):
+                new_spans[i] = (f.tell(), length)
+                f.write(old_docs[start:start + length].tobytes())
+        return new_spans
+
+    # --- Search ---
+
+    def _document_text(self, state: IndexState, fir_id: int) -> Optional[str]:
+        pos = int(np.searchsorted(state.ids, fir_id))
+        if pos >= len(state.ids) or state.ids[pos] != fir_id:
+            return None
+        start, length = (int(v) for v in state.spans[pos])
+        return bytes(state.docs[start:start + length]).decode("utf-8")
 
     def get_context(
-        self, 
-        query: str, 
-        table_name: str, 
-        content_column: str, 
+        self,
+        query: str,
+        table_name: str,
+        content_column: str,
         id_column: str = 'FIR_REG_NUM', # Default to the correct ID for your main table
-        k: int = 3
+        k: int = 3,
+        filters: Optional[Dict[str, int]] = None
     ) -> Tuple[str, List[str]]:
         """
         Finds the most relevant documents for a query and returns them as context.
+        `filters` maps FILTER_COLUMNS names to required values, e.g. {"DISTRICT_CD": 12, "REG_YEAR": 2024};
+        only documents matching all of them are scanned.
         """
-        if self.index is None:
-            self.build_index(table_name, content_column, id_column)
+        if self.state is None:
+            self.load_or_build(table_name, content_column, id_column)
 
-        if not self.documents or self.index is None:
+        state = self.state
+        if state is None or state.index.ntotal == 0:
             return "No relevant context found.", []
 
+        params = search_parameters(RAG_INDEX_TYPE)
+        if filters:
+            mask = np.ones(len(state.ids), dtype=bool)
+            for column, value in filters.items():
+                mask &= state.attrs[:, FILTER_COLUMNS.index(column.upper())] == int(value)
+            allowed = np.asarray(state.ids)[mask]
+            if len(allowed) == 0:
+                return "No relevant context found.", []
+            # The selector keeps the search inside the slice; probe wider because a narrow slice
+            # has fewer neighbours in the lists or graph region nearest the query.
+            params = search_parameters(
+                RAG_INDEX_TYPE,
+                selector=faiss.IDSelectorBatch(allowed),
+                nprobe=RAG_IVF_NPROBE * 4,
+                ef_search=max(RAG_HNSW_EF_SEARCH * 4, k),
+            )
+
         query_embedding = self.embedder.encode([query], convert_to_tensor=False)
-        
+
         # NOTE: The following line is functionally CORRECT, even if Pylance shows a warning.
         # This is a known issue with type checkers and the faiss library.
-        distances, indices = self.index.search(np.array(query_embedding, dtype=np.float32), k)
+        distances, labels = state.index.search(np.array(query_embedding, dtype=np.float32), k, params=params)
 
         context_parts = []
         sources = []
-        
-        id_column_lower = id_column.lower()
-        content_column_lower = content_column.lower()
-
-        for i in indices[0]:
-            if i < len(self.documents):
-                doc = self.documents[i]
-                if doc: # Added a check for doc just in case
-                    source_id = doc.get(id_column_lower)
-                    content = doc.get(content_column_lower, "No content available.")
-                    
-                    context_parts.append(content)
-                    sources.append(f"Source FIR: {source_id}")
+
+        # Labels are FIR ids (the index is keyed on them); -1 pads results when fewer than k exist.
+        for fir_id in labels[0]:
+            if fir_id < 0:
+                continue
+            content = self._document_text(state, int(fir_id))
+            context_parts.append(content or "No content available.")
+            sources.append(f"Source FIR: {int(fir_id)}")
 
         context_str = "\n\n---\n\n".join(context_parts)
-        return context_str, sources
\ No newline at end of file
+        return context_str, sources
@@ -1,23 +1,188 @@
 # ----------------------------------------------------------------------
 # File: services/transcription_service.py
 # ----------------------------------------------------------------------
-from faster_whisper import WhisperModel
+import asyncio
+import contextvars
+import io
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Dict, Union
+
+import numpy as np
+
+from core.config import (
+    WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_COMPUTE_TYPE, WHISPER_MODEL_DIR, WHISPER_LOCAL_FILES_ONLY,
+    WHISPER_REPLICAS, WHISPER_WARMUP, TRANSCRIBE_WORKERS, TRANSCRIBE_CPU_THREADS, TRANSCRIBE_QUEUE_MAX,
+)
+from core.tracing import span, annotate, get_logger
+
+log = get_logger("transcription")
+
+# Recent latencies kept for the percentiles in get_stats().
+_LATENCY_WINDOW = 500
+# Length of the synthetic warm-up clip.
+_WARMUP_SECONDS = 2
+
+
+class TranscriptionQueueFull(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def warmup_clip() -> np.ndarray:
+    """A few seconds of a voice-like tone in light noise, 16 kHz float32."""
+    rng = np.random.default_rng(0)
+    t = np.arange(16000 * _WARMUP_SECONDS) / 16000
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return (tone + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
 
 class TranscriptionService:
-    def __init__(self):
-        # Using a small, fast model. It will be downloaded on first use.
-        # For higher accuracy, you could use "medium" or "large-v3".
-        model_size = "tiny.en"
-        # This will download the model into the container.
-        # For production, we would map a volume to cache this model.
-        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
-        print(f"Whisper STT model '{model_size}' loaded.")
-
-    def transcribe(self, audio_path: str) -> str:
-        segments, info = self.model.transcribe(audio_path, beam_size=5)
-        
-        print(f"Detected language '{info.language}' with probability {info.language_probability}")
-
-        full_transcript = "".join(segment.text for segment in segments)
-        print(f"Transcription complete: '{full_transcript}'")
-        return full_transcript
\ No newline at end of file
+    """
+    A pool of Whisper model replicas behind one bounded worker queue. workers is the number of
+    transcriptions run at once; they are split across the replicas, and each replica runs its share
+    as CTranslate2 workers over a single copy of the weights.
+    """
+
+    def __init__(self, workers: int = TRANSCRIBE_WORKERS, queue_max: int = TRANSCRIBE_QUEUE_MAX, replicas: int = WHISPER_REPLICAS,
+                 model_size: str = WHISPER_MODEL_SIZE, compute_type: str = WHISPER_COMPUTE_TYPE, cpu_threads: int = TRANSCRIBE_CPU_THREADS,
+                 warmup: bool = WHISPER_WARMUP):
+        self.workers = max(1, workers)
+        self.queue_max = queue_max
+        self.replicas = max(1, min(replicas, self.workers))
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        workers_per_replica = math.ceil(self.workers / self.replicas)
+
+        # Imported here so servers that never load the pool don't pay for importing CTranslate2.
+        from faster_whisper import WhisperModel
+
+        start = time.perf_counter()
+        # CTranslate2 releases the GIL while decoding, so num_workers threads share one copy of the
+        # weights and still run on separate cores.
+        self.models = [
+            WhisperModel(model_size, device=WHISPER_DEVICE, compute_type=compute_type, cpu_threads=self.cpu_threads,
+                         num_workers=workers_per_replica, download_root=WHISPER_MODEL_DIR, local_files_only=WHISPER_LOCAL_FILES_ONLY)
+            for _ in range(self.replicas)
+        ]
+        # One slot per worker of each replica, interleaved so concurrent requests spread across replicas;
+        # a transcription holds a slot for its duration.
+        self._slots: queue.Queue = queue.Queue()
+        for _ in range(workers_per_replica):
+            for model in self.models:
+                self._slots.put(model)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="whisper")
+        self.load_seconds = time.perf_counter() - start
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._in_progress = 0
+        self._queue_waits = deque(maxlen=_LATENCY_WINDOW)
+        self._latencies = deque(maxlen=_LATENCY_WINDOW)
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0}
+        print(f"Whisper STT model '{model_size}' ({compute_type}) loaded in {self.load_seconds:.1f} s: {self.replicas} replicas, "
+              f"{self.workers} workers x {self.cpu_threads} threads, queue {queue_max}.")
+        self.warmup_seconds = self.warmup() if warmup else None
+
+    def warmup(self) -> float:
+        """Decodes a synthetic clip on every replica, so lazy initialisation happens now rather than on a user's query."""
+        start = time.perf_counter()
+        clip = warmup_clip()
+        for model in self.models:
+            segments, _ = model.transcribe(clip, beam_size=1)
+            list(segments)
+        elapsed = time.perf_counter() - start
+        print(f"Whisper STT warm-up finished in {elapsed:.2f} s.")
+        return elapsed
+
+    def transcribe(self, audio: Union[str, bytes, BinaryIO, np.ndarray], beam_size: int = 5) -> str:
+        """
+        Transcribes a file path, raw audio file bytes or a file-like object (decoded in memory), or
+        16 kHz float32 samples. A beam_size of 1 (greedy) is faster, for partial transcripts.
+        """
+        if isinstance(audio, (bytes, bytearray)):
+            audio = io.BytesIO(audio)
+        model = self._slots.get()
+        try:
+            segments, info = model.transcribe(audio, beam_size=beam_size)
+            # Segments are decoded lazily, so the replica stays reserved until they are consumed.
+            full_transcript = "".join(segment.text for segment in segments)
+        finally:
+            self._slots.put(model)
+        annotate(language=info.language, audio_seconds=round(info.duration, 2))
+        log.info("Transcription complete", extra={"language": info.language, "language_probability": round(info.language_probability, 3),
+                                                  "audio_seconds": round(info.duration, 2), "text": full_transcript})
+        return full_transcript
+
+    def _run(self, audio: Union[bytes, BinaryIO, np.ndarray], enqueued_at: float, beam_size: int) -> str:
+        started = time.perf_counter()
+        with self._lock:
+            self._in_progress += 1
+            self._queue_waits.append(started - enqueued_at)
+        annotate(queue_wait_ms=round((started - enqueued_at) * 1000, 1))
+        try:
+            text = self.transcribe(audio, beam_size)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_progress -= 1
+        with self._lock:
+            self.stats["completed"] += 1
+            self._latencies.append(time.perf_counter() - started)
+        return text
+
+    async def transcribe_async(self, audio: Union[bytes, BinaryIO, np.ndarray], beam_size: int = 5) -> str:
+        """
+        Transcribes on the worker pool without blocking the event loop. Raises TranscriptionQueueFull
+        when all workers are busy and queue_max requests are already waiting.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.queue_max:
+                self.stats["rejected"] += 1
+                raise TranscriptionQueueFull("The transcription queue is full.")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            # The worker runs in a copy of this context, so its annotations land on the span and its logs carry the request id.
+            with span("transcription", beam_size=beam_size):
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(self.executor, context.run, self._run, audio, time.perf_counter(), beam_size)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth, worker utilisation and recent queue-wait / transcription latencies."""
+        with self._lock:
+            stats = dict(self.stats)
+            stats.update({
+                "model": self.model_size,
+                "compute_type": self.compute_type,
+                "replicas": self.replicas,
+                "cpu_threads": self.cpu_threads,
+                "workers": self.workers,
+                "in_progress": self._in_progress,
+                "queue_depth": max(0, self._pending - self._in_progress),
+                "queue_max": self.queue_max,
+            })
+            waits, latencies = list(self._queue_waits), list(self._latencies)
+        for name, values in (("queue_wait", waits), ("transcribe", latencies)):
+            stats[f"{name}_p50_ms"] = round(_percentile(values, 0.5) * 1000, 1)
+            stats[f"{name}_p95_ms"] = round(_percentile(values, 0.95) * 1000, 1)
+        return stats
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,85 @@
+# File: services/utterance_segmenter.py
+# Buffers streamed PCM audio and uses faster-whisper's Silero VAD to tell when the speaker has
+# finished an utterance.
+
+from typing import List
+
+import numpy as np
+
+from core.config import VOICE_STREAM_SILENCE_MS, VOICE_STREAM_MAX_SECONDS, VOICE_STREAM_VAD_THRESHOLD
+
+# Whisper models expect 16 kHz mono audio; streamed chunks must be 16-bit little-endian PCM at this rate.
+SAMPLE_RATE = 16000
+# Audio before the trailing silence that VAD looks at on each check, so a check never rescans the whole utterance.
+_VAD_CONTEXT_MS = 1500
+# Padding kept around detected speech.
+_SPEECH_PAD_MS = 100
+
+
+def pcm16_to_float32(chunk: bytes) -> np.ndarray:
+    return np.frombuffer(chunk, dtype="<i2").astype(np.float32) / 32768.0
+
+
+class UtteranceSegmenter:
+    """
+    Accumulates one utterance at a time. update() runs VAD over the most recent audio and returns
+    True once speech has been heard and followed by silence_ms of silence (or max_seconds passed).
+    """
+
+    def __init__(self, silence_ms: int = VOICE_STREAM_SILENCE_MS, max_seconds: float = VOICE_STREAM_MAX_SECONDS,
+                 vad_threshold: float = VOICE_STREAM_VAD_THRESHOLD):
+        self.silence_samples = SAMPLE_RATE * silence_ms // 1000
+        self.max_samples = int(SAMPLE_RATE * max_seconds)
+        # Imported on first use, so importing the WebSocket route doesn't import faster-whisper.
+        from faster_whisper.vad import VadOptions
+        self.vad_options = VadOptions(threshold=vad_threshold, min_silence_duration_ms=silence_ms, speech_pad_ms=_SPEECH_PAD_MS)
+        self.reset()
+
+    def reset(self):
+        self._chunks: List[np.ndarray] = []
+        self._audio = np.zeros(0, dtype=np.float32)
+        self.samples = 0
+        self.heard_speech = False
+        self.speech_end = 0
+        # Samples already covered by a VAD check, so a check runs only when new audio has arrived.
+        self._checked = 0
+
+    def add(self, chunk: bytes):
+        if len(chunk) % 2:
+            chunk = chunk[:-1]
+        samples = pcm16_to_float32(chunk)
+        self._chunks.append(samples)
+        self.samples += len(samples)
+
+    @property
+    def audio(self) -> np.ndarray:
+        if self._chunks:
+            self._audio = np.concatenate([self._audio, *self._chunks])
+            self._chunks = []
+        return self._audio
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / SAMPLE_RATE
+
+    def update(self) -> bool:
+        """Runs VAD over the new audio (plus some context). Returns True when the utterance has ended."""
+        if self.samples >= self.max_samples:
+            return True
+        if self.samples - self._checked < self.silence_samples // 4:
+            return False
+        self._checked = self.samples
+        from faster_whisper.vad import get_speech_timestamps
+        audio = self.audio
+        start = max(0, self.samples - self.silence_samples - SAMPLE_RATE * _VAD_CONTEXT_MS // 1000)
+        timestamps = get_speech_timestamps(audio[start:], self.vad_options)
+        if timestamps:
+            self.heard_speech = True
+            self.speech_end = start + timestamps[-1]["end"]
+        # A segment that closed before the end of the buffer was followed by at least min_silence_duration_ms of silence.
+        return self.heard_speech and self.samples - self.speech_end >= self.silence_samples - SAMPLE_RATE * _SPEECH_PAD_MS // 1000
+
+    def speech_audio(self) -> np.ndarray:
+        """The utterance without its trailing silence."""
+        audio = self.audio
+        return audio[:self.speech_end] if self.heard_speech and self.speech_end else audio